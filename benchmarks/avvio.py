@@ -0,0 +1,68 @@
+"""
+Benchmark dei tempi di avvio.
+
+Ogni comando viene eseguito in un nuovo interprete (nessun modulo gia' in
+memoria) e se ne riporta la mediana su piu' ripetizioni, insieme ai moduli
+pesanti caricati dall'import di src.main.
+
+    python -m benchmarks.avvio --ripetizioni 10
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULI_PESANTI = ("pandas", "numpy", "openpyxl", "pyarrow", "google.genai")
+
+COMANDI = {
+    "import src.main": [sys.executable, "-c", "import src.main"],
+    "src.main --help": [sys.executable, "-m", "src.main", "--help"],
+    "import src.server": [sys.executable, "-c", "import src.server"],
+}
+
+
+def misura(comando: list[str], ripetizioni: int) -> dict:
+    durate = []
+    for _ in range(ripetizioni):
+        inizio = time.perf_counter()
+        subprocess.run(comando, cwd=ROOT, check=True, capture_output=True)
+        durate.append(time.perf_counter() - inizio)
+    return {
+        "mediana_ms": round(statistics.median(durate) * 1000, 1),
+        "min_ms": round(min(durate) * 1000, 1),
+    }
+
+
+def moduli_caricati() -> list[str]:
+    """Moduli pesanti presenti in sys.modules dopo import src.main."""
+    codice = (
+        "import sys, json, src.main; "
+        f"print(json.dumps([m for m in {MODULI_PESANTI!r} if m in sys.modules]))"
+    )
+    uscita = subprocess.run([sys.executable, "-c", codice], cwd=ROOT, check=True, capture_output=True, text=True)
+    return json.loads(uscita.stdout.strip().splitlines()[-1])
+
+
+def esegui(ripetizioni: int = 5) -> dict:
+    risultati = {nome: misura(comando, ripetizioni) for nome, comando in COMANDI.items()}
+    risultati["moduli_pesanti_all_import"] = moduli_caricati()
+    return risultati
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tempi di avvio di src.main e src.server")
+    parser.add_argument("--ripetizioni", type=int, default=5)
+    args = parser.parse_args()
+
+    risultati = esegui(args.ripetizioni)
+    for nome, valori in risultati.items():
+        print(f"{nome:<28} {valori}")
+
+
+if __name__ == "__main__":
+    main()
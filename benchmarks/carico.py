@@ -0,0 +1,179 @@
+"""
+Test di carico end-to-end senza PDF reali ne' chiave API.
+
+Genera un catalogo sintetico (benchmarks.catalogo), avvia il server Gemini
+finto (benchmarks.gemini_finto) e esegue `src.main` contro di esso,
+riportando throughput, latenza per offerta (p50/p99) e picco di memoria.
+
+    python -m benchmarks.carico --offerte 1000 --workers 8 --latenza 0.2
+    python -m benchmarks.carico --offerte 100000 --workers 32 --tasso-429 0.05 --richieste-al-secondo 500
+
+`main` gira in un processo separato: il picco di memoria (RSS massimo)
+riguarda solo l'esecuzione e non la generazione del catalogo ne' il server.
+La latenza di un'offerta e' la durata della sua estrazione (upload, modello
+con eventuali nuovi tentativi, validazione e salvataggio in cache).
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+import urllib.request
+
+from loguru import logger
+
+from .catalogo import genera_catalogo, scrivi_catalogo
+from .gemini_finto import avvia_in_processo
+
+try:
+    import resource
+except ImportError:  # Windows: picco di memoria non disponibile
+    resource = None
+
+
+def percentile(valori: list[float], quota: float) -> float | None:
+    """Percentile (quota tra 0 e 1) per rango piu' vicino; None senza valori."""
+    if not valori:
+        return None
+    ordinati = sorted(valori)
+    return ordinati[min(len(ordinati) - 1, int(quota * len(ordinati)))]
+
+
+def picco_memoria_mb() -> float | None:
+    """RSS massimo del processo in MB (ru_maxrss e' in KB su Linux, in byte su macOS)."""
+    if resource is None:
+        return None
+    picco = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return picco / (1024 * 1024) if sys.platform == "darwin" else picco / 1024
+
+
+def _esegui_main(coda, cartella: str, valori: dict, argomenti: list[str]):
+    """Processo figlio: esegue src.main.main() misurando ogni estrazione."""
+    import src.main as modulo_main
+    from src.config import config
+
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+    latenze = []
+    estrai = modulo_main.extract_data
+
+    def estrai_misurando(*args, **kwargs):
+        inizio = time.perf_counter()
+        try:
+            return estrai(*args, **kwargs)
+        finally:
+            latenze.append(time.perf_counter() - inizio)
+
+    config._impostazioni = config.impostazioni.con_valori(valori)
+    modulo_main.extract_data = estrai_misurando
+    os.chdir(cartella)
+    sys.argv = ["main", *argomenti]
+    inizio = time.perf_counter()
+    modulo_main.main()
+    coda.put({"secondi": time.perf_counter() - inizio, "latenze": latenze, "memoria_picco_mb": picco_memoria_mb()})
+
+
+def esegui_carico(offerte: int, fornitura: str = "all", workers: int = 8, latenza: float = 0.0,
+                  tasso_errori: float = 0.0, tasso_429: float = 0.0, richieste_al_secondo: float | None = None,
+                  attesa_iniziale: float = 0.05, tentativi: int = 8, seed: int = 0,
+                  argomenti: list[str] = ()) -> dict:
+    """
+    Esegue main su `offerte` PDF sintetici (divisi tra luce e gas con
+    fornitura "all") e restituisce il rapporto del test di carico.
+    """
+    tipi = ["luce", "gas"] if fornitura == "all" else [fornitura]
+    per_tipo = {tipo: offerte // len(tipi) + (i < offerte % len(tipi)) for i, tipo in enumerate(tipi)}
+
+    with tempfile.TemporaryDirectory() as cartella:
+        inizio = time.perf_counter()
+        for tipo, n in per_tipo.items():
+            scrivi_catalogo(genera_catalogo(n, tipo, seed), os.path.join(cartella, tipo))
+        generazione = time.perf_counter() - inizio
+
+        server, base_url = avvia_in_processo(
+            latenza=latenza, tasso_errori=tasso_errori, tasso_429=tasso_429,
+            richieste_al_secondo=richieste_al_secondo, seed=seed,
+        )
+        from src.config import config
+        valori = {
+            "PATH_OFFERTE_LUCE": os.path.join(cartella, "luce"),
+            "PATH_OFFERTE_GAS": os.path.join(cartella, "gas"),
+            "CACHE_DIR": os.path.join(cartella, "cache"),
+            "PROMPT_LUCE_FILE": os.path.abspath(config.get("PROMPT_LUCE_FILE")),
+            "PROMPT_GAS_FILE": os.path.abspath(config.get("PROMPT_GAS_FILE")),
+            "TARIFFE_DIR": os.path.abspath(config.get("TARIFFE_DIR")),
+            "REGOLE_BUNDLE_FILE": os.path.abspath(config.get("REGOLE_BUNDLE_FILE")),
+            "GENAI_BASE_URL": base_url,
+            "GENAI_API_KEY": "finta",
+            "GENAI_TENTATIVI": tentativi,
+            "GENAI_ATTESA_INIZIALE": attesa_iniziale,
+        }
+        contesto = multiprocessing.get_context("spawn")
+        coda = contesto.Queue()
+        processo = contesto.Process(target=_esegui_main, args=(
+            coda, cartella, valori, ["--fornitura", fornitura, "--workers", str(workers), *argomenti],
+        ))
+        try:
+            processo.start()
+            esito = None
+            while esito is None:
+                try:
+                    esito = coda.get(timeout=1)
+                except Exception:
+                    if not processo.is_alive():
+                        raise RuntimeError(f"main terminato con codice {processo.exitcode}") from None
+            processo.join()
+            with urllib.request.urlopen(f"{base_url}/statistiche", timeout=10) as risposta:
+                server_stat = json.load(risposta)
+        finally:
+            if processo.is_alive():
+                processo.terminate()
+            server.terminate()
+            server.join()
+
+    latenze = esito["latenze"]
+    return {
+        "offerte": len(latenze),
+        "workers": workers,
+        "generazione_catalogo_s": round(generazione, 3),
+        "secondi": round(esito["secondi"], 3),
+        "offerte_al_secondo": round(len(latenze) / esito["secondi"], 1),
+        "latenza_p50_ms": round(percentile(latenze, 0.50) * 1000, 1) if latenze else None,
+        "latenza_p99_ms": round(percentile(latenze, 0.99) * 1000, 1) if latenze else None,
+        "memoria_picco_mb": None if esito["memoria_picco_mb"] is None else round(esito["memoria_picco_mb"], 1),
+        "server": server_stat,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Test di carico di src.main con PDF sintetici e Gemini finto")
+    parser.add_argument("--offerte", type=int, default=1000, help="Numero di PDF sintetici (es. da 1000 a 100000)")
+    parser.add_argument("--fornitura", choices=["all", "luce", "gas"], default="all")
+    parser.add_argument("--workers", type=int, default=8, help="Estrazioni in parallelo per fornitura")
+    parser.add_argument("--latenza", type=float, default=0.0, help="Mediana in secondi di generateContent")
+    parser.add_argument("--tasso-errori", type=float, default=0.0, help="Frazione di risposte 500")
+    parser.add_argument("--tasso-429", type=float, default=0.0, help="Frazione di risposte 429")
+    parser.add_argument("--richieste-al-secondo", type=float, default=None, help="Quota oltre la quale il server risponde 429")
+    parser.add_argument("--attesa-iniziale", type=float, default=0.05, help="GENAI_ATTESA_INIZIALE dei nuovi tentativi")
+    parser.add_argument("--tentativi", type=int, default=8, help="GENAI_TENTATIVI per richiesta")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", type=str, default=None, help="Salva il rapporto in questo file JSON")
+    args = parser.parse_args()
+
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+    rapporto = esegui_carico(
+        args.offerte, args.fornitura, args.workers, args.latenza, args.tasso_errori, args.tasso_429,
+        args.richieste_al_secondo, args.attesa_iniziale, args.tentativi, args.seed,
+    )
+    for chiave, valore in rapporto.items():
+        print(f"{chiave:<24} {valore}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(rapporto, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Cataloghi di offerte sintetiche e PDF minimi per i test di carico.
+
+Ogni PDF e' un documento valido di una pagina con i dati dell'offerta in
+chiaro; in un commento PDF porta anche l'offerta in JSON, da cui il server
+Gemini finto (benchmarks.gemini_finto) ricava la risposta "estratta".
+"""
+import json
+import os
+import random
+import re
+
+from src.model import Offerta, TipoFormula
+
+# Commento PDF con l'offerta originale: ignorato dai lettori PDF
+_MARCATORE = b"% offerta-sintetica: "
+_OFFERTA_IN_PDF = re.compile(rb"^% offerta-sintetica: (.*)$", re.MULTILINE)
+
+# Intervalli di prezzo per fornitura: €/kWh per la luce, €/Smc per il gas
+_PREZZI = {
+    "luce": {"prezzo_fisso": (0.08, 0.30), "fee": (0.0, 0.05)},
+    "gas": {"prezzo_fisso": (0.30, 1.20), "fee": (0.05, 0.30)},
+}
+_NOTE = [None, "Uscita non possibile prima di 12 mesi", "Sconto fedelta' dal secondo anno", "Solo domiciliazione bancaria"]
+
+
+def genera_catalogo(n: int, tipo: str = "luce", seed: int = 0, gestori: int = 50) -> list[Offerta]:
+    """
+    n offerte della fornitura `tipo` che coprono tutte le combinazioni di
+    TipoFormula per il periodo in offerta e quello a offerta finita.
+    """
+    rnd = random.Random(f"{tipo}-{seed}")
+    prezzi = _PREZZI[tipo]
+    formule = list(TipoFormula)
+    offerte = []
+    for i in range(n):
+        offerta, finita = formule[i % len(formule)], formule[(i // len(formule)) % len(formule)]
+        campi = {}
+        for periodo, formula in (("offerta", offerta), ("finita", finita)):
+            if formula == TipoFormula.COSTANTE:
+                campi[f"prezzo_fisso_{periodo}"] = round(rnd.uniform(*prezzi["prezzo_fisso"]), 4)
+            else:
+                campi[f"fee_{periodo}"] = round(rnd.uniform(*prezzi["fee"]), 4)
+        offerte.append(Offerta(
+            nome_offerta=f"{tipo.upper()} Sintetica {i}",
+            gestore=f"Gestore {i % gestori}",
+            tipologia_formula_offerta=offerta.value,
+            tipologia_formula_finita=finita.value,
+            durata_mesi=rnd.choice([12, 24, None]),
+            costi_fissi_anno=round(rnd.uniform(0, 150), 2),
+            note=rnd.choice(_NOTE),
+            **campi,
+        ))
+    return offerte
+
+
+def _testo_pdf(testo: str) -> str:
+    return testo.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def pdf_sintetico(offerta: Offerta) -> bytes:
+    """PDF di una pagina con i campi dell'offerta, uno per riga."""
+    righe = [f"{campo}: {valore}" for campo, valore in offerta.model_dump().items() if valore is not None]
+    flusso = "BT /F1 11 Tf 50 780 Td 14 TL\n"
+    flusso += "".join(f"({_testo_pdf(riga)}) '\n" for riga in righe) + "ET"
+    flusso = flusso.encode("latin-1", errors="replace")
+    oggetti = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+        b"/Resources << /Font << /F1 5 0 R >> >> /Contents 4 0 R >>",
+        b"<< /Length %d >>\nstream\n%s\nendstream" % (len(flusso), flusso),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    pdf = bytearray(b"%PDF-1.4\n")
+    pdf += _MARCATORE + offerta.model_dump_json().encode("utf-8") + b"\n"
+    posizioni = []
+    for numero, corpo in enumerate(oggetti, start=1):
+        posizioni.append(len(pdf))
+        pdf += b"%d 0 obj\n%s\nendobj\n" % (numero, corpo)
+    xref = len(pdf)
+    pdf += b"xref\n0 %d\n0000000000 65535 f \n" % (len(oggetti) + 1)
+    pdf += b"".join(b"%010d 00000 n \n" % posizione for posizione in posizioni)
+    pdf += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(oggetti) + 1, xref)
+    return bytes(pdf)
+
+
+def offerta_da_pdf(contenuto: bytes) -> dict | None:
+    """Offerta (come dict) contenuta in un PDF di pdf_sintetico; None per altri PDF."""
+    trovata = _OFFERTA_IN_PDF.search(contenuto)
+    return json.loads(trovata.group(1)) if trovata else None
+
+
+def scrivi_catalogo(offerte: list[Offerta], cartella: str) -> list[str]:
+    """Scrive un PDF per offerta nella cartella e ne restituisce i percorsi."""
+    os.makedirs(cartella, exist_ok=True)
+    percorsi = []
+    for i, offerta in enumerate(offerte):
+        path = os.path.join(cartella, f"offerta_{i:06d}.pdf")
+        with open(path, "wb") as f:
+            f.write(pdf_sintetico(offerta))
+        percorsi.append(path)
+    return percorsi
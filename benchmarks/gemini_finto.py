@@ -0,0 +1,303 @@
+"""
+Server Gemini finto per i test di carico: implementa gli endpoint usati da
+EnergyGeminiExtractor (upload resumable, generateContent, eliminazione del
+file) con latenza, errori 500 e 429 configurabili.
+
+    python -m benchmarks.gemini_finto --porta 8089 --latenza 0.5 --tasso-429 0.02
+    GENAI_BASE_URL="http://127.0.0.1:8089" GENAI_API_KEY=finta python -m src.main
+
+La risposta di generateContent e' l'offerta contenuta nel PDF caricato
+(vedi benchmarks.catalogo), limitata ai campi richiesti dallo schema.
+"""
+import argparse
+import itertools
+import json
+import math
+import multiprocessing
+import random
+import re
+import sys
+import threading
+import time
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from loguru import logger
+
+from .catalogo import offerta_da_pdf
+
+# Dispersione (sigma lognormale) della latenza di generateContent attorno alla mediana
+_SIGMA_LATENZA = 0.5
+
+
+class ErroreApi(Exception):
+    """Risposta di errore nel formato delle API Google."""
+
+    STATI = {
+        HTTPStatus.BAD_REQUEST: "INVALID_ARGUMENT",
+        HTTPStatus.NOT_FOUND: "NOT_FOUND",
+        HTTPStatus.TOO_MANY_REQUESTS: "RESOURCE_EXHAUSTED",
+        HTTPStatus.INTERNAL_SERVER_ERROR: "INTERNAL",
+    }
+
+    def __init__(self, codice: HTTPStatus, messaggio: str):
+        super().__init__(messaggio)
+        self.codice = codice
+
+    def corpo(self) -> dict:
+        return {"error": {"code": int(self.codice), "message": str(self), "status": self.STATI[self.codice]}}
+
+
+class StatoGemini:
+    """
+    File caricati, sessioni di upload e comportamento simulato del servizio.
+
+    - latenza: mediana in secondi di generateContent (distribuzione lognormale)
+    - tasso_errori / tasso_429: frazione di generateContent che risponde 500 / 429
+    - richieste_al_secondo: quota di generateContent (token bucket); oltre la quota 429
+    """
+
+    def __init__(self, latenza: float = 0.0, tasso_errori: float = 0.0, tasso_429: float = 0.0,
+                 richieste_al_secondo: float | None = None, seed: int = 0):
+        if not (0 <= tasso_errori <= 1 and 0 <= tasso_429 <= 1):
+            raise ValueError("I tassi di errore devono essere compresi tra 0 e 1.")
+        self.latenza = latenza
+        self.tasso_errori = tasso_errori
+        self.tasso_429 = tasso_429
+        self.richieste_al_secondo = richieste_al_secondo
+        self._rnd = random.Random(seed)
+        self._id = itertools.count(1)
+        self._sessioni: dict[str, bytearray] = {}
+        self._file: dict[str, dict | None] = {}
+        self._gettoni = max(1.0, richieste_al_secondo or 0)
+        self._ultimo_rifornimento = time.monotonic()
+        self.statistiche = {"upload": 0, "generate": 0, "ok": 0, "errori_500": 0, "risposte_429": 0, "eliminati": 0}
+        self._lock = threading.Lock()
+
+    def _conta(self, chiave: str):
+        with self._lock:
+            self.statistiche[chiave] += 1
+
+    def inizia_upload(self) -> str:
+        with self._lock:
+            sessione = str(next(self._id))
+            self._sessioni[sessione] = bytearray()
+        return sessione
+
+    def carica(self, sessione: str, blocco: bytes, finalizza: bool) -> str | None:
+        """Aggiunge un blocco all'upload; alla finalizzazione restituisce il nome del file."""
+        with self._lock:
+            if sessione not in self._sessioni:
+                raise ErroreApi(HTTPStatus.NOT_FOUND, f"Sessione di upload sconosciuta: {sessione}")
+            self._sessioni[sessione] += blocco
+            if not finalizza:
+                return None
+            contenuto = self._sessioni.pop(sessione)
+            nome = f"files/finto{sessione}"
+            self._file[nome] = offerta_da_pdf(bytes(contenuto))
+            self.statistiche["upload"] += 1
+        return nome
+
+    def elimina(self, nome: str):
+        with self._lock:
+            if self._file.pop(nome, False) is False:
+                raise ErroreApi(HTTPStatus.NOT_FOUND, f"File sconosciuto: {nome}")
+            self.statistiche["eliminati"] += 1
+
+    def _entro_la_quota(self) -> bool:
+        if not self.richieste_al_secondo:
+            return True
+        with self._lock:
+            adesso = time.monotonic()
+            capacita = max(1.0, self.richieste_al_secondo)
+            self._gettoni = min(capacita, self._gettoni + (adesso - self._ultimo_rifornimento) * self.richieste_al_secondo)
+            self._ultimo_rifornimento = adesso
+            if self._gettoni < 1:
+                return False
+            self._gettoni -= 1
+            return True
+
+    def genera(self, nome_file: str, campi: list[str]) -> dict:
+        """Campi richiesti dell'offerta del file, dopo la latenza e gli errori simulati."""
+        self._conta("generate")
+        with self._lock:
+            esito = self._rnd.random()
+            attesa = self._rnd.lognormvariate(math.log(self.latenza), _SIGMA_LATENZA) if self.latenza > 0 else 0.0
+        if not self._entro_la_quota() or esito < self.tasso_429:
+            self._conta("risposte_429")
+            raise ErroreApi(HTTPStatus.TOO_MANY_REQUESTS, "Resource has been exhausted (e.g. check quota).")
+        time.sleep(attesa)
+        if esito < self.tasso_429 + self.tasso_errori:
+            self._conta("errori_500")
+            raise ErroreApi(HTTPStatus.INTERNAL_SERVER_ERROR, "Internal error encountered.")
+        with self._lock:
+            if nome_file not in self._file:
+                raise ErroreApi(HTTPStatus.NOT_FOUND, f"File sconosciuto: {nome_file}")
+            offerta = self._file[nome_file]
+        if offerta is None:
+            raise ErroreApi(HTTPStatus.BAD_REQUEST, f"{nome_file} non e' un PDF di benchmarks.catalogo")
+        self._conta("ok")
+        return {campo: offerta.get(campo) for campo in campi}
+
+
+class GestoreGemini(BaseHTTPRequestHandler):
+    """
+    Endpoint (con qualsiasi versione API, es. v1beta):
+        POST   /upload/v1beta/files                          avvio upload resumable
+        POST   /upload/v1beta/files?upload_id=N              blocchi ("upload", "upload, finalize")
+        POST   /v1beta/models/{modello}:generateContent
+        DELETE /v1beta/files/{nome}
+        GET    /statistiche                                  contatori delle richieste
+    """
+
+    stato: StatoGemini
+    protocol_version = "HTTP/1.1"
+    # Intestazioni e corpo sono scritti separatamente: senza TCP_NODELAY ogni
+    # risposta attenderebbe l'ACK ritardato del client (~40 ms)
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        logger.debug(f"{self.address_string()} {format % args}")
+
+    def _rispondi(self, stato: int, corpo, intestazioni: dict | None = None):
+        payload = json.dumps(corpo, ensure_ascii=False).encode("utf-8")
+        self.send_response(stato)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        for nome, valore in (intestazioni or {}).items():
+            self.send_header(nome, valore)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _gestisci(self, metodo: str):
+        url = urlparse(self.path)
+        # Il corpo va letto anche per le risposte di errore (connessioni keep-alive)
+        corpo = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        for (metodo_rotta, schema), azione in self.ROTTE.items():
+            trovato = schema.match(url.path) if metodo_rotta == metodo else None
+            if trovato:
+                break
+        else:
+            self._rispondi(HTTPStatus.NOT_FOUND, ErroreApi(HTTPStatus.NOT_FOUND, f"{metodo} {url.path}").corpo())
+            return
+        parametri = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        try:
+            azione(self, trovato, parametri, corpo)
+        except ErroreApi as e:
+            self._rispondi(e.codice, e.corpo())
+        except (ValueError, KeyError, TypeError) as e:
+            self._rispondi(HTTPStatus.BAD_REQUEST, ErroreApi(HTTPStatus.BAD_REQUEST, repr(e)).corpo())
+
+    def do_GET(self):
+        self._gestisci("GET")
+
+    def do_POST(self):
+        self._gestisci("POST")
+
+    def do_DELETE(self):
+        self._gestisci("DELETE")
+
+    def _descrizione_file(self, nome: str) -> dict:
+        host, porta = self.server.server_address[:2]
+        return {"name": nome, "uri": f"http://{host}:{porta}/v1beta/{nome}", "mimeType": "application/pdf", "state": "ACTIVE"}
+
+    def upload(self, trovato, parametri: dict, corpo: bytes):
+        if "upload_id" not in parametri:
+            sessione = self.stato.inizia_upload()
+            host, porta = self.server.server_address[:2]
+            self._rispondi(HTTPStatus.OK, {}, {
+                "X-Goog-Upload-URL": f"http://{host}:{porta}{trovato.group(0)}?upload_id={sessione}",
+                "X-Goog-Upload-Status": "active",
+            })
+            return
+        comando = self.headers.get("X-Goog-Upload-Command", "")
+        nome = self.stato.carica(parametri["upload_id"], corpo, finalizza="finalize" in comando)
+        if nome is None:
+            self._rispondi(HTTPStatus.OK, {}, {"X-Goog-Upload-Status": "active"})
+        else:
+            self._rispondi(HTTPStatus.OK, {"file": self._descrizione_file(nome)}, {"X-Goog-Upload-Status": "final"})
+
+    def genera(self, trovato, parametri: dict, corpo: bytes):
+        richiesta = json.loads(corpo)
+        parti = [p for contenuto in richiesta["contents"] for p in contenuto["parts"]]
+        # L'SDK serializza fileData con le chiavi in snake_case
+        uri = next(p["fileData"].get("fileUri") or p["fileData"]["file_uri"] for p in parti if "fileData" in p)
+        schema = richiesta.get("generationConfig", {}).get("responseJsonSchema") or {}
+        dati = self.stato.genera(re.sub(r"^.*/(files/[^/]+)$", r"\1", uri), list(schema.get("properties", {})))
+        self._rispondi(HTTPStatus.OK, {
+            "candidates": [{
+                "content": {"role": "model", "parts": [{"text": json.dumps(dati, ensure_ascii=False)}]},
+                "finishReason": "STOP",
+            }],
+            "modelVersion": trovato.group(1),
+        })
+
+    def elimina(self, trovato, parametri: dict, corpo: bytes):
+        self.stato.elimina(trovato.group(1))
+        self._rispondi(HTTPStatus.OK, {})
+
+    def statistiche(self, trovato, parametri: dict, corpo: bytes):
+        with self.stato._lock:
+            self._rispondi(HTTPStatus.OK, dict(self.stato.statistiche))
+
+    ROTTE = {
+        ("POST", re.compile(r"^/upload/v1\w*/files$")): upload,
+        ("POST", re.compile(r"^/v1\w*/models/([^/:]+):generateContent$")): genera,
+        ("DELETE", re.compile(r"^/v1\w*/(files/[^/]+)$")): elimina,
+        ("GET", re.compile(r"^/statistiche$")): statistiche,
+    }
+
+
+def crea_server(stato: StatoGemini, host: str = "127.0.0.1", porta: int = 0) -> ThreadingHTTPServer:
+    """Server HTTP multi-thread legato allo stato indicato (porta 0: porta libera)."""
+    gestore = type("GestoreGeminiStato", (GestoreGemini,), {"stato": stato})
+    server = ThreadingHTTPServer((host, porta), gestore)
+    server.daemon_threads = True
+    return server
+
+
+def _servi(coda, opzioni: dict):
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+    server = crea_server(StatoGemini(**opzioni))
+    coda.put(server.server_port)
+    server.serve_forever()
+
+
+def avvia_in_processo(**opzioni) -> tuple[multiprocessing.Process, str]:
+    """
+    Avvia il server in un processo separato, per non contendere il GIL e
+    la memoria del processo misurato. Restituisce il processo e l'URL base.
+    """
+    contesto = multiprocessing.get_context("spawn")
+    coda = contesto.Queue()
+    processo = contesto.Process(target=_servi, args=(coda, opzioni), daemon=True)
+    processo.start()
+    return processo, f"http://127.0.0.1:{coda.get(timeout=30)}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Server Gemini finto per i test di carico")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--porta", type=int, default=8089)
+    parser.add_argument("--latenza", type=float, default=0.0, help="Mediana in secondi di generateContent")
+    parser.add_argument("--tasso-errori", type=float, default=0.0, help="Frazione di risposte 500")
+    parser.add_argument("--tasso-429", type=float, default=0.0, help="Frazione di risposte 429")
+    parser.add_argument("--richieste-al-secondo", type=float, default=None, help="Quota oltre la quale si risponde 429")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    stato = StatoGemini(args.latenza, args.tasso_errori, args.tasso_429, args.richieste_al_secondo, args.seed)
+    server = crea_server(stato, args.host, args.porta)
+    logger.info(f"Gemini finto in ascolto su http://{args.host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Server interrotto.")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+"""
+Suite di benchmark eseguibile offline (nessuna chiamata a Gemini).
+
+    python -m benchmarks.suite                      # esegue e confronta con la baseline
+    python -m benchmarks.suite --salva-baseline     # esegue e salva la baseline
+    python -m benchmarks.suite --veloce             # salta le taglie piu' grandi
+    python -m benchmarks.suite --solo prezzi excel bundle
+
+Ogni misura e' la mediana di piu' ripetizioni, in secondi. Rispetto alla
+baseline viene segnalata come regressione ogni misura piu' lenta di oltre
+`--soglia` (default 20%); in quel caso il processo termina con codice 1.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from typing import Callable
+
+from loguru import logger
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+
+def misura(funzione: Callable[[], object], ripetizioni: int = 5, riscaldamento: bool = True) -> float:
+    """Mediana dei tempi di esecuzione di funzione(), in secondi, dopo un'esecuzione a vuoto."""
+    if riscaldamento:
+        funzione()
+    durate = []
+    for _ in range(ripetizioni):
+        inizio = time.perf_counter()
+        funzione()
+        durate.append(time.perf_counter() - inizio)
+    return statistics.median(durate)
+
+
+def genera_offerte(n: int, seed: int = 42):
+    from src.model import Offerta
+    rnd = random.Random(seed)
+    offerte = []
+    for i in range(n):
+        fissa = rnd.random() < 0.4
+        offerte.append(Offerta(
+            nome_offerta=f"Offerta {i}",
+            gestore=f"Gestore {i % 7}",
+            prezzo_fisso_offerta=round(rnd.uniform(0.08, 0.5), 4) if fissa else None,
+            fee_offerta=None if fissa else round(rnd.uniform(0.0, 0.2), 4),
+            tipologia_formula_offerta="costante" if fissa else rnd.choice(["standard", "ridotta"]),
+            tipologia_formula_finita="standard",
+            fee_finita=round(rnd.uniform(0.0, 0.2), 4),
+            durata_mesi=rnd.choice([12, 24, None]),
+            costi_fissi_anno=round(rnd.uniform(0, 150), 2),
+        ))
+    return offerte
+
+
+def bench_cache(veloce: bool) -> dict[str, float]:
+    """Latenza di CacheManager.load (hit e miss) con 10^4 e 10^5 voci."""
+    from src.data_extractor.cache import CacheManager
+
+    risultati = {}
+    for n in (10**4,) if veloce else (10**4, 10**5):
+        with tempfile.TemporaryDirectory() as cartella:
+            cache = CacheManager(cartella, float("inf"))
+            chiavi = [cache.generate_key(f"offerta_{i}.pdf", "modello", "prompt") for i in range(n)]
+            voce = {"nome_offerta": "Offerta", "gestore": "Gestore", "prezzo_fisso_offerta": 0.12}
+            for chiave in chiavi:
+                cache.save(chiave, voce)
+
+            campione = random.Random(0).sample(chiavi, 1000)
+            mancanti = [cache.generate_key(f"assente_{i}.pdf") for i in range(1000)]
+            risultati[f"cache_hit_{n}"] = misura(lambda: [cache.load(k) for k in campione], 3) / len(campione)
+            risultati[f"cache_miss_{n}"] = misura(lambda: [cache.load(k) for k in mancanti], 3) / len(mancanti)
+    return risultati
+
+
+def bench_prezzi(veloce: bool) -> dict[str, float]:
+    """Tempo per offerta di PrezzoLuce/PrezzoGas, complessivo e per scenario."""
+    from src.prezzo.prezzo_gas import PrezzoGas
+    from src.prezzo.prezzo_luce import PrezzoLuce
+
+    offerte = genera_offerte(500 if veloce else 2000)
+    scenari = {
+        "offerta": "calcola_prezzo_offerta",
+        "finita_medio": "calcola_prezzo_finita_medio",
+        "finita_peggiore": "calcola_prezzo_finita_peggiore",
+    }
+    risultati = {}
+    for nome, calcolatore in (("luce", PrezzoLuce), ("gas", PrezzoGas)):
+        risultati[f"prezzi_{nome}_tutto"] = misura(
+            lambda: [calcolatore(o).calcola_tutto() for o in offerte], 3
+        ) / len(offerte)
+        istanze = [calcolatore(o) for o in offerte]
+        for scenario, metodo in scenari.items():
+            risultati[f"prezzi_{nome}_{scenario}"] = misura(
+                lambda: [getattr(p, metodo)() for p in istanze], 3
+            ) / len(offerte)
+    return risultati
+
+
+def bench_excel(veloce: bool) -> dict[str, float]:
+    """ExcelFormatter.run a 1k, 10k e 100k righe."""
+    import numpy as np
+    import pandas as pd
+    from src.excel_writer.excel_writer import ExcelFormatter
+
+    risultati = {}
+    for n in (1_000, 10_000) if veloce else (1_000, 10_000, 100_000):
+        rnd = np.random.default_rng(0)
+        df = pd.DataFrame({
+            "nome_offerta": [f"Offerta {i}" for i in range(n)],
+            "gestore": [f"Gestore {i % 50}" for i in range(n)],
+            "prezzo_offerta_mensile": rnd.uniform(40, 120, n).round(2),
+            "prezzo_finita_medio_mensile": rnd.uniform(40, 120, n).round(2),
+            "prezzo_finita_peggiore_mensile": rnd.uniform(40, 120, n).round(2),
+            "note": ["nota"] * n,
+        })
+        with tempfile.TemporaryDirectory() as cartella:
+            formatter = ExcelFormatter(
+                df=df,
+                output_path=os.path.join(cartella, "out.xlsx"),
+                key_columns=["nome_offerta", "gestore"],
+                price_columns=["prezzo_offerta_mensile", "prezzo_finita_medio_mensile", "prezzo_finita_peggiore_mensile"],
+                note_column="note",
+            )
+            risultati[f"excel_{n}"] = misura(formatter.run, 1 if n >= 100_000 else 3, riscaldamento=n < 100_000)
+    return risultati
+
+
+def bench_bundle(veloce: bool) -> dict[str, float]:
+    """Migliori 5 combinazioni luce + gas per i tre scenari con 1k e 10k offerte per lato."""
+    import numpy as np
+    import pandas as pd
+    from src.prezzo.bundle import OttimizzatoreBundle, RegolaBundle, RegoleBundle
+
+    def catalogo(n: int, seed: int) -> pd.DataFrame:
+        rnd = np.random.default_rng(seed)
+        return pd.DataFrame({
+            "nome_offerta": [f"Offerta {i}" for i in range(n)],
+            "gestore": [f"Gestore {i % 100}" for i in range(n)],
+            "prezzo_offerta_mensile": rnd.uniform(40, 120, n),
+            "prezzo_finita_medio_mensile": rnd.uniform(40, 120, n),
+            "prezzo_finita_peggiore_mensile": rnd.uniform(40, 120, n),
+        })
+
+    regole = RegoleBundle(regole=[RegolaBundle(gestore=f"Gestore {i}", sconto_mensile=i % 7) for i in range(0, 100, 3)])
+    risultati = {}
+    for n in (1_000,) if veloce else (1_000, 10_000):
+        luce, gas = catalogo(n, 0), catalogo(n, 1)
+        risultati[f"bundle_{n}"] = misura(lambda: OttimizzatoreBundle(luce, gas, regole).tutte(5), 3)
+    return risultati
+
+
+def bench_main(veloce: bool) -> dict[str, float]:
+    """main() end-to-end con un estrattore finto: pipeline, prezzi, orizzonte e output Excel."""
+    import src.main as modulo_main
+    from src.config import config
+
+    # src.main configura il logger all'import: le righe INFO falserebbero i tempi
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+    n = 50 if veloce else 200
+    offerte = genera_offerte(n)
+    originali = (modulo_main.extract_data, config._impostazioni, sys.argv, os.getcwd())
+
+    def estrai_finto(pdf_path, prompt_text, use_cache=True, offline=False):
+        return offerte[int(os.path.basename(pdf_path).split(".")[0])]
+
+    with tempfile.TemporaryDirectory() as cartella:
+        for tipo in ("luce", "gas"):
+            os.makedirs(os.path.join(cartella, tipo))
+            for i in range(n):
+                open(os.path.join(cartella, tipo, f"{i}.pdf"), "wb").close()
+        impostazioni = config.impostazioni.con_valori({
+            "PATH_OFFERTE_LUCE": os.path.join(cartella, "luce"),
+            "PATH_OFFERTE_GAS": os.path.join(cartella, "gas"),
+            "CACHE_DIR": os.path.join(cartella, "cache"),
+            "PROMPT_LUCE_FILE": os.path.abspath(config.get("PROMPT_LUCE_FILE")),
+            "PROMPT_GAS_FILE": os.path.abspath(config.get("PROMPT_GAS_FILE")),
+            "TARIFFE_DIR": os.path.abspath(config.get("TARIFFE_DIR")),
+        })
+        try:
+            os.chdir(cartella)
+            config._impostazioni = impostazioni
+            modulo_main.extract_data = estrai_finto
+            # Senza cache ogni ripetizione ricalcola anche i prezzi
+            sys.argv = ["main", "--no-cache"]
+            tempo = misura(modulo_main.main, 3, riscaldamento=False)
+        finally:
+            modulo_main.extract_data, config._impostazioni, sys.argv, cartella_iniziale = originali
+            os.chdir(cartella_iniziale)
+    return {f"main_{n}_offerte": tempo}
+
+
+def bench_avvio(veloce: bool) -> dict[str, float]:
+    """Tempi di avvio in un nuovo interprete (vedi benchmarks.avvio)."""
+    from .avvio import COMANDI, misura as misura_comando
+    return {
+        f"avvio_{nome.replace(' ', '_').replace('-', '')}": misura_comando(comando, 3 if veloce else 5)["mediana_ms"] / 1000
+        for nome, comando in COMANDI.items()
+    }
+
+
+BENCHMARK = {
+    "cache": bench_cache,
+    "prezzi": bench_prezzi,
+    "excel": bench_excel,
+    "bundle": bench_bundle,
+    "main": bench_main,
+    "avvio": bench_avvio,
+}
+
+
+def confronta(attuali: dict[str, float], baseline: dict[str, float], soglia: float) -> list[str]:
+    """Misure piu' lente della baseline di oltre `soglia` (frazione)."""
+    return [
+        nome for nome, valore in attuali.items()
+        if nome in baseline and baseline[nome] > 0 and valore > baseline[nome] * (1 + soglia)
+    ]
+
+
+def formatta(valore: float) -> str:
+    if valore < 1e-3:
+        return f"{valore * 1e6:9.1f} us"
+    if valore < 1:
+        return f"{valore * 1e3:9.2f} ms"
+    return f"{valore:9.2f} s "
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark offline di cache, prezzi, Excel e main")
+    parser.add_argument("--solo", nargs="+", choices=list(BENCHMARK), default=list(BENCHMARK))
+    parser.add_argument("--veloce", action="store_true", help="Taglie ridotte (salta 10^5 voci e 100k righe)")
+    parser.add_argument("--baseline", default=BASELINE, help="File JSON della baseline")
+    parser.add_argument("--salva-baseline", action="store_true", help="Salva le misure come nuova baseline")
+    parser.add_argument("--soglia", type=float, default=0.20, help="Rallentamento tollerato rispetto alla baseline")
+    args = parser.parse_args()
+
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+    attuali = {}
+    for nome in args.solo:
+        print(f"== {nome}", flush=True)
+        misure = BENCHMARK[nome](args.veloce)
+        for chiave, valore in misure.items():
+            print(f"  {chiave:<36} {formatta(valore)}", flush=True)
+        attuali.update(misure)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    if args.salva_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({**baseline, **attuali}, f, indent=2, sort_keys=True)
+        print(f"Baseline salvata in {args.baseline}")
+        return
+
+    if not baseline:
+        print("Nessuna baseline: usa --salva-baseline per crearla.")
+        return
+
+    regressioni = confronta(attuali, baseline, args.soglia)
+    for nome in regressioni:
+        print(f"REGRESSIONE {nome}: {formatta(attuali[nome])} contro {formatta(baseline[nome])} in baseline")
+    if regressioni:
+        sys.exit(1)
+    print(f"Nessuna regressione oltre il {args.soglia:.0%}.")
+
+
+if __name__ == "__main__":
+    main()
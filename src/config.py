@@ -1,60 +1,234 @@
 import os
-from dotenv import load_dotenv, dotenv_values
+import hashlib
+import threading
+from decimal import Decimal
+from typing import Literal
+
+from dotenv import dotenv_values
 from loguru import logger
+from pydantic import AliasChoices, BaseModel, ConfigDict, Field, ValidationError, field_validator
+
+from .tracing import tracer
+
+
+class Impostazioni(BaseModel):
+    """
+    Impostazioni tipizzate lette dai file env: validate una sola volta al
+    caricamento e poi immutabili. I valori non validi (es. un commento
+    finito dentro un valore) vengono segnalati subito, non durante il
+    calcolo dei prezzi.
+    """
+
+    model_config = ConfigDict(frozen=True, extra="ignore")
+
+    # -------------- PERCORSI --------------
+    PATH_OFFERTE_LUCE: str = "data/offerte/luce"
+    PATH_OFFERTE_GAS: str = "data/offerte/gas"
+    PROMPT_LUCE_FILE: str = "prompts/dati_luce.txt"
+    PROMPT_GAS_FILE: str = "prompts/dati_gas.txt"
+    TARIFFE_DIR: str = "tariffe"
+    REGOLE_BUNDLE_FILE: str = "regole/bundle.json"
+    # serie storiche per il backtest (--backtest): CSV o Parquet con colonne data, valore
+    SERIE_PUN_FILE: str | None = None
+    SERIE_PSV_FILE: str | None = None
+    # -------------- GENAI --------------
+    GENAI_API_KEY: str | None = Field(default=None, repr=False)
+    GENAI_MODEL: str = "gemini-2.5-flash"
+    # endpoint alternativo (es. server Gemini finto di benchmarks.carico); None: API di Google
+    GENAI_BASE_URL: str | None = None
+    # tentativi per richiesta (429, 408 e 5xx) con attesa esponenziale dalla prima attesa in secondi
+    GENAI_TENTATIVI: int = Field(default=5, ge=1)
+    GENAI_ATTESA_INIZIALE: float = Field(default=1.0, gt=0)
+    ESTRAZIONE_WORKERS: int = Field(default=4, ge=1)
+    # -------------- CACHE E STORICO --------------
+    CACHE_DIR: str = "data/cache"
+    CACHE_TTL_SECONDS: float = Field(default=86400, ge=0)
+    STORICO_DB: str = "data/storico/risultati.sqlite"
+    SERVER_PORTA: int = 8765
+
+    # -------------- UTENTE --------------
+    prima_casa: bool
+    residenza: bool
+    zona_geografica: Literal["CENTRO_NORD", "SUD_MEZZOGIORNO"]
+    orizzonte_mesi: int = Field(default=24, ge=1)
+    consumption_kwh_monthly: float = Field(ge=0)
+    potenza_kw: float = Field(default=3.0, gt=0)
+    consumption_smc_monthly: Decimal = Field(ge=0)
+    consumption_smc_yearly: Decimal | None = Field(default=None, ge=0)
+    mese_riferimento: int = Field(default=1, ge=1, le=12)
+    # ambito tariffario gas: esplicito o ricavato dal comune (vedi tariffe/)
+    comune: str | None = None
+    ambito_gas: str | None = None
+
+    # -------------- MERCATO --------------
+    pun_index_eur_kwh_mean: float
+    pun_index_eur_kwh_worst: float
+    go_index_eur_kwh: float = 0.0002
+    perdite_rete_percent: float = Field(
+        default=0.10, ge=0, le=1,
+        validation_alias=AliasChoices("perdite_rete_percent", "perdite_el_rete_percent"),
+    )
+    psv_eur_smc: Decimal
+    psv_eur_smc_worst: Decimal = Decimal("0.0")
+    pcs_locale_gj_smc: Decimal = Field(gt=0)
+    c_coefficiente: Decimal = Decimal("1.0")
+
+    @field_validator("comune", "ambito_gas", "SERIE_PUN_FILE", "SERIE_PSV_FILE", "GENAI_BASE_URL", mode="before")
+    @classmethod
+    def _vuoto_come_assente(cls, valore):
+        return valore or None
+
+    def valori(self, chiavi) -> dict:
+        """Valori serializzabili (JSON) delle sole chiavi indicate."""
+        return self.model_dump(mode="json", include=set(chiavi))
+
+    def impronta(self) -> str:
+        """Impronta stabile delle impostazioni, esclusi i segreti."""
+        payload = self.model_dump_json(exclude={"GENAI_API_KEY"})
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def con_valori(self, valori: dict) -> "Impostazioni":
+        """Copia validata con alcuni valori sostituiti."""
+        return type(self).model_validate({**self.model_dump(), **valori})
+
+    @classmethod
+    def chiavi_note(cls) -> set[str]:
+        chiavi = set(cls.model_fields)
+        for campo in cls.model_fields.values():
+            if isinstance(campo.validation_alias, AliasChoices):
+                chiavi.update(campo.validation_alias.choices)
+        return chiavi
+
 
 class Config:
     def __init__(self, env_dir=None):
         """
-        Inizializza la configurazione leggendo TUTTI i file .env 
+        Inizializza la configurazione leggendo TUTTI i file .env
         presenti nella cartella specificata (default: 'env').
+        I file vengono letti al primo accesso a un valore; os.environ
+        non viene modificato.
         """
         if env_dir is None:
             # Punta alla cartella 'env' nella root del progetto
             base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
             env_dir = os.path.join(base_dir, "env")
-        
+
         self.env_dir = env_dir
-        self.settings = {}
+        self._impostazioni: Impostazioni | None = None
+        self._firma = None
+        self._lock = threading.Lock()
 
         if not os.path.exists(self.env_dir):
             logger.error(f"Cartella env non trovata: {self.env_dir}")
             raise FileNotFoundError(f"Cartella env non trovata: {self.env_dir}")
 
-        self._load_all_env_files()
-
-    def _load_all_env_files(self):
-        """Itera e carica ogni file nella cartella env."""
-        # Otteniamo la lista dei file e li ordiniamo (opzionale, per prevedibilità)
-        files = sorted(os.listdir(self.env_dir))
-        
-        for filename in files:
-            # Carichiamo solo file (escludiamo cartelle)
-            file_path = os.path.join(self.env_dir, filename)
-            
-            if os.path.isfile(file_path):
-                logger.info(f"Caricamento file env: {filename}")
-                
-                # Carica nel sistema (os.environ)
-                load_dotenv(dotenv_path=file_path, override=True)
-                
-                # Aggiorna il dizionario interno settings
-                file_values = dotenv_values(dotenv_path=file_path)
-                self.settings.update(file_values)
+    @property
+    def impostazioni(self) -> Impostazioni:
+        if self._impostazioni is None:
+            with self._lock:
+                if self._impostazioni is None:
+                    with tracer.span("config"):
+                        self._firma = self._firma_file()
+                        self._impostazioni = self._carica()
+        return self._impostazioni
+
+    def _file_env(self) -> list[str]:
+        # Ordinati per prevedibilità: a parità di chiave vale l'ultimo file
+        return [
+            os.path.join(self.env_dir, filename)
+            for filename in sorted(os.listdir(self.env_dir))
+            if os.path.isfile(os.path.join(self.env_dir, filename))
+        ]
+
+    def _firma_file(self) -> tuple:
+        firma = []
+        for file_path in self._file_env():
+            stat = os.stat(file_path)
+            firma.append((file_path, stat.st_mtime_ns, stat.st_size))
+        return tuple(firma)
+
+    def _carica(self) -> Impostazioni:
+        """Legge e valida tutti i file della cartella env."""
+        valori, origine = {}, {}
+        for file_path in self._file_env():
+            logger.debug(f"Caricamento file env: {os.path.basename(file_path)}")
+            for chiave, valore in dotenv_values(dotenv_path=file_path).items():
+                valori[chiave] = valore
+                origine[chiave] = os.path.basename(file_path)
+
+        sconosciute = sorted(set(valori) - Impostazioni.chiavi_note())
+        if sconosciute:
+            logger.warning(f"Chiavi di configurazione sconosciute (ignorate): {', '.join(sconosciute)}")
+
+        try:
+            return Impostazioni.model_validate(valori)
+        except ValidationError as e:
+            righe = [
+                f"  {errore['loc'][0]} ({origine.get(errore['loc'][0], 'mancante')}): {errore['msg']}"
+                for errore in e.errors()
+            ]
+            messaggio = f"Configurazione non valida in {self.env_dir}:\n" + "\n".join(righe)
+            logger.error(messaggio)
+            raise ValueError(messaggio) from None
+
+    def ricarica(self) -> bool:
+        """
+        Rilegge i file env se sono cambiati dall'ultimo caricamento.
+        Restituisce True se le impostazioni sono cambiate; con file non
+        validi restano in uso le impostazioni precedenti.
+        """
+        if self.env_dir is None:
+            return False
+        impostazioni = self.impostazioni
+        firma = self._firma_file()
+        if firma == self._firma:
+            return False
+        with self._lock:
+            self._firma = firma
+            try:
+                nuove = self._carica()
+            except ValueError:
+                logger.error("Ricarica della configurazione fallita: restano in uso i valori precedenti.")
+                return False
+            if nuove == impostazioni:
+                return False
+            self._impostazioni = nuove
+        logger.info("Configurazione ricaricata dai file env.")
+        return True
+
+    @classmethod
+    def da_impostazioni(cls, impostazioni: Impostazioni) -> "Config":
+        """Configurazione in memoria, senza leggere i file env."""
+        obj = cls.__new__(cls)
+        obj.env_dir = None
+        obj._impostazioni = impostazioni
+        obj._firma = None
+        obj._lock = threading.Lock()
+        return obj
+
+    def con_valori(self, valori: dict) -> "Config":
+        """Copia della configurazione con alcuni valori sostituiti (e validati)."""
+        return Config.da_impostazioni(self.impostazioni.con_valori(valori))
 
     def get(self, key, default=None):
-        return self.settings.get(key, default)
+        valore = getattr(self.impostazioni, key, None)
+        return default if valore is None else valore
 
     def as_dict(self):
-        return self.settings
+        return self.impostazioni.model_dump(exclude={"GENAI_API_KEY"})
+
+    def impronta(self) -> str:
+        """Impronta stabile della configurazione, esclusi i segreti."""
+        return self.impostazioni.impronta()
 
-config = Config()  
+config = Config()
 
 if __name__ == "__main__":
-    
+
     try:
         config = Config() # Cerca automaticamente la cartella 'env'
         print("\n--- Riepilogo Impostazioni ---")
         for k, v in config.as_dict().items():
             print(f"{k}: {v}")
     except Exception as e:
-        logger.exception("Errore durante l'inizializzazione della configurazione")
\ No newline at end of file
+        logger.exception("Errore durante l'inizializzazione della configurazione")
@@ -0,0 +1,134 @@
+import os
+import json
+import hashlib
+import tempfile
+import threading
+import time
+from contextlib import contextmanager, suppress
+
+from loguru import logger
+
+try:
+    import fcntl
+except ImportError:  # Windows: lock solo tra i thread dello stesso processo
+    fcntl = None
+
+
+def scrivi_atomico(path: str, testo: str, mtime: float | None = None):
+    """
+    Scrive il file in modo atomico: file temporaneo nella stessa cartella e
+    os.replace. Chi legge vede il contenuto precedente o quello nuovo, mai
+    un file troncato. Con `mtime` il file ha gia' quella data di modifica.
+    """
+    cartella = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=cartella, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(testo)
+        if mtime is not None:
+            os.utime(tmp_path, (mtime, mtime))
+        os.replace(tmp_path, path)
+    except BaseException:
+        with suppress(OSError):
+            os.remove(tmp_path)
+        raise
+
+
+class CacheManager:
+    """
+    Cache su file JSON condivisibile tra thread e processi.
+
+    Le scritture sono atomiche; `blocca(key)` e' un lock consultivo per
+    chiave (flock) con cui un processo attende un'estrazione della stessa
+    chiave gia' in corso altrove invece di duplicarla. Le voci illeggibili
+    vengono spostate in `quarantena/` e trattate come assenti.
+    """
+
+    def __init__(self, cache_dir: str, ttl_seconds: int):
+        self.cache_dir = cache_dir
+        self.ttl_seconds = ttl_seconds
+        os.makedirs(cache_dir, exist_ok=True)
+        # Lock per chiave e numero di thread che lo usano: rimosso quando nessuno lo usa
+        self._lock_thread: dict[str, list] = {}
+        self._lock_registro = threading.Lock()
+
+    def _cache_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def save(self, key: str, data: dict, mtime: float | None = None):
+        """Salva la voce; `mtime` mantiene la data di una voce esistente (e quindi la sua scadenza)."""
+        scrivi_atomico(self._cache_path(key), json.dumps(data, ensure_ascii=False), mtime)
+
+    def data_modifica(self, key: str) -> float | None:
+        """Data di modifica della voce (da cui parte la scadenza), None se assente."""
+        try:
+            return os.path.getmtime(self._cache_path(key))
+        except FileNotFoundError:
+            return None
+
+    def load(self, key: str, ignora_scadenza: bool = False):
+        path = self._cache_path(key)
+        try:
+            if not ignora_scadenza and time.time() - os.path.getmtime(path) > self.ttl_seconds:
+                return None
+            with open(path, "r", encoding="utf-8") as f:
+                try:
+                    return json.load(f)
+                except (json.JSONDecodeError, UnicodeDecodeError) as e:
+                    errore, letto = e, os.fstat(f.fileno())
+        except FileNotFoundError:
+            return None
+        # Fuori dal with: su Windows un file aperto non puo' essere spostato
+        self._quarantena(key, errore, letto)
+        return None
+
+    def _quarantena(self, key: str, errore: Exception, letto: os.stat_result):
+        """
+        Sposta in quarantena la voce illeggibile, se e' ancora il file letto
+        (`letto`): una scrittura concorrente puo' averla gia' sostituita con
+        una voce valida, che non va spostata.
+        """
+        path = self._cache_path(key)
+        try:
+            attuale = os.stat(path)
+        except FileNotFoundError:
+            return  # gia' spostata da un altro processo
+        if (attuale.st_dev, attuale.st_ino, attuale.st_mtime_ns) != (letto.st_dev, letto.st_ino, letto.st_mtime_ns):
+            return
+        cartella = os.path.join(self.cache_dir, "quarantena")
+        os.makedirs(cartella, exist_ok=True)
+        destinazione = os.path.join(cartella, f"{key}.{time.time_ns()}.json")
+        try:
+            os.replace(path, destinazione)
+            logger.warning(f"Voce di cache corrotta ({errore}): spostata in {destinazione}")
+        except FileNotFoundError:
+            pass  # gia' spostata da un altro processo
+
+    @contextmanager
+    def blocca(self, key: str):
+        """Lock esclusivo sulla chiave, valido tra thread e processi."""
+        with self._lock_registro:
+            voce = self._lock_thread.setdefault(key, [threading.Lock(), 0])
+            voce[1] += 1
+        try:
+            with voce[0]:
+                if fcntl is None:
+                    yield
+                    return
+                cartella = os.path.join(self.cache_dir, ".lock")
+                os.makedirs(cartella, exist_ok=True)
+                with open(os.path.join(cartella, f"{key}.lock"), "a") as f:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+                    try:
+                        yield
+                    finally:
+                        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+        finally:
+            with self._lock_registro:
+                voce[1] -= 1
+                if voce[1] == 0:
+                    del self._lock_thread[key]
+
+    def generate_key(self, *args) -> str:
+        payload = "\n".join(str(a) for a in args)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
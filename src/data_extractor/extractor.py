@@ -1,41 +1,16 @@
 import os
 import re
 import json
-import hashlib
-import time
-from google import genai
-from google.genai import types
+import threading
+from functools import lru_cache
 from loguru import logger
+from pydantic import ValidationError
 
 from src.model import Offerta
+from .cache import CacheManager, scrivi_atomico
+from .versioni import versioni_campi
 from ..config import config  
-
-
-class CacheManager:
-    def __init__(self, cache_dir: str, ttl_seconds: int):
-        self.cache_dir = cache_dir
-        self.ttl_seconds = ttl_seconds
-        os.makedirs(cache_dir, exist_ok=True)
-
-    def _cache_path(self, key: str) -> str:
-        return os.path.join(self.cache_dir, f"{key}.json")
-
-    def save(self, key: str, data: dict):
-        with open(self._cache_path(key), "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False)
-
-    def load(self, key: str):
-        path = self._cache_path(key)
-        if not os.path.exists(path):
-            return None
-        if time.time() - os.path.getmtime(path) > self.ttl_seconds:
-            return None
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
-
-    def generate_key(self, *args) -> str:
-        payload = "\n".join(str(a) for a in args)
-        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+from ..tracing import tracer
 
 
 class DebugProvider:
@@ -54,60 +29,220 @@ class DebugProvider:
             "note": "Uscita non possibile prima di 24 mesi"
         }
         
+class OffertaNonInCache(Exception):
+    """In modalita' offline l'offerta non e' presente nella cache di estrazione."""
+
+
+_lock_client = threading.Lock()
+
+
+@lru_cache(maxsize=4)
+def _crea_client(api_key: str, base_url: str | None, tentativi: int, attesa: float):
+    from google import genai
+    from google.genai import types
+    http_options = types.HttpOptions(
+        base_url=base_url,
+        # 429 e errori temporanei del server: nuovo tentativo con attesa esponenziale
+        retry_options=types.HttpRetryOptions(attempts=tentativi, initial_delay=attesa, jitter=attesa),
+    )
+    return genai.Client(api_key=api_key, http_options=http_options)
+
+
+def _client_condiviso(api_key: str, base_url: str | None, tentativi: int, attesa: float):
+    """
+    Client Gemini condiviso dagli estrattori del processo (uno per PDF):
+    crearne uno carica i certificati TLS e chiuderlo chiude le connessioni,
+    ~0.25 s di CPU che a ogni PDF si sommerebbero alla latenza del modello.
+    """
+    with _lock_client:
+        return _crea_client(api_key, base_url, tentativi, attesa)
+
+
 class EnergyGeminiExtractor:
-    def __init__(self, model="gemini-2.5-flash", prompt_text=""):
+    def __init__(self, model="gemini-2.5-flash", prompt_text="", offline: bool = False):
         self.api_key = config.get("GENAI_API_KEY")
         self.model = model
         self.prompt_text = prompt_text
-        self.cache = CacheManager(config.get("CACHE_DIR"), float(config.get("CACHE_TTL_SECONDS")))
+        self.versioni = versioni_campi(prompt_text)
+        self.offline = offline
+        self.cache = CacheManager(config.get("CACHE_DIR"), config.get("CACHE_TTL_SECONDS"))
+        self._client = None
 
-        if not self.api_key:
-            raise ValueError("GENAI_API_KEY non trovato. Controlla il file 'keys.env'")
-        self.client = genai.Client(api_key=self.api_key)
+    @property
+    def client(self):
+        """Client Gemini, creato (e importato) solo al primo uso."""
+        if self.offline:
+            raise OffertaNonInCache("Client Gemini non disponibile in modalita' offline")
+        if self._client is None:
+            if not self.api_key:
+                raise ValueError("GENAI_API_KEY non trovato. Controlla il file 'keys.env'")
+            self._client = _client_condiviso(
+                self.api_key,
+                config.get("GENAI_BASE_URL"),
+                config.get("GENAI_TENTATIVI"),
+                config.get("GENAI_ATTESA_INIZIALE"),
+            )
+        return self._client
+
+    def chiave(self, identita: str) -> str:
+        """
+        Chiave di cache: PDF (percorso o altra identita'), modello e testo comune
+        del prompt. Le sezioni dedicate ai campi e lo schema sono versionati per
+        campo nella voce.
+        """
+        return self.cache.generate_key(identita, self.model, self.versioni.testo_comune)
+
+    def _leggi_voce(self, identita: str, ignora_scadenza: bool = False) -> tuple[dict, dict] | None:
+        """
+        Dati e impronte per campo della voce in cache. Le voci del formato
+        precedente (solo dati, chiave sull'intero prompt) vengono salvate con
+        la nuova chiave: la chiave precedente garantisce il prompt attuale ma
+        non lo schema, per cui hanno impronta solo i campi presenti e validi
+        per lo schema attuale (gli altri saranno estratti di nuovo). La data
+        di modifica resta quella della voce originale, cosi' la scadenza non
+        riparte.
+        """
+        cache_key = self.chiave(identita)
+        voce = self.cache.load(cache_key, ignora_scadenza=ignora_scadenza)
+        chiave_precedente = self.cache.generate_key(identita, self.model, self.versioni.testo)
+        if voce is None and chiave_precedente != cache_key:
+            mtime = self.cache.data_modifica(chiave_precedente)
+            voce = self.cache.load(chiave_precedente, ignora_scadenza=ignora_scadenza)
+            if voce is not None and mtime is not None:
+                voce = {"dati": voce, "impronte": self.versioni.impronte_valide(voce)}
+                self.cache.save(cache_key, voce, mtime=mtime)
+        if not voce:
+            return None
+        if "dati" in voce and "impronte" in voce:
+            return voce["dati"], voce["impronte"]
+        return voce, self.versioni.impronte
 
-    def extract(self, pdf_path: str, use_cache: bool = True) -> Offerta:
+    def extract(self, pdf_path: str, use_cache: bool = True, identita: str | None = None) -> Offerta:
+        """
+        Offerta del PDF, dalla cache o dal modello. `identita` sostituisce il
+        percorso nella chiave di cache, per i file temporanei (es. hash del contenuto).
+        """
         logger.info(f"[{pdf_path}] Inizio estrazione dati con Energy Gemini")
-        cache_key = self.cache.generate_key(pdf_path, self.model, self.prompt_text)
+        identita = identita or pdf_path
+        cache_key = self.chiave(identita)
 
-        if use_cache:
-            cached_data = self.cache.load(cache_key)
-            if cached_data:
-                logger.success(f"[{pdf_path}] Dati caricati dalla cache.")
-                return Offerta(**cached_data)
-            logger.info(f"[{pdf_path}] Nessun dato in cache.")
+        if use_cache or self.offline:
+            with tracer.span("cache_lookup", pdf=pdf_path) as span:
+                # Offline anche i dati scaduti sono meglio di nessun dato
+                voce = self._leggi_voce(identita, ignora_scadenza=self.offline)
+                span.imposta(hit=voce is not None)
+            if voce:
+                dati, impronte = voce
+                campi = self.versioni.campi_cambiati(impronte)
+                if not campi:
+                    logger.success(f"[{pdf_path}] Dati caricati dalla cache.")
+                    return Offerta(**dati)
+                if self.offline:
+                    logger.warning(f"[{pdf_path}] Campi da aggiornare non estraibili offline ({', '.join(campi)}): uso la cache.")
+                    try:
+                        return Offerta(**dati)
+                    except ValidationError as e:
+                        raise OffertaNonInCache(f"[{pdf_path}] Voce di cache non valida per lo schema attuale") from e
+                logger.info(f"[{pdf_path}] Prompt o schema cambiati per: {', '.join(campi)}")
+            elif self.offline:
+                raise OffertaNonInCache(f"[{pdf_path}] Offerta non presente nella cache di estrazione")
+            else:
+                logger.info(f"[{pdf_path}] Nessun dato in cache.")
 
-        uploaded_file = self.client.files.upload(file=pdf_path)
+        # Un altro processo (o thread) puo' avere la stessa estrazione in corso:
+        # si attende il suo risultato invece di ripetere la chiamata al modello
+        with self.cache.blocca(cache_key):
+            campi, base = None, None
+            if use_cache:
+                voce = self._leggi_voce(identita)
+                if voce:
+                    base, impronte = voce
+                    campi = self.versioni.campi_cambiati(impronte)
+                    if not campi:
+                        logger.success(f"[{pdf_path}] Dati salvati in cache da un'estrazione concorrente.")
+                        return Offerta(**base)
+            return self._estrai_dal_modello(pdf_path, cache_key, campi, base)
+
+    def _estrai_dal_modello(self, pdf_path: str, cache_key: str,
+                            campi: list[str] | None = None, base: dict | None = None) -> Offerta:
+        """
+        Estrae dal PDF tutti i campi o, con `campi`, solo quelli indicati:
+        in quel caso i valori restituiti vengono uniti a `base` (la voce in cache).
+        """
+        from google.genai import types
+
+        modello = Offerta if campi is None else self.versioni.modello_parziale(campi)
+        prompt = self.versioni.testo if campi is None else self.versioni.prompt_parziale(campi)
+        with tracer.span("upload", pdf=pdf_path):
+            uploaded_file = self.client.files.upload(file=pdf_path)
         response_text = None
         try:
             parts = [
-                types.Part.from_text(text=self.prompt_text),
+                types.Part.from_text(text=prompt),
                 types.Part.from_uri(file_uri=uploaded_file.uri, mime_type=uploaded_file.mime_type)
             ]
             contents = [types.Content(role="user", parts=parts)]
 
-            response = self.client.models.generate_content(
-                model=self.model,
-                contents=contents,
-                config={
-                    "response_mime_type": "application/json",
-                    "response_json_schema": Offerta.model_json_schema()  
-                }
-            )
+            with tracer.span("modello", pdf=pdf_path, model=self.model, campi=len(campi) if campi else "tutti"):
+                response = self.client.models.generate_content(
+                    model=self.model,
+                    contents=contents,
+                    config={
+                        "response_mime_type": "application/json",
+                        "response_json_schema": modello.model_json_schema()
+                    }
+                )
             response_text = response.text
 
-            result_dict = json.loads(self._clean_text(response_text))
-            offerta = Offerta(**result_dict)
+            with tracer.span("validazione", pdf=pdf_path):
+                result_dict = json.loads(self._clean_text(response_text))
+                if campi is not None:
+                    result_dict = {**base, **modello(**result_dict).model_dump()}
+                offerta = Offerta(**result_dict)
 
-            self.cache.save(cache_key, result_dict)
-            logger.success(f"[{pdf_path}] Estrazione completata e salvata in cache.")
+            self.cache.save(cache_key, {"dati": result_dict, "impronte": self.versioni.impronte})
+            if campi is None:
+                logger.success(f"[{pdf_path}] Estrazione completata e salvata in cache.")
+            else:
+                logger.success(f"[{pdf_path}] Campi aggiornati ({', '.join(campi)}) e salvati in cache.")
             return offerta
 
         finally:
             if response_text:
-                with open("last_response.txt", "w", encoding="utf-8") as f:
-                    f.write(response_text)
+                # Ultima risposta grezza del modello per questa chiave, per il debug
+                cartella = os.path.join(self.cache.cache_dir, "risposte")
+                os.makedirs(cartella, exist_ok=True)
+                scrivi_atomico(os.path.join(cartella, f"{cache_key}.txt"), response_text)
             self.client.files.delete(name=uploaded_file.name)
 
+    def load_cached(self, pdf_paths: list[str]) -> dict[str, Offerta]:
+        """
+        Offerte gia' presenti in cache per i PDF indicati, validate in blocco.
+        Le voci non valide vengono escluse (saranno estratte di nuovo), come
+        quelle con campi da aggiornare (tranne offline, dove restano valide).
+        """
+        trovati = {}
+        with tracer.span("cache_lookup", pdf_richiesti=len(pdf_paths)) as span:
+            for pdf_path in pdf_paths:
+                voce = self._leggi_voce(pdf_path, ignora_scadenza=self.offline)
+                if voce is None:
+                    continue
+                dati, impronte = voce
+                if self.offline or not self.versioni.campi_cambiati(impronte):
+                    trovati[pdf_path] = dati
+            span.imposta(hit=len(trovati))
+
+        percorsi, dati = list(trovati), list(trovati.values())
+        try:
+            offerte = Offerta.valida_lista(dati)
+        except ValidationError as e:
+            non_validi = {errore["loc"][0] for errore in e.errors()}
+            for i in sorted(non_validi):
+                logger.warning(f"[{percorsi[i]}] Voce di cache non valida: ignorata")
+            percorsi = [p for i, p in enumerate(percorsi) if i not in non_validi]
+            offerte = Offerta.valida_lista([d for i, d in enumerate(dati) if i not in non_validi])
+        return dict(zip(percorsi, offerte))
+
     @staticmethod
     def _clean_text(raw_text: str) -> str:
         """Rimuove eventuali blocchi di Markdown``` e spazi inutili."""
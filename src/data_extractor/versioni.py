@@ -0,0 +1,119 @@
+import hashlib
+import json
+import re
+from functools import lru_cache
+
+from pydantic import BaseModel, ValidationError, create_model
+
+from src.model import Offerta
+
+# Righe di servizio del prompt (non inviate al modello):
+#   @campi: fee_offerta, fee_finita   le righe seguenti riguardano solo questi campi
+#   @comune                           le righe seguenti riguardano tutti i campi
+_ETICHETTA = re.compile(r"^@(campi:(?P<campi>.*)|comune)\s*$")
+
+
+class VersioniCampi:
+    """
+    Impronta di ogni campo estratto: testo comune del prompt, sezioni del
+    prompt dedicate al campo e definizione del campo nello schema.
+
+    Una voce di cache registra le impronte con cui e' stata prodotta; al
+    cambiare di una sezione dedicata o dello schema di un campo vanno
+    richiesti al modello solo i campi la cui impronta e' cambiata. Una
+    modifica al testo comune cambia tutte le impronte (e la chiave di cache).
+    """
+
+    def __init__(self, prompt_text: str, modello: type[BaseModel] = Offerta):
+        self.modello = modello
+        campi = list(modello.model_fields)
+        righe_testo, righe_comuni = [], []
+        sezioni: dict[str, list[str]] = {c: [] for c in campi}
+        correnti: list[str] | None = None
+        for riga in prompt_text.splitlines(keepends=True):
+            etichetta = _ETICHETTA.match(riga.strip())
+            if etichetta:
+                if etichetta.group("campi") is None:
+                    correnti = None
+                    continue
+                correnti = [c.strip() for c in etichetta.group("campi").split(",") if c.strip()]
+                sconosciuti = [c for c in correnti if c not in sezioni]
+                if sconosciuti:
+                    raise ValueError(f"Campi sconosciuti nel prompt: {sconosciuti}. Campi di {modello.__name__}: {campi}")
+                continue
+            righe_testo.append(riga)
+            if correnti is None:
+                righe_comuni.append(riga)
+            else:
+                for campo in correnti:
+                    sezioni[campo].append(riga)
+
+        # Testo inviato al modello: il prompt senza le righe di servizio
+        self.testo = "".join(righe_testo)
+        self.testo_comune = "".join(righe_comuni)
+        schema = modello.model_json_schema()
+        self.impronte = {
+            campo: self._impronta(self.testo_comune, "".join(sezioni[campo]), _schema_campo(schema, campo))
+            for campo in campi
+        }
+
+    @staticmethod
+    def _impronta(*parti) -> str:
+        payload = json.dumps(parti, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def campi_cambiati(self, impronte: dict[str, str]) -> list[str]:
+        """Campi dello schema la cui impronta differisce da quella registrata (o manca)."""
+        return [campo for campo, impronta in self.impronte.items() if impronte.get(campo) != impronta]
+
+    def impronte_valide(self, dati: dict) -> dict[str, str]:
+        """
+        Impronte attuali dei soli campi presenti in `dati` con un valore valido
+        per lo schema attuale: per gli altri non c'e' prova che la definizione
+        con cui sono stati estratti sia quella attuale.
+        """
+        impronte = {}
+        for campo, impronta in self.impronte.items():
+            if campo not in dati:
+                continue
+            try:
+                self.modello_parziale([campo])(**{campo: dati[campo]})
+            except ValidationError:
+                continue
+            impronte[campo] = impronta
+        return impronte
+
+    def prompt_parziale(self, campi: list[str]) -> str:
+        return (
+            f"{self.testo}\n\nEstrai solo i campi: {', '.join(campi)}. "
+            "Rispondi con un oggetto JSON che contiene solo queste chiavi."
+        )
+
+    def modello_parziale(self, campi: list[str]) -> type[BaseModel]:
+        return _modello_parziale(self.modello, tuple(campi))
+
+
+def _schema_campo(schema: dict, campo: str) -> dict:
+    """Definizione del campo nello schema JSON, con le definizioni a cui rimanda."""
+    definizione = schema["properties"][campo]
+    testo = json.dumps(definizione, sort_keys=True)
+    riferimenti = {nome: schema.get("$defs", {}).get(nome) for nome in re.findall(r"#/\$defs/(\w+)", testo)}
+    return {
+        "definizione": definizione,
+        "obbligatorio": campo in schema.get("required", []),
+        "riferimenti": riferimenti,
+    }
+
+
+@lru_cache(maxsize=None)
+def _modello_parziale(modello: type[BaseModel], campi: tuple[str, ...]) -> type[BaseModel]:
+    return create_model(
+        f"{modello.__name__}Parziale",
+        **{campo: (modello.model_fields[campo].annotation, modello.model_fields[campo]) for campo in campi},
+    )
+
+
+@lru_cache(maxsize=32)
+def versioni_campi(prompt_text: str, modello: type[BaseModel] = Offerta) -> VersioniCampi:
+    """Versioni condivise per prompt: gli estrattori creati per ogni PDF non rianalizzano prompt e schema."""
+    return VersioniCampi(prompt_text, modello)
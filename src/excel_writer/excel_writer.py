@@ -1,10 +1,24 @@
 import pandas as pd
-from openpyxl import load_workbook
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import PatternFill, Font, Alignment
 from openpyxl.utils import get_column_letter
 
 
+def _vuoto(value) -> bool:
+    """Valore mancante (None, NaN, NaT o pd.NA): cella vuota."""
+    return value is None or value is pd.NA or value != value
+
+
 class ExcelFormatter:
+    """
+    Scrive un DataFrame in un foglio Excel formattato in un solo passaggio.
+
+    Usa la modalita' write-only di openpyxl: le righe vengono serializzate
+    mentre sono emesse, con stili decisi a livello di colonna, per cui la
+    memoria del workbook non cresce con il numero di righe.
+    """
+
     def __init__(
         self,
         df: pd.DataFrame,
@@ -33,47 +47,75 @@ class ExcelFormatter:
         self.align_left = Alignment(horizontal="left", vertical="center")
         self.align_center = Alignment(horizontal="center", vertical="center")
 
-    def write_excel(self):
-        self.df.to_excel(self.output_path, index=False)
-
-    def format_sheet(self):
-        wb = load_workbook(self.output_path)
-        ws = wb.active
-
-        for col_idx, col in enumerate(ws.iter_cols(), start=1):
-            col_letter = get_column_letter(col_idx)
-            max_len = 0
-            header = col[0].value
-
-            # Decide colore header
-            if header in self.key_columns:
-                header_fill = self.fills["key"]
-            elif header in self.price_columns:
-                header_fill = self.fills["price"]
-            elif header == self.note_column:
-                header_fill = self.fills["note"]
+    def header_fill(self, header: str) -> PatternFill:
+        """Colore dell'intestazione in base al ruolo della colonna."""
+        if header in self.key_columns:
+            return self.fills["key"]
+        if header in self.price_columns:
+            return self.fills["price"]
+        if header == self.note_column:
+            return self.fills["note"]
+        return self.fills["other"]
+
+    def column_widths(self) -> list[int]:
+        """Larghezze delle colonne dalla lunghezza massima dei valori (vettoriale)."""
+        widths = []
+        for col in self.df.columns:
+            values = self.df[col].dropna()
+            max_len = len(str(col))
+            if len(values) > 0:
+                max_len = max(max_len, int(values.astype(str).str.len().max()))
+            widths.append(max_len + 2)
+        return widths
+
+    def _header_cells(self, ws) -> list[WriteOnlyCell]:
+        cells = []
+        for col in self.df.columns:
+            cell = WriteOnlyCell(ws, value=col)
+            cell.font = self.header_font
+            cell.fill = self.header_fill(col)
+            cell.alignment = self.align_center
+            cells.append(cell)
+        return cells
+
+    def _data_cells(self, ws) -> list[WriteOnlyCell]:
+        """Una cella stilizzata per colonna, riusata per ogni riga."""
+        cells = []
+        for col in self.df.columns:
+            cell = WriteOnlyCell(ws)
+            cell.font = self.font
+            if pd.api.types.is_numeric_dtype(self.df[col]):
+                cell.alignment = self.align_center
             else:
-                header_fill = self.fills["other"]
-
-            for row_idx, cell in enumerate(col, start=1):
-                cell.font = self.header_font if row_idx == 1 else self.font
-
-                if row_idx == 1:
-                    cell.fill = header_fill
-                    cell.alignment = self.align_center
+                cell.alignment = self.align_left
+            cells.append(cell)
+        return cells
+
+    def write_sheet(self, wb: Workbook, title: str | None = None):
+        """Aggiunge al workbook (write-only) un foglio con il DataFrame formattato."""
+        ws = wb.create_sheet(title=title or "Sheet1")
+
+        for col_idx, width in enumerate(self.column_widths(), start=1):
+            ws.column_dimensions[get_column_letter(col_idx)].width = width
+
+        ws.append(self._header_cells(ws))
+
+        # Il foglio write-only serializza ogni riga in append: le celle di
+        # colonna possono essere riutilizzate cambiando solo il valore.
+        # Le righe sono generate una alla volta, senza copiare le colonne in liste.
+        data_cells = self._data_cells(ws)
+        for values in self.df.itertuples(index=False, name=None):
+            row = []
+            for cell, value in zip(data_cells, values):
+                if _vuoto(value):
+                    row.append(None)
                 else:
-                    if isinstance(cell.value, (int, float)):
-                        cell.alignment = self.align_center
-                    else:
-                        cell.alignment = self.align_left
-
-                if cell.value is not None:
-                    max_len = max(max_len, len(str(cell.value)))
-
-            ws.column_dimensions[col_letter].width = max_len + 2
-
-        wb.save(self.output_path)
+                    cell.value = value
+                    row.append(cell)
+            ws.append(row)
+        return ws
 
     def run(self):
-        self.write_excel()
-        self.format_sheet()
+        wb = Workbook(write_only=True)
+        self.write_sheet(wb)
+        wb.save(self.output_path)
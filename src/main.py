@@ -1,19 +1,53 @@
+from __future__ import annotations
+
 import os
 import argparse
 import sys
-import pandas as pd
+import threading
+from typing import TYPE_CHECKING
 from loguru import logger
 
-from src.model import DatiPrezzo, Offerta
-from .data_extractor.extractor import EnergyGeminiExtractor
-from .excel_writer.excel_writer import ExcelFormatter
+from src.model import ColonneRecord, DatiPrezzo, Offerta
+from .data_extractor.extractor import EnergyGeminiExtractor, OffertaNonInCache
 from .prezzo.prezzo_luce import PrezzoLuce
 from .prezzo.prezzo_gas import PrezzoGas
+from .prezzo.cache import CachePrezzi
 from .config import config
+from .tracing import tracer
+from .pipeline import PipelineForniture
+
+# pandas, openpyxl, pyarrow e google.genai vengono importati solo dalle fasi
+# che li usano: l'avvio e le esecuzioni offline non ne pagano il costo.
+if TYPE_CHECKING:
+    import pandas as pd
+
 # Configura logger
 logger.remove()
 logger.add(sys.stdout, level="INFO")
 
+CALCOLATORI = {
+    "luce": PrezzoLuce,
+    "gas": PrezzoGas,
+}
+# Serie storica dell'indice di ogni fornitura, per il backtest
+SERIE_INDICE = {
+    "luce": "SERIE_PUN_FILE",
+    "gas": "SERIE_PSV_FILE",
+}
+# Chiavi di output.sinks.SINKS, senza importare i sink all'avvio
+FORMATI_OUTPUT = ("excel", "parquet", "csv", "jsonl")
+_cache_prezzi: CachePrezzi | None = None
+_cache_prezzi_lock = threading.Lock()
+
+
+def get_cache_prezzi() -> CachePrezzi:
+    """Restituisce la cache prezzi condivisa, creandola al primo utilizzo."""
+    global _cache_prezzi
+    with _cache_prezzi_lock:
+        if _cache_prezzi is None:
+            _cache_prezzi = CachePrezzi(config.get("CACHE_DIR"))
+    return _cache_prezzi
+
 
 def parse_arguments():
     """Parsa gli argomenti della riga di comando."""
@@ -21,7 +55,7 @@ def parse_arguments():
     parser.add_argument(
         "--no-cache",
         action="store_true",
-        help="Disabilita l'uso della cache durante l'estrazione"
+        help="Disabilita l'uso della cache durante l'estrazione e il calcolo prezzi"
     )
     parser.add_argument(
         "--fornitura",
@@ -34,8 +68,81 @@ def parse_arguments():
         default=None,
         help="Nome dell'offerta specifica da elaborare"
     )
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="Solo calcolo prezzi: legge le offerte dalla cache di estrazione senza contattare Gemini"
+    )
+    parser.add_argument(
+        "--orizzonte",
+        type=int,
+        default=None,
+        help="Orizzonte in mesi per il costo complessivo del contratto (default: orizzonte_mesi della configurazione)"
+    )
+    parser.add_argument(
+        "--backtest",
+        type=int,
+        default=None,
+        metavar="MESI",
+        help="Aggiunge il costo storico degli ultimi MESI mesi sulle serie SERIE_PUN_FILE/SERIE_PSV_FILE"
+    )
+    parser.add_argument(
+        "--output-format",
+        nargs="+",
+        choices=FORMATI_OUTPUT,
+        default=["excel"],
+        help="Formati di output dei risultati (anche piu' di uno)"
+    )
+    parser.add_argument(
+        "--consolidato",
+        action="store_true",
+        help="Scrive un unico file Excel con fogli luce, gas e riepilogo al posto dei file Excel per fornitura"
+    )
+    parser.add_argument(
+        "--bundle",
+        type=int,
+        nargs="?",
+        const=5,
+        default=None,
+        metavar="K",
+        help="Scrive le K (default 5) migliori combinazioni luce + gas per scenario, con gli sconti di REGOLE_BUNDLE_FILE"
+    )
+    parser.add_argument(
+        "--storico",
+        action="store_true",
+        help="Aggiunge i risultati dell'esecuzione all'archivio storico (STORICO_DB)"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Numero di estrazioni in parallelo per fornitura (default: ESTRAZIONE_WORKERS)"
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Resta attivo e rielabora solo i PDF nuovi o modificati nelle cartelle delle offerte"
+    )
+    parser.add_argument(
+        "--watch-intervallo",
+        type=float,
+        default=2.0,
+        help="Secondi tra due controlli delle cartelle in modalita' watch"
+    )
+    parser.add_argument(
+        "--trace",
+        type=str,
+        default=None,
+        help="Abilita la misura dei tempi per fase e salva la traccia (formato Chrome trace) nel file indicato"
+    )
         
     args = parser.parse_args()
+    if args.backtest is not None and args.backtest < 1:
+        parser.error("--backtest richiede almeno un mese")
+    if args.bundle is not None and (args.bundle < 1 or args.fornitura != "all"):
+        parser.error("--bundle richiede entrambe le forniture (--fornitura all) e almeno una combinazione")
+    if args.offline and args.no_cache:
+        parser.error("--offline legge le offerte dalla cache: non e' compatibile con --no-cache")
     return args
 
 def validate_folder(use_cache: bool, fornitura: str) -> (dict, str):
@@ -71,40 +178,42 @@ def validate_folder(use_cache: bool, fornitura: str) -> (dict, str):
     os.makedirs(output_folder, exist_ok=True)
     return cartelle, output_folder
 
-def extract_data(pdf_path: str, prompt_text: str, use_cache: bool = True) -> Offerta | None:
-    """Estrae i dati da un PDF utilizzando EnergyGeminiExtractor."""
+def extract_data(pdf_path: str, prompt_text: str, use_cache: bool = True, offline: bool = False,
+                 identita: str | None = None) -> Offerta | None:
+    """
+    Estrae i dati da un PDF utilizzando EnergyGeminiExtractor.
+    In modalita' offline restituisce None per i PDF non presenti in cache.
+    `identita` sostituisce il percorso nella chiave della cache di estrazione.
+    """
 
-    extractor = EnergyGeminiExtractor(model=config.get("GENAI_MODEL"), prompt_text=prompt_text)
+    extractor = EnergyGeminiExtractor(model=config.get("GENAI_MODEL"), prompt_text=prompt_text, offline=offline)
     try:
-        dati_offerta: Offerta = extractor.extract(pdf_path, use_cache=use_cache)
+        dati_offerta: Offerta = extractor.extract(pdf_path, use_cache=use_cache, identita=identita)
         if dati_offerta is None:
             raise ValueError("Nessun dato estratto dal PDF")
+    except OffertaNonInCache as e:
+        logger.warning(f"{e}: file saltato (offline)")
+        return None
     except Exception as e:
         logger.error(f"[{pdf_path}] Errore durante l'estrazione: {e}")
         raise e
     df_dati_offerta = dati_offerta
     return df_dati_offerta
 
-def compute_price(dati: pd.DataFrame, tipo: str) -> DatiPrezzo | None:
+def compute_price(dati: Offerta, tipo: str, use_cache: bool = True) -> DatiPrezzo | None:
     """Calcola i prezzi in base al tipo di fornitura."""
     try:
-        if tipo == "luce":
-            result: DatiPrezzo = PrezzoLuce(dati).calcola_tutto()
-        elif tipo == "gas":
-            result: DatiPrezzo = PrezzoGas(dati).calcola_tutto()
-        else:
+        if tipo not in CALCOLATORI:
             raise ValueError(f"Tipo sconosciuto: {tipo}")
-        result = result
+        with tracer.span("prezzi", tipo=tipo, offerta=dati.nome_offerta):
+            result: DatiPrezzo = get_cache_prezzi().calcola(CALCOLATORI[tipo], dati, use_cache=use_cache)
         return result
     except Exception as e:
         logger.error(f"Errore durante il calcolo dei prezzi: {e}")
         raise e
 
-def process_file(pdf_path: str, tipo: str, use_cache: bool = True) -> pd.DataFrame | None:
-    """
-    Estrae i dati da un PDF e calcola i prezzi in base al tipo ('luce' o 'gas').
-    Restituisce il DataFrame finale.
-    """
+def read_prompt(tipo: str) -> str | None:
+    """Legge il prompt di estrazione per il tipo di fornitura."""
     if tipo == "luce":
         prompt_text_path = config.get("PROMPT_LUCE_FILE")
     elif tipo == "gas":
@@ -112,74 +221,170 @@ def process_file(pdf_path: str, tipo: str, use_cache: bool = True) -> pd.DataFra
     else:
         logger.error(f"Tipo sconosciuto: {tipo}")
         return None
-    with open(prompt_text_path, "r", encoding="utf-8") as f:
-        prompt_text = f.read()
+    with tracer.span("prompt", path=prompt_text_path):
+        with open(prompt_text_path, "r", encoding="utf-8") as f:
+            return f.read()
 
-    dati_offerta = extract_data(pdf_path, prompt_text=prompt_text, use_cache=use_cache)
-    if dati_offerta is None:
-        return None
-    else:
-        df_dati_offerta = dati_offerta.to_dataframe()
-    result = compute_price(dati_offerta, tipo)
+def build_record(dati_offerta: Offerta, tipo: str, use_cache: bool = True) -> tuple[Offerta, DatiPrezzo] | None:
+    """Calcola i prezzi di un'offerta e restituisce il record di output (offerta, prezzi)."""
+    result = compute_price(dati_offerta, tipo, use_cache=use_cache)
     if result is None:
         return None
-    result_df = result.to_dataframe()
-    df_dati_offerta = df_dati_offerta.merge(result_df, 
-                                            on=["nome_offerta", "gestore"],
-                                            how="left")
+    return dati_offerta, result
 
-    return df_dati_offerta
+def build_dataframe(records: list[tuple[Offerta, DatiPrezzo]]) -> pd.DataFrame:
+    """Un unico DataFrame (dati offerta + prezzi) dai record, accumulati per colonna."""
+    return ColonneRecord(Offerta, DatiPrezzo).estendi(records).to_dataframe()
+
+def load_cached_offers(file_per_tipo: dict[str, list[str]], prompts: dict[str, str], offline: bool = False) -> dict[str, Offerta]:
+    """Offerte gia' in cache di estrazione per tutti i PDF, validate in blocco per fornitura."""
+    offerte = {}
+    for tipo, percorsi in file_per_tipo.items():
+        extractor = EnergyGeminiExtractor(model=config.get("GENAI_MODEL"), prompt_text=prompts[tipo], offline=offline)
+        offerte.update(extractor.load_cached(percorsi))
+    return offerte
+
+def aggiungi_backtest(df: pd.DataFrame, offerte: list[Offerta], tipo: str, mesi: int) -> pd.DataFrame:
+    """Aggiunge a df le colonne del costo storico, se la serie dell'indice e' configurata."""
+    from .prezzo.backtest import SerieMensile, aggiungi_costi_storici
+    path = config.get(SERIE_INDICE[tipo])
+    if not path:
+        logger.warning(f"{SERIE_INDICE[tipo]} non configurato: backtest {tipo} saltato")
+        return df
+    with tracer.span("backtest", tipo=tipo, offerte=len(offerte), mesi=mesi):
+        serie = SerieMensile.da_file(path, config.get("CACHE_DIR"))
+        return aggiungi_costi_storici(df, offerte, CALCOLATORI[tipo], serie, mesi)
 
-def build_output_dataframe(df: pd.DataFrame,output_folder: str, output_file: str) -> None:
-    """Costruisce il DataFrame di output e lo salva in un file Excel."""
+def build_output_dataframe(df: pd.DataFrame, output_folder: str, tipo: str, formati: list[str] = ("excel",)) -> pd.DataFrame:
+    """Costruisce il DataFrame di output e lo salva nei formati richiesti."""
+    from .output.abc import prepara_dataframe
+    from .output.sinks import SINKS
     try:
-        final_df = df
-        output_path = os.path.join(output_folder, output_file)
-        offerta_cols = ["nome_offerta", "gestore"]
-        prezzo_cols = ["prezzo_offerta_mensile", "prezzo_finita_medio_mensile", "prezzo_finita_peggiore_mensile"]
-        note_cols  = ["note"]
-        ordered_cols = offerta_cols + prezzo_cols  + [col for col in final_df.columns if col not in offerta_cols + prezzo_cols + note_cols] + note_cols
-        final_df = final_df[ordered_cols]
-        final_df = final_df.sort_values(by=offerta_cols).reset_index(drop=True)
-        ExcelFormatter(df=final_df, 
-                       output_path=output_path,
-                       key_columns=offerta_cols,
-                       price_columns=prezzo_cols,
-                       note_column="note"
-                       ).run()
-        logger.info(f"Tutti i risultati salvati in {output_path}")
+        final_df = prepara_dataframe(df)
+        for formato in formati:
+            sink = SINKS[formato](output_folder, tipo)
+            with tracer.span(formato, path=sink.output_path, righe=len(final_df)):
+                output_path = sink.scrivi(final_df)
+            logger.info(f"Tutti i risultati salvati in {output_path}")
+        return final_df
     except Exception as e:
-        logger.error(f"Errore durante il salvataggio in Excel: {e}")
+        logger.error(f"Errore durante il salvataggio dei risultati: {e}")
+        raise e
+
+
+def build_output_consolidato(risultati: dict[str, pd.DataFrame], output_folder: str) -> None:
+    """Salva tutte le forniture e il riepilogo in un unico file Excel."""
+    from .output.consolidato import scrivi_confronto
+    try:
+        righe = sum(len(df) for df in risultati.values())
+        with tracer.span("excel", consolidato=True, righe=righe):
+            output_path = scrivi_confronto(risultati, output_folder)
+        logger.info(f"Confronto consolidato salvato in {output_path}")
+    except Exception as e:
+        logger.error(f"Errore durante il salvataggio del confronto consolidato: {e}")
+        raise e
+
+def build_output_bundle(risultati: dict[str, pd.DataFrame], output_folder: str, k: int) -> None:
+    """Salva le migliori combinazioni luce + gas per scenario."""
+    from .output.bundle import scrivi_bundle
+    from .prezzo.bundle import OttimizzatoreBundle, RegoleBundle
+    try:
+        regole = RegoleBundle.da_file(config.get("REGOLE_BUNDLE_FILE"))
+        with tracer.span("bundle", luce=len(risultati["luce"]), gas=len(risultati["gas"]), k=k):
+            combinazioni = OttimizzatoreBundle(risultati["luce"], risultati["gas"], regole).tutte(k)
+            output_path = scrivi_bundle(combinazioni, output_folder)
+        logger.info(f"Combinazioni luce + gas salvate in {output_path}")
+    except Exception as e:
+        logger.error(f"Errore durante il calcolo delle combinazioni luce + gas: {e}")
         raise e
 
 def main():
     
     args = parse_arguments()
+    if args.trace:
+        tracer.abilita()
+    # I valori predefiniti dalla configurazione si leggono solo ora, cosi'
+    # con --trace anche il caricamento della configurazione viene registrato
+    if args.orizzonte is None:
+        args.orizzonte = config.get("orizzonte_mesi")
+    if args.workers is None:
+        args.workers = config.get("ESTRAZIONE_WORKERS")
 
     use_cache = not args.no_cache
     fornitura = args.fornitura
     offerta_filtro = args.offerta
     cartelle, output_folder = validate_folder(use_cache, fornitura)
-    
+    formati = [f for f in args.output_format if not (args.consolidato and f == "excel")]
+
+    def includi(pdf_file: str) -> bool:
+        return offerta_filtro is None or offerta_filtro.lower() == pdf_file.lower()
+
+    file_per_tipo = {}
     for tipo, folder in cartelle.items():
-        logger.info(f"Elaborazione offerte per: {tipo.upper()}")
         pdf_files = [f for f in os.listdir(folder) if f.lower().endswith(".pdf")]
-        all_dfs = []
+        file_per_tipo[tipo] = []
         for pdf_file in pdf_files:
-            if offerta_filtro is not None and offerta_filtro.lower() != pdf_file.lower():
+            if not includi(pdf_file):
                 logger.info(f"Saltando file (filtro offerta): {pdf_file}")
                 continue
-            pdf_path = os.path.join(folder, pdf_file)
-            logger.info(f"Elaborazione file: {pdf_path}")
-            df = process_file(pdf_path, tipo, use_cache=use_cache)
-            if df is not None:
-                all_dfs.append(df)
-
-        if len(all_dfs) > 0:
-            all_dfs = pd.concat(all_dfs, ignore_index=True)
-            output_file = f"risultati_prezzi_{tipo}.xlsx"
-            build_output_dataframe(all_dfs, output_folder, output_file)
-        logger.success(f"Elaborazione completata per: {tipo.upper()}")
+            file_per_tipo[tipo].append(os.path.join(folder, pdf_file))
+
+    prompts = {tipo: read_prompt(tipo) for tipo in file_per_tipo}
+    offerte_in_cache = load_cached_offers(file_per_tipo, prompts, args.offline) if use_cache else {}
+
+    def estrai(tipo: str, pdf_path: str) -> Offerta | None:
+        logger.info(f"Elaborazione file: {pdf_path}")
+        # Le offerte lette in blocco all'avvio valgono solo per il primo passaggio (watch)
+        offerta = offerte_in_cache.pop(pdf_path, None)
+        if offerta is not None:
+            return offerta
+        return extract_data(pdf_path, prompt_text=prompts[tipo], use_cache=use_cache, offline=args.offline)
+
+    def prezza(tipo: str, dati_offerta: Offerta) -> tuple[Offerta, DatiPrezzo] | None:
+        return build_record(dati_offerta, tipo, use_cache=use_cache)
+
+    def concludi(tipo: str, righe: list[tuple[Offerta, DatiPrezzo]]) -> pd.DataFrame:
+        from .prezzo.orizzonte import aggiungi_costi_orizzonte
+        df = aggiungi_costi_orizzonte(build_dataframe(righe), args.orizzonte)
+        if args.backtest:
+            df = aggiungi_backtest(df, [offerta for offerta, _ in righe], tipo, args.backtest)
+        return build_output_dataframe(df, output_folder, tipo, formati)
+
+    def al_termine(risultati: dict[str, pd.DataFrame]):
+        if args.consolidato and risultati:
+            build_output_consolidato(risultati, output_folder)
+
+        if args.bundle and {"luce", "gas"} <= risultati.keys():
+            build_output_bundle(risultati, output_folder, args.bundle)
+
+        if args.storico and risultati:
+            from .storico.store import StoricoRisultati
+            with tracer.span("storico"):
+                StoricoRisultati(config.get("STORICO_DB")).registra_esecuzione(
+                    risultati, config.impronta(), argomenti=vars(args)
+                )
+
+    if args.offline:
+        logger.info("Modalita' OFFLINE: offerte lette dalla cache di estrazione")
+
+    if args.watch:
+        from .watch import ModalitaWatch
+        logger.info(f"Modalita' watch su: {', '.join(cartelle.values())}")
+        ModalitaWatch(cartelle, estrai, prezza, concludi,
+                      al_termine=al_termine,
+                      ricarica=config.ricarica,
+                      filtro=includi,
+                      intervallo=args.watch_intervallo,
+                      workers=args.workers,
+                      ).esegui()
+    else:
+        pipeline = PipelineForniture(estrai, prezza, concludi, workers=args.workers)
+        al_termine(pipeline.esegui(file_per_tipo))
+
+    if args.trace:
+        tracer.esporta_chrome_trace(args.trace)
+        logger.info(f"Tempi per fase:\n{tracer.tabella_riepilogo()}")
+        logger.info(f"Traccia salvata in {args.trace}")
 
 
 if __name__ == "__main__":
@@ -1,14 +1,62 @@
-from typing import Optional
-from pydantic import BaseModel, Field
-import pandas as pd
+from functools import lru_cache
+from typing import Optional, TYPE_CHECKING
+from pydantic import BaseModel, Field, TypeAdapter
 from enum import Enum
 
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+@lru_cache(maxsize=None)
+def _adattatore_lista(modello: type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(list[modello])
+
+
 class DfDict(BaseModel):
     def to_dict(self) -> dict:
-        return self.dict()
+        return self.model_dump()
+
+    def to_dataframe(self) -> "pd.DataFrame":
+        return ColonneRecord(type(self)).aggiungi(self).to_dataframe()
+
+    @classmethod
+    def valida_lista(cls, dati: list[dict]) -> list["DfDict"]:
+        """Valida una lista di dict in un'unica chiamata (es. voci della cache)."""
+        return _adattatore_lista(cls).validate_python(dati)
+
+
+class ColonneRecord:
+    """
+    Accumulatore colonnare di record: una lista per campo invece di un dict
+    (o un DataFrame) per riga. Il DataFrame viene costruito una sola volta
+    alla fine.
+
+    I record sono formati da istanze dei modelli indicati; a parita' di
+    campo vale l'ultima istanza, come in {**a.model_dump(), **b.model_dump()}.
+    """
+
+    def __init__(self, *modelli: type[BaseModel]):
+        self._campi = [list(modello.model_fields) for modello in modelli]
+        self.colonne: dict[str, list] = {c: [] for campi in self._campi for c in campi}
+        # Campo -> indice dell'istanza che lo fornisce (l'ultima che lo definisce)
+        self._sorgente = {c: i for i, campi in enumerate(self._campi) for c in campi}
+
+    def aggiungi(self, *istanze: BaseModel) -> "ColonneRecord":
+        for campo, valori in self.colonne.items():
+            valori.append(getattr(istanze[self._sorgente[campo]], campo))
+        return self
+
+    def estendi(self, record) -> "ColonneRecord":
+        for istanze in record:
+            self.aggiungi(*istanze)
+        return self
+
+    def __len__(self) -> int:
+        return len(next(iter(self.colonne.values()), []))
 
-    def to_dataframe(self) -> pd.DataFrame:
-        return pd.DataFrame([self.to_dict()])
+    def to_dataframe(self) -> "pd.DataFrame":
+        import pandas as pd
+        return pd.DataFrame(self.colonne)
 
 
 class Offerta(DfDict):
@@ -0,0 +1,46 @@
+import os
+import pandas as pd
+from abc import ABC, abstractmethod
+
+
+OFFERTA_COLS = ["nome_offerta", "gestore"]
+PREZZO_COLS = ["prezzo_offerta_mensile", "prezzo_finita_medio_mensile", "prezzo_finita_peggiore_mensile"]
+NOTE_COLS = ["note"]
+
+
+def colonne_prezzo(df: pd.DataFrame) -> list[str]:
+    """Colonne di prezzo: scenari mensili seguiti dai costi sull'orizzonte."""
+    return PREZZO_COLS + [col for col in df.columns if col.startswith("costo_")]
+
+
+def prepara_dataframe(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Ordina le colonne (offerta, prezzi, altre colonne, note) e le righe
+    per offerta: l'ordinamento e' lo stesso per tutti i formati di output.
+    """
+    prezzo_cols = colonne_prezzo(df)
+    ordered_cols = (
+        OFFERTA_COLS + prezzo_cols
+        + [col for col in df.columns if col not in OFFERTA_COLS + prezzo_cols + NOTE_COLS]
+        + NOTE_COLS
+    )
+    return df[ordered_cols].sort_values(by=OFFERTA_COLS).reset_index(drop=True)
+
+
+class ABCSink(ABC):
+    """Destinazione dei risultati di una fornitura in un formato di file."""
+
+    ESTENSIONE: str = ""
+
+    def __init__(self, output_folder: str, tipo: str):
+        self.output_folder = output_folder
+        self.tipo = tipo
+
+    @property
+    def output_path(self) -> str:
+        return os.path.join(self.output_folder, f"risultati_prezzi_{self.tipo}.{self.ESTENSIONE}")
+
+    @abstractmethod
+    def scrivi(self, df: pd.DataFrame) -> str:
+        """Scrive il DataFrame gia' preparato e restituisce il percorso del file."""
+        ...
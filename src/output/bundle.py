@@ -0,0 +1,19 @@
+import os
+
+import pandas as pd
+
+from ..excel_writer.excel_writer import ExcelFormatter
+
+BUNDLE_KEY_COLS = ["scenario", "posizione"]
+BUNDLE_PREZZO_COLS = ["prezzo_luce", "prezzo_gas", "sconto", "totale"]
+
+
+def scrivi_bundle(df: pd.DataFrame, output_folder: str, output_file: str = "risultati_bundle.xlsx") -> str:
+    """Scrive le migliori combinazioni luce + gas per scenario."""
+    output_path = os.path.join(output_folder, output_file)
+    ExcelFormatter(df=df,
+                   output_path=output_path,
+                   key_columns=BUNDLE_KEY_COLS,
+                   price_columns=BUNDLE_PREZZO_COLS,
+                   ).run()
+    return output_path
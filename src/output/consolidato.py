@@ -0,0 +1,62 @@
+import os
+import pandas as pd
+from openpyxl import Workbook
+
+from .abc import OFFERTA_COLS, NOTE_COLS, colonne_prezzo
+from ..excel_writer.excel_writer import ExcelFormatter
+
+
+RIEPILOGO_KEY_COLS = ["fornitura", "scenario"]
+RIEPILOGO_PREZZO_COLS = ["prezzo", "mediana", "scarto_mediana", "scarto_mediana_percent"]
+
+
+def costruisci_riepilogo(risultati: dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """
+    Per ogni fornitura e scenario di prezzo: offerta migliore, mediana delle
+    offerte e scarto della migliore rispetto alla mediana.
+    """
+    righe = []
+    for tipo, df in risultati.items():
+        for scenario in colonne_prezzo(df):
+            prezzi = pd.to_numeric(df[scenario], errors="coerce")
+            if prezzi.notna().sum() == 0:
+                continue
+            migliore = prezzi.idxmin()
+            prezzo = prezzi[migliore]
+            mediana = prezzi.median()
+            righe.append({
+                "fornitura": tipo,
+                "scenario": scenario,
+                "nome_offerta": df.at[migliore, "nome_offerta"],
+                "gestore": df.at[migliore, "gestore"],
+                "prezzo": prezzo,
+                "mediana": round(mediana, 2),
+                "scarto_mediana": round(prezzo - mediana, 2),
+                "scarto_mediana_percent": round((prezzo - mediana) / mediana * 100, 2) if mediana else None,
+            })
+    return pd.DataFrame(righe, columns=RIEPILOGO_KEY_COLS + OFFERTA_COLS + RIEPILOGO_PREZZO_COLS)
+
+
+def scrivi_confronto(risultati: dict[str, pd.DataFrame], output_folder: str,
+                     output_file: str = "confronto_offerte.xlsx") -> str:
+    """
+    Scrive un unico workbook con un foglio per fornitura e un foglio di
+    riepilogo, in un solo passaggio di scrittura.
+    """
+    output_path = os.path.join(output_folder, output_file)
+    wb = Workbook(write_only=True)
+    for tipo, df in risultati.items():
+        ExcelFormatter(df=df,
+                       output_path=output_path,
+                       key_columns=OFFERTA_COLS,
+                       price_columns=colonne_prezzo(df),
+                       note_column=NOTE_COLS[0]
+                       ).write_sheet(wb, title=tipo)
+
+    ExcelFormatter(df=costruisci_riepilogo(risultati),
+                   output_path=output_path,
+                   key_columns=RIEPILOGO_KEY_COLS,
+                   price_columns=RIEPILOGO_PREZZO_COLS,
+                   ).write_sheet(wb, title="riepilogo")
+    wb.save(output_path)
+    return output_path
@@ -0,0 +1,63 @@
+import pandas as pd
+
+from .abc import ABCSink, OFFERTA_COLS, NOTE_COLS, colonne_prezzo
+from ..excel_writer.excel_writer import ExcelFormatter
+
+
+class ExcelSink(ABCSink):
+    ESTENSIONE = "xlsx"
+
+    def scrivi(self, df: pd.DataFrame) -> str:
+        ExcelFormatter(df=df,
+                       output_path=self.output_path,
+                       key_columns=OFFERTA_COLS,
+                       price_columns=colonne_prezzo(df),
+                       note_column=NOTE_COLS[0]
+                       ).run()
+        return self.output_path
+
+
+class ParquetSink(ABCSink):
+    ESTENSIONE = "parquet"
+    COLONNE_CATEGORICHE = ["nome_offerta", "gestore", "tipologia_formula_offerta", "tipologia_formula_finita"]
+    COLONNE_INTERE = ["durata_mesi"]
+
+    def tipizza(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Converte le colonne nei tipi adatti a un formato colonnare."""
+        tipi = {col: "category" for col in self.COLONNE_CATEGORICHE if col in df}
+        tipi.update({col: "Int64" for col in self.COLONNE_INTERE if col in df})
+        return df.astype(tipi)
+
+    def scrivi(self, df: pd.DataFrame) -> str:
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError as e:
+            raise ImportError(
+                "Il formato parquet richiede pyarrow: pip install -e '.[parquet]'"
+            ) from e
+        self.tipizza(df).to_parquet(self.output_path, index=False)
+        return self.output_path
+
+
+class CsvSink(ABCSink):
+    ESTENSIONE = "csv"
+
+    def scrivi(self, df: pd.DataFrame) -> str:
+        df.to_csv(self.output_path, index=False, encoding="utf-8")
+        return self.output_path
+
+
+class JsonLinesSink(ABCSink):
+    ESTENSIONE = "jsonl"
+
+    def scrivi(self, df: pd.DataFrame) -> str:
+        df.to_json(self.output_path, orient="records", lines=True, force_ascii=False)
+        return self.output_path
+
+
+SINKS: dict[str, type[ABCSink]] = {
+    "excel": ExcelSink,
+    "parquet": ParquetSink,
+    "csv": CsvSink,
+    "jsonl": JsonLinesSink,
+}
@@ -0,0 +1,144 @@
+import threading
+from queue import Queue, Empty, Full
+from typing import Any, Callable
+
+from loguru import logger
+
+from src.model import DatiPrezzo, Offerta
+
+# Riga di risultato della fase prezzi: offerta e prezzi calcolati
+Riga = tuple[Offerta, DatiPrezzo]
+_FINE = object()
+
+
+class PipelineInterrotta(Exception):
+    """Una fase della pipeline e' fallita: le altre vengono fermate."""
+
+
+class PipelineForniture:
+    """
+    Pipeline produttore/consumatore: estrazione -> prezzi -> output.
+
+    Ogni fornitura ha i propri thread: `workers` estrattori alimentano una
+    coda limitata letta dalla fase prezzi, che a sua volta alimenta la fase
+    di raccolta. Estrazione e prezzi si sovrappongono; l'output no: la
+    raccolta accumula le righe della fornitura e invoca `concludi` (costi di
+    orizzonte e scrittura dei file, che richiedono tutte le righe) una sola
+    volta, quando il suo flusso termina, mentre le altre forniture possono
+    essere ancora in corso. Le code limitate danno contropressione tra
+    estrazione e prezzi: non piu' di `dimensione_coda` offerte in attesa.
+
+    Alla prima eccezione in una qualsiasi fase tutte le fasi si fermano e
+    l'eccezione viene rilanciata da esegui().
+    """
+
+    def __init__(
+        self,
+        estrai: Callable[[str, str], Offerta | None],
+        prezza: Callable[[str, Offerta], Riga | None],
+        concludi: Callable[[str, list[Riga]], Any],
+        workers: int = 4,
+        dimensione_coda: int = 16,
+    ):
+        self.estrai = estrai
+        self.prezza = prezza
+        self.concludi = concludi
+        self.workers = max(1, workers)
+        self.dimensione_coda = dimensione_coda
+        self._stop = threading.Event()
+        self._errori: list[BaseException] = []
+
+    def _put(self, coda: Queue, elemento):
+        while not self._stop.is_set():
+            try:
+                coda.put(elemento, timeout=0.1)
+                return
+            except Full:
+                continue
+        raise PipelineInterrotta()
+
+    def _get(self, coda: Queue):
+        while not self._stop.is_set():
+            try:
+                return coda.get(timeout=0.1)
+            except Empty:
+                continue
+        raise PipelineInterrotta()
+
+    def _fase(self, funzione, *args):
+        """Esegue una fase registrando il primo errore e fermando le altre."""
+        try:
+            funzione(*args)
+        except PipelineInterrotta:
+            pass
+        except BaseException as e:
+            self._errori.append(e)
+            self._stop.set()
+
+    def _estrattore(self, tipo: str, percorsi: list[str], lock: threading.Lock,
+                    attivi: list[int], coda_offerte: Queue):
+        try:
+            while True:
+                with lock:
+                    if not percorsi:
+                        break
+                    pdf_path = percorsi.pop()
+                offerta = self.estrai(tipo, pdf_path)
+                if offerta is not None:
+                    self._put(coda_offerte, offerta)
+        finally:
+            with lock:
+                attivi[0] -= 1
+                ultimo = attivi[0] == 0
+            if ultimo and not self._stop.is_set():
+                self._put(coda_offerte, _FINE)
+
+    def _prezzatore(self, tipo: str, coda_offerte: Queue, coda_righe: Queue):
+        while (offerta := self._get(coda_offerte)) is not _FINE:
+            riga = self.prezza(tipo, offerta)
+            if riga is not None:
+                self._put(coda_righe, riga)
+        self._put(coda_righe, _FINE)
+
+    def _raccoglitore(self, tipo: str, coda_righe: Queue, risultati: dict):
+        righe = []
+        while (riga := self._get(coda_righe)) is not _FINE:
+            righe.append(riga)
+        if righe:
+            risultati[tipo] = self.concludi(tipo, righe)
+        logger.success(f"Elaborazione completata per: {tipo.upper()}")
+
+    def esegui(self, file_per_tipo: dict[str, list[str]]) -> dict[str, Any]:
+        """Elabora in parallelo tutte le forniture; restituisce l'esito di concludi per tipo."""
+        risultati: dict[str, Any] = {}
+        threads = []
+        for tipo, percorsi in file_per_tipo.items():
+            logger.info(f"Elaborazione offerte per: {tipo.upper()}")
+            percorsi = list(reversed(percorsi))
+            coda_offerte = Queue(maxsize=self.dimensione_coda)
+            coda_righe = Queue(maxsize=self.dimensione_coda)
+            n_estrattori = min(self.workers, len(percorsi)) or 1
+            lock, attivi = threading.Lock(), [n_estrattori]
+
+            for i in range(n_estrattori):
+                threads.append(threading.Thread(
+                    target=self._fase, name=f"estrazione-{tipo}-{i}",
+                    args=(self._estrattore, tipo, percorsi, lock, attivi, coda_offerte),
+                ))
+            threads.append(threading.Thread(
+                target=self._fase, name=f"prezzi-{tipo}",
+                args=(self._prezzatore, tipo, coda_offerte, coda_righe),
+            ))
+            threads.append(threading.Thread(
+                target=self._fase, name=f"output-{tipo}",
+                args=(self._raccoglitore, tipo, coda_righe, risultati),
+            ))
+
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        if self._errori:
+            raise self._errori[0]
+        return {tipo: risultati[tipo] for tipo in file_per_tipo if tipo in risultati}
@@ -1,13 +1,36 @@
-import pandas as pd
+import hashlib
+import json
 from abc import ABC, abstractmethod
 from enum import Enum
 
-from src.model import DatiPrezzo, TipoFormula
+from src.model import DatiPrezzo, Offerta, TipoFormula
+from ..config import Config, config as config_predefinito
 
 
 class ABCPrice(ABC):
-    def __init__(self, offerta_energia: DatiPrezzo):
+    # Chiavi di configurazione (profilo utente e coefficienti di mercato)
+    # lette dal calcolatore: determinano l'impronta usata dalla cache prezzi.
+    CHIAVI_CONFIG: tuple[str, ...] = ()
+    # Da incrementare quando cambia la formula di calcolo.
+    VERSIONE_CALCOLO = "1"
+
+    def __init__(self, offerta_energia: DatiPrezzo, config: Config | None = None):
         self.offerta_energia = offerta_energia
+        # Configurazione alternativa (es. profilo di una richiesta al servizio)
+        self.config = config if config is not None else config_predefinito
+
+    @classmethod
+    def impronta_config(cls, config: Config | None = None) -> str:
+        """Impronta dei soli parametri di configurazione usati dal calcolatore."""
+        config = config if config is not None else config_predefinito
+        valori = config.impostazioni.valori(cls.CHIAVI_CONFIG)
+        payload = json.dumps([cls.__name__, cls.VERSIONE_CALCOLO, valori, cls.impronta_dati(config)], sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    @classmethod
+    def impronta_dati(cls, config: Config) -> str:
+        """Impronta delle tabelle esterne (es. tariffe di rete) usate dal calcolatore."""
+        return ""
 
     @abstractmethod
     def calcola_prezzo_offerta(self) -> float:
@@ -18,6 +41,30 @@ class ABCPrice(ABC):
     @abstractmethod
     def calcola_prezzo_finita_peggiore(self) -> float:
         ...
+    @abstractmethod
+    def coefficienti_lineari(self, periodo: str = "offerta") -> tuple[float, float, float] | None:
+        """
+        Coefficienti (fisso, alfa, beta) della parte di costo mensile propria
+        dell'offerta, con periodo "offerta" o "finita":
+        costo = fisso + consumo * (alfa + beta * indice).
+        Restituisce None se l'offerta non e' prezzabile nel periodo.
+        """
+        ...
+    @abstractmethod
+    def costo_comune_mensile(self, consumo: float) -> float:
+        """Quote di rete, oneri e imposte uguali per tutte le offerte."""
+        ...
+    @property
+    @abstractmethod
+    def consumo_mensile_profilo(self) -> float:
+        """Consumo mensile del profilo (kWh o Smc) usato dai prezzi calcolati."""
+        ...
+    def fattore_imposte(self, consumo: float | None = None) -> float:
+        """
+        Moltiplicatore applicato al totale (es. IVA), uguale per tutte le offerte,
+        al consumo mensile indicato (default: quello del profilo).
+        """
+        return 1.0
     def calcola_tutto(self) -> DatiPrezzo:
         """
         Calcola tutti gli scenari di prezzo mensile.
@@ -31,6 +78,12 @@ class ABCPrice(ABC):
         )
         
         
+def impronta_offerta(offerta: Offerta) -> str:
+    """Impronta del contenuto di un'offerta (tutti i campi estratti)."""
+    payload = json.dumps(offerta.model_dump(), sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
 def return_tipo_formula(tipo: str | None) -> TipoFormula:
     """Converte una stringa in TipoFormula Enum o None."""
     if tipo is None:
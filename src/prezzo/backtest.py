@@ -0,0 +1,175 @@
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from src.model import Offerta
+from .abc import ABCPrice
+from ..config import Config
+
+# Record della serie: giornaliera o mensile letta dal file sorgente, mensile in cache (.npy)
+DTYPE_SERIE = np.dtype([("mese", "<i4"), ("valore", "<f8")])
+
+
+class SerieMensile:
+    """
+    Serie mensile di un indice di mercato (PUN in €/kWh, PSV in €/Smc).
+
+    Il file sorgente (CSV o Parquet con colonne `data` e `valore`, dati
+    giornalieri o mensili) viene letto e aggregato una volta; la serie
+    mensile risultante (un valore per mese, la media dei valori del mese)
+    e' salvata in un .npy nella cartella di cache, per cui le aperture
+    successive leggono solo i mesi e non lo storico giornaliero.
+    """
+
+    def __init__(self, mesi: np.ndarray, valori: np.ndarray):
+        self.mesi = mesi
+        self.valori = valori
+
+    def __len__(self) -> int:
+        return len(self.mesi)
+
+    @classmethod
+    def da_record(cls, record: np.ndarray) -> "SerieMensile":
+        """Serie mensile da record (mese, valore) anche giornalieri o non ordinati."""
+        mesi = record["mese"]
+        if len(mesi) and np.any(np.diff(mesi) < 0):
+            ordine = np.argsort(mesi, kind="stable")
+            record = record[ordine]
+            mesi = record["mese"]
+        mesi_unici, inizi, conteggi = np.unique(mesi, return_index=True, return_counts=True)
+        somme = np.add.reduceat(record["valore"], inizi) if len(inizi) else np.empty(0)
+        return cls(mesi_unici, somme / conteggi)
+
+    @classmethod
+    def da_file(cls, path: str, cache_dir: str) -> "SerieMensile":
+        stat = os.stat(path)
+        firma = f"{os.path.abspath(path)}\n{stat.st_mtime_ns}\n{stat.st_size}\nmensile"
+        cartella = os.path.join(cache_dir, "serie")
+        npy = os.path.join(cartella, hashlib.sha256(firma.encode("utf-8")).hexdigest() + ".npy")
+        if os.path.exists(npy):
+            record = np.load(npy)
+            return cls(record["mese"], record["valore"])
+
+        sorgente = _leggi_sorgente(path)
+        serie = cls.da_record(sorgente)
+        record = np.empty(len(serie), dtype=DTYPE_SERIE)
+        record["mese"], record["valore"] = serie.mesi, serie.valori
+        os.makedirs(cartella, exist_ok=True)
+        tmp = f"{npy}.{os.getpid()}.tmp.npy"
+        np.save(tmp, record)
+        os.replace(tmp, npy)
+        logger.info(f"Serie {path}: {len(sorgente)} valori aggregati in {len(serie)} mesi ({npy})")
+        return serie
+
+    def ultimi(self, n: int) -> tuple[np.ndarray, np.ndarray]:
+        """Mesi (anno * 12 + mese - 1) e valori degli ultimi n mesi disponibili."""
+        return self.mesi[-n:], np.asarray(self.valori[-n:], dtype=float)
+
+
+def _leggi_sorgente(path: str) -> np.ndarray:
+    if path.lower().endswith((".parquet", ".pq")):
+        df = pd.read_parquet(path)
+    else:
+        df = pd.read_csv(path)
+    mancanti = {"data", "valore"} - set(df.columns)
+    if mancanti:
+        raise ValueError(f"{path}: colonne mancanti {sorted(mancanti)} (trovate: {list(df.columns)})")
+    date = pd.to_datetime(df["data"])
+    valori = pd.to_numeric(df["valore"], errors="coerce").to_numpy(dtype=float)
+    validi = ~(date.isna().to_numpy() | np.isnan(valori))
+    record = np.empty(int(validi.sum()), dtype=DTYPE_SERIE)
+    record["mese"] = (date.dt.year * 12 + date.dt.month - 1).to_numpy()[validi]
+    record["valore"] = valori[validi]
+    return record
+
+
+def _etichetta(mese: int) -> str:
+    return f"{mese // 12}-{mese % 12 + 1:02d}"
+
+
+class MotoreBacktest:
+    """
+    Quanto sarebbe costata ogni offerta negli ultimi N mesi della serie.
+
+    Per ogni offerta i coefficienti lineari (fisso, alfa, beta) dei periodi
+    "offerta" e "finita" vengono calcolati una volta; il costo di ogni mese e'
+        (comune + fisso + consumo * (alfa + beta * indice_mese)) * fattore
+    valutato in blocco su offerte x mesi. Come per l'orizzonte, la promozione
+    copre i primi durata_mesi mesi (tutti se nulla) e, se il periodo finita
+    non e' prezzabile, resta il prezzo dell'offerta.
+    """
+
+    def __init__(self, offerte: list[Offerta], calcolatore: type[ABCPrice], serie: SerieMensile,
+                 config: Config | None = None):
+        self.serie = serie
+        righe = {"offerta": [], "finita": []}
+        durate = []
+        profilo = None
+        for offerta in offerte:
+            prezzo = calcolatore(offerta, config)
+            profilo = profilo or prezzo
+            for periodo, coefficienti in righe.items():
+                coefficienti.append(prezzo.coefficienti_lineari(periodo) or (np.nan, np.nan, np.nan))
+            durate.append(np.nan if offerta.durata_mesi is None else offerta.durata_mesi)
+
+        coeff_offerta = np.array(righe["offerta"], dtype=float).reshape(-1, 3)
+        coeff_finita = np.array(righe["finita"], dtype=float).reshape(-1, 3)
+        non_prezzabile = np.isnan(coeff_finita).any(axis=1)
+        coeff_finita[non_prezzabile] = coeff_offerta[non_prezzabile]
+        self.coeff = {"offerta": coeff_offerta.T, "finita": coeff_finita.T}
+        self.durata = np.array(durate, dtype=float)
+
+        if profilo is not None:
+            self.consumo = profilo.consumo_mensile_profilo
+            self.comune = profilo.costo_comune_mensile(self.consumo)
+            self.fattore = profilo.fattore_imposte()
+        else:
+            self.consumo, self.comune, self.fattore = 0.0, 0.0, 1.0
+
+    def _costo(self, periodo: str, indice: np.ndarray) -> np.ndarray:
+        fisso, alfa, beta = (c[:, np.newaxis] for c in self.coeff[periodo])
+        return (self.comune + fisso + self.consumo * (alfa + beta * indice[np.newaxis, :])) * self.fattore
+
+    def mesi_disponibili(self, mesi: int) -> int:
+        if not len(self.serie):
+            raise ValueError("La serie storica e' vuota.")
+        disponibili = min(mesi, len(self.serie))
+        if disponibili < mesi:
+            logger.warning(f"Backtest su {mesi} mesi richiesto: la serie ne contiene solo {disponibili}.")
+        finestra, _ = self.serie.ultimi(disponibili)
+        if finestra[-1] - finestra[0] + 1 != disponibili:
+            logger.warning("La serie storica ha mesi mancanti: il backtest usa i mesi disponibili.")
+        return disponibili
+
+    def costi_mensili(self, mesi: int) -> np.ndarray:
+        """Matrice (offerte x mesi) del costo di ogni mese della finestra, dal piu' vecchio."""
+        if mesi < 1:
+            raise ValueError("Il backtest deve coprire almeno un mese.")
+        mesi = self.mesi_disponibili(mesi)
+        _, indice = self.serie.ultimi(mesi)
+        numero = np.arange(1, mesi + 1)
+        durata = np.where(np.isnan(self.durata), mesi, self.durata)
+        in_promo = numero[np.newaxis, :] <= durata[:, np.newaxis]
+        return np.where(in_promo, self._costo("offerta", indice), self._costo("finita", indice))
+
+    def colonne(self, mesi: int, index=None) -> pd.DataFrame:
+        """Colonne di output con il costo storico totale e medio mensile."""
+        costi = self.costi_mensili(mesi)
+        mesi = costi.shape[1]
+        finestra, _ = self.serie.ultimi(mesi)
+        logger.info(f"Backtest da {_etichetta(int(finestra[0]))} a {_etichetta(int(finestra[-1]))}")
+        totale = costi.sum(axis=1)
+        return pd.DataFrame({
+            f"costo_storico_totale_{mesi}m": np.round(totale, 2),
+            f"costo_storico_medio_mensile_{mesi}m": np.round(totale / mesi, 2),
+        }, index=index)
+
+
+def aggiungi_costi_storici(df: pd.DataFrame, offerte: list[Offerta], calcolatore: type[ABCPrice],
+                           serie: SerieMensile, mesi: int) -> pd.DataFrame:
+    """Restituisce df (una riga per offerta, stesso ordine) con le colonne del backtest."""
+    colonne = MotoreBacktest(offerte, calcolatore, serie).colonne(mesi, index=df.index)
+    return pd.concat([df.drop(columns=colonne.columns, errors="ignore"), colonne], axis=1)
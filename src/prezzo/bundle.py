@@ -0,0 +1,193 @@
+import json
+import os
+import re
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+from pydantic import BaseModel, ConfigDict, Field
+
+from ..output.abc import colonne_prezzo
+
+COLONNE_BUNDLE = [
+    "scenario", "posizione",
+    "gestore_luce", "offerta_luce", "prezzo_luce",
+    "gestore_gas", "offerta_gas", "prezzo_gas",
+    "sconto", "totale",
+]
+# Suffissi societari ignorati nel confronto dei gestori ("Sorgenia S.p.A." = "Sorgenia")
+_SUFFISSI_SOCIETARI = {"spa", "srl", "sapa", "scarl", "scpa"}
+# Scenari mensili (PREZZO_COLS e costi medi mensili di orizzonte e backtest): i totali
+# su N mesi sono esclusi, lo sconto mensile vi andrebbe applicato N volte
+_MENSILE = re.compile(r"(_mensile|_medio_mensile_\d+m(_\w+)?)$")
+# Righe di coppie valutate per blocco: limita la memoria della matrice luce x gas
+_BLOCCO = 1024
+
+
+def normalizza_gestore(nome: str) -> str:
+    parole = re.sub(r"[^\w\s]", "", str(nome).casefold()).split()
+    while parole and parole[-1] in _SUFFISSI_SOCIETARI:
+        parole.pop()
+    return " ".join(parole)
+
+
+class RegolaBundle(BaseModel):
+    """Sconto di un gestore per luce e gas sottoscritte insieme."""
+
+    model_config = ConfigDict(frozen=True, extra="forbid")
+
+    gestore: str
+    # € al mese sulla coppia, dopo lo sconto percentuale
+    sconto_mensile: float = Field(default=0.0, ge=0)
+    # % sul totale mensile della coppia
+    sconto_percentuale: float = Field(default=0.0, ge=0, lt=100)
+    # Offerte a cui si applica lo sconto (None: tutte quelle del gestore)
+    offerte_luce: list[str] | None = None
+    offerte_gas: list[str] | None = None
+    # Le offerte della regola si possono sottoscrivere solo con l'altra fornitura dello stesso gestore
+    solo_in_bundle: bool = False
+
+    def comprende(self, tipo: str, nome_offerta: str) -> bool:
+        offerte = self.offerte_luce if tipo == "luce" else self.offerte_gas
+        return offerte is None or nome_offerta in offerte
+
+
+class RegoleBundle(BaseModel):
+    model_config = ConfigDict(frozen=True, extra="forbid")
+
+    regole: list[RegolaBundle] = []
+
+    @classmethod
+    def da_file(cls, path: str) -> "RegoleBundle":
+        """Regole dal file JSON; senza file nessuno sconto."""
+        if not os.path.exists(path):
+            logger.info(f"Nessun file di regole bundle ({path}): nessuno sconto applicato")
+            return cls()
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.model_validate(json.load(f))
+
+    def per_gestore(self) -> dict[str, RegolaBundle]:
+        regole = {}
+        for regola in self.regole:
+            chiave = normalizza_gestore(regola.gestore)
+            if chiave in regole:
+                raise ValueError(f"Piu' regole bundle per il gestore {regola.gestore}")
+            regole[chiave] = regola
+        return regole
+
+
+class _Lato:
+    """Offerte di una fornitura come array, con gestore e ruolo nelle regole."""
+
+    def __init__(self, df: pd.DataFrame, tipo: str, regole: dict[str, RegolaBundle], codici: dict[str, int]):
+        self.df = df.reset_index(drop=True)
+        gestori = [normalizza_gestore(g) for g in self.df["gestore"]]
+        self.gestore = np.array([codici.setdefault(g, len(codici)) for g in gestori], dtype=int)
+        scontabile, vincolata = [], []
+        for gestore, nome in zip(gestori, self.df["nome_offerta"]):
+            regola = regole.get(gestore)
+            nella_regola = regola is not None and regola.comprende(tipo, nome)
+            scontabile.append(nella_regola)
+            vincolata.append(nella_regola and regola.solo_in_bundle)
+        self.scontabile = np.array(scontabile, dtype=bool)
+        self.vincolata = np.array(vincolata, dtype=bool)
+
+    def candidati(self, scenario: str, k: int) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Indici e prezzi delle offerte non dominate: per ogni gruppo (gestore,
+        scontabile, vincolata) le k piu' economiche. Un'offerta del gruppo
+        si abbina agli stessi partner con lo stesso sconto delle altre, per
+        cui se k offerte del gruppo costano meno non entra tra le prime k coppie.
+        """
+        prezzi = pd.to_numeric(self.df[scenario], errors="coerce").to_numpy(dtype=float)
+        validi = np.flatnonzero(~np.isnan(prezzi))
+        gruppi = pd.DataFrame({
+            "gestore": self.gestore[validi],
+            "scontabile": self.scontabile[validi],
+            "vincolata": self.vincolata[validi],
+            "prezzo": prezzi[validi],
+        }, index=validi)
+        scelti = gruppi.sort_values("prezzo", kind="stable").groupby(
+            ["gestore", "scontabile", "vincolata"], sort=False).head(k).index.to_numpy()
+        return scelti, prezzi[scelti]
+
+
+class OttimizzatoreBundle:
+    """
+    Migliori combinazioni di un'offerta luce e una gas per ogni scenario di prezzo.
+
+    Le due offerte si uniscono per gestore: se appartengono allo stesso
+    gestore e rientrano nella sua regola, al totale della coppia si applica
+    lo sconto (prima la percentuale, poi la quota mensile). Le offerte
+    `solo_in_bundle` si abbinano solo all'altra fornitura dello stesso gestore.
+    Prima della ricerca le offerte dominate vengono scartate per gruppo,
+    quindi le coppie valutate crescono con il numero di gestori e non con
+    la dimensione dei cataloghi.
+    """
+
+    def __init__(self, df_luce: pd.DataFrame, df_gas: pd.DataFrame, regole: RegoleBundle | None = None):
+        per_gestore = (regole or RegoleBundle()).per_gestore()
+        codici: dict[str, int] = {}
+        self.luce = _Lato(df_luce, "luce", per_gestore, codici)
+        self.gas = _Lato(df_gas, "gas", per_gestore, codici)
+        self.sconto_percentuale = np.zeros(len(codici))
+        self.sconto_mensile = np.zeros(len(codici))
+        for gestore, regola in per_gestore.items():
+            if gestore in codici:
+                self.sconto_percentuale[codici[gestore]] = regola.sconto_percentuale / 100
+                self.sconto_mensile[codici[gestore]] = regola.sconto_mensile
+        self.scenari = [s for s in colonne_prezzo(df_luce) if s in df_gas and _MENSILE.search(s)]
+
+    def _costi(self, il: np.ndarray, pl: np.ndarray, ig: np.ndarray, pg: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Totale e sconto di ogni coppia (blocco luce x candidati gas); inf se non ammessa."""
+        gl, gg = self.luce.gestore[il][:, None], self.gas.gestore[ig][None, :]
+        stesso = gl == gg
+        lordo = pl[:, None] + pg[None, :]
+        scontata = stesso & self.luce.scontabile[il][:, None] & self.gas.scontabile[ig][None, :]
+        sconto = np.where(
+            scontata,
+            lordo * self.sconto_percentuale[gl] + self.sconto_mensile[gl],
+            0.0,
+        )
+        ammessa = stesso | ~(self.luce.vincolata[il][:, None] | self.gas.vincolata[ig][None, :])
+        return np.where(ammessa, lordo - sconto, np.inf), sconto
+
+    def migliori(self, scenario: str, k: int = 5) -> pd.DataFrame:
+        """Le k coppie piu' economiche per lo scenario, in ordine di totale."""
+        if k < 1:
+            raise ValueError("Il numero di combinazioni deve essere almeno 1.")
+        il, pl = self.luce.candidati(scenario, k)
+        ig, pg = self.gas.candidati(scenario, k)
+        righe = []
+        if len(il) and len(ig):
+            migliori = np.empty((0, 4))  # totale, sconto, indice luce, indice gas
+            for inizio in range(0, len(il), _BLOCCO):
+                blocco = slice(inizio, inizio + _BLOCCO)
+                totali, sconti = self._costi(il[blocco], pl[blocco], ig, pg)
+                piatti = totali.ravel()
+                scelti = np.argpartition(piatti, k - 1)[:k] if piatti.size > k else np.arange(piatti.size)
+                righe_l, colonne_g = np.divmod(scelti, len(ig))
+                nuovi = np.column_stack([piatti[scelti], sconti.ravel()[scelti], il[blocco][righe_l], ig[colonne_g]])
+                migliori = np.concatenate([migliori, nuovi])
+                migliori = migliori[np.argsort(migliori[:, 0], kind="stable")[:k]]
+            for posizione, (totale, sconto, i, j) in enumerate(migliori, start=1):
+                if not np.isfinite(totale):
+                    break
+                offerta_luce, offerta_gas = self.luce.df.iloc[int(i)], self.gas.df.iloc[int(j)]
+                righe.append({
+                    "scenario": scenario,
+                    "posizione": posizione,
+                    "gestore_luce": offerta_luce["gestore"],
+                    "offerta_luce": offerta_luce["nome_offerta"],
+                    "prezzo_luce": offerta_luce[scenario],
+                    "gestore_gas": offerta_gas["gestore"],
+                    "offerta_gas": offerta_gas["nome_offerta"],
+                    "prezzo_gas": offerta_gas[scenario],
+                    "sconto": round(float(sconto), 2),
+                    "totale": round(float(totale), 2),
+                })
+        return pd.DataFrame(righe, columns=COLONNE_BUNDLE)
+
+    def tutte(self, k: int = 5) -> pd.DataFrame:
+        """Le k migliori coppie di ogni scenario comune a luce e gas."""
+        return pd.concat([self.migliori(scenario, k) for scenario in self.scenari], ignore_index=True)
@@ -0,0 +1,68 @@
+import os
+import threading
+from collections import OrderedDict
+from loguru import logger
+
+from src.model import DatiPrezzo, Offerta
+from .abc import ABCPrice, impronta_offerta
+from ..data_extractor.cache import CacheManager
+from ..config import Config
+
+
+class CachePrezzi:
+    """
+    Cache dei risultati di ABCPrice.calcola_tutto.
+
+    La chiave combina l'impronta dell'offerta con quella dei soli parametri
+    di configurazione letti dal calcolatore (CHIAVI_CONFIG): aggiornando ad
+    esempio psv_eur_smc vengono ricalcolate solo le offerte gas.
+    Gli ultimi `max_memoria` risultati usati restano anche in memoria per le
+    esecuzioni successive nello stesso processo (es. il servizio, dove ogni
+    profilo delle richieste genera chiavi nuove).
+    """
+
+    def __init__(self, cache_dir: str, max_memoria: int = 4096):
+        # I prezzi dipendono solo dagli input: nessuna scadenza temporale
+        self.cache = CacheManager(os.path.join(cache_dir, "prezzi"), float("inf"))
+        self.max_memoria = max_memoria
+        self._memoria: OrderedDict[str, DatiPrezzo] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def genera_chiave(self, calcolatore: type[ABCPrice], offerta: Offerta, config: Config | None = None) -> str:
+        return self.cache.generate_key(calcolatore.impronta_config(config), impronta_offerta(offerta))
+
+    def _da_memoria(self, chiave: str) -> DatiPrezzo | None:
+        with self._lock:
+            risultato = self._memoria.get(chiave)
+            if risultato is not None:
+                self._memoria.move_to_end(chiave)
+            return risultato
+
+    def _in_memoria(self, chiave: str, risultato: DatiPrezzo):
+        """Aggiunge il risultato in memoria scartando il meno usato di recente oltre max_memoria."""
+        with self._lock:
+            self._memoria[chiave] = risultato
+            self._memoria.move_to_end(chiave)
+            if len(self._memoria) > self.max_memoria:
+                self._memoria.popitem(last=False)
+
+    def calcola(self, calcolatore: type[ABCPrice], offerta: Offerta, use_cache: bool = True,
+                config: Config | None = None) -> DatiPrezzo:
+        """Restituisce il risultato in cache o lo calcola e lo salva."""
+        chiave = self.genera_chiave(calcolatore, offerta, config)
+
+        if use_cache:
+            risultato = self._da_memoria(chiave)
+            if risultato is not None:
+                return risultato
+            cached_data = self.cache.load(chiave)
+            if cached_data:
+                logger.debug(f"[{offerta.nome_offerta}] Prezzi caricati dalla cache.")
+                risultato = DatiPrezzo(**cached_data)
+                self._in_memoria(chiave, risultato)
+                return risultato
+
+        risultato = calcolatore(offerta, config).calcola_tutto()
+        self.cache.save(chiave, risultato.model_dump())
+        self._in_memoria(chiave, risultato)
+        return risultato
@@ -0,0 +1,154 @@
+from bisect import bisect_right
+from functools import lru_cache
+from typing import NamedTuple
+
+import numpy as np
+from loguru import logger
+
+from src.model import Offerta
+from .abc import ABCPrice
+from ..config import Config
+
+# Consumi distinti di cui IndiceOfferte tiene in memoria il costo comune
+MAX_CONSUMI_IN_MEMORIA = 1024
+
+
+class PosizioneClassifica(NamedTuple):
+    nome_offerta: str
+    gestore: str
+    prezzo_mensile: float
+
+
+def _inviluppo_inferiore(intercette: np.ndarray, pendenze: np.ndarray, indici: list[int]) -> tuple[list[int], list[float]]:
+    """
+    Inviluppo inferiore delle rette intercetta + pendenza * consumo per consumo >= 0.
+    Restituisce le rette dell'inviluppo (ordinate per consumo crescente) e i
+    punti di cambio: la retta j e' la migliore tra punti[j-1] e punti[j].
+    """
+    ordine = sorted(indici, key=lambda i: (-pendenze[i], intercette[i]))
+    inviluppo = []
+    for i in ordine:
+        if inviluppo and pendenze[inviluppo[-1]] == pendenze[i]:
+            # stessa pendenza e intercetta non migliore: mai strettamente prima
+            continue
+        while len(inviluppo) >= 2:
+            a, b = inviluppo[-2], inviluppo[-1]
+            # b e' inutile se i supera a prima (o quando) lo fa b
+            if (intercette[i] - intercette[a]) * (pendenze[a] - pendenze[b]) <= \
+               (intercette[b] - intercette[a]) * (pendenze[a] - pendenze[i]):
+                inviluppo.pop()
+            else:
+                break
+        inviluppo.append(i)
+
+    punti = [
+        (intercette[b] - intercette[a]) / (pendenze[a] - pendenze[b])
+        for a, b in zip(inviluppo, inviluppo[1:])
+    ]
+    # Consumi negativi non interessano: scarta le rette migliori solo lì
+    while punti and punti[0] <= 0:
+        inviluppo.pop(0)
+        punti.pop(0)
+    return inviluppo, punti
+
+
+class IndiceOfferte:
+    """
+    Indice per le classifiche "migliori k offerte per consumo X e indice Y".
+
+    Per tariffe e fasce fisse il costo mensile di ogni offerta e'
+        (comune(consumo) + fisso + consumo * (alfa + beta * indice)) * fattore(consumo)
+    dove solo fisso, alfa e beta dipendono dall'offerta: i coefficienti sono
+    calcolati una volta dalle classi di prezzo e le interrogazioni non le
+    rieseguono.
+
+    A parita' di beta (offerte a prezzo fisso, offerte indicizzate) l'ordine
+    dipende solo dal consumo: per ogni gruppo vengono precalcolati i primi
+    strati dell'inviluppo inferiore delle rette fisso + consumo * alfa.
+    Il k-esimo migliore a un dato consumo appartiene sempre ai primi k
+    strati, per cui le interrogazioni valutano solo quei candidati.
+    """
+
+    def __init__(self, offerte: list[Offerta], calcolatore: type[ABCPrice],
+                 periodo: str = "offerta", max_strati: int = 10, config: Config | None = None):
+        self.periodo = periodo
+        self.max_strati = max_strati
+        nomi, gestori, coefficienti = [], [], []
+        self._profilo: ABCPrice | None = None
+        for offerta in offerte:
+            prezzo = calcolatore(offerta, config)
+            coeff = prezzo.coefficienti_lineari(periodo)
+            if coeff is None:
+                logger.debug(f"[{offerta.nome_offerta}] Offerta non indicizzabile per il periodo {periodo}.")
+                continue
+            self._profilo = self._profilo or prezzo
+            nomi.append(offerta.nome_offerta)
+            gestori.append(offerta.gestore)
+            coefficienti.append(coeff)
+
+        self.nomi = nomi
+        self.gestori = gestori
+        coefficienti = np.array(coefficienti, dtype=float).reshape(-1, 3)
+        self.fisso, self.alfa, self.beta = coefficienti.T.copy()
+        # Costo comune e fattore imposte per consumo: le interrogazioni del
+        # servizio usano consumi arbitrari, per cui si tengono solo i piu' recenti
+        if self._profilo is not None:
+            self._costo_comune = lru_cache(maxsize=MAX_CONSUMI_IN_MEMORIA)(self._profilo.costo_comune_mensile)
+            self._fattore = lru_cache(maxsize=MAX_CONSUMI_IN_MEMORIA)(self._profilo.fattore_imposte)
+        self._gruppi = self._costruisci_gruppi()
+
+    def __len__(self) -> int:
+        return len(self.nomi)
+
+    def _costruisci_gruppi(self) -> list[dict]:
+        gruppi = []
+        for beta in np.unique(self.beta):
+            restanti = list(np.flatnonzero(self.beta == beta))
+            strati = []
+            while restanti and len(strati) < self.max_strati:
+                inviluppo, punti = _inviluppo_inferiore(self.fisso, self.alfa, restanti)
+                strati.append((inviluppo, punti))
+                nello_strato = set(inviluppo)
+                restanti = [i for i in restanti if i not in nello_strato]
+            # candidati[k-1]: offerte dei primi k strati
+            candidati, cumulati = [], []
+            for inviluppo, _ in strati:
+                cumulati.extend(inviluppo)
+                candidati.append(np.array(cumulati, dtype=int))
+            gruppi.append({
+                "beta": float(beta),
+                "inviluppo": strati[0][0],
+                "punti": strati[0][1],
+                "candidati": candidati,
+                "completo": not restanti,
+            })
+        return gruppi
+
+    def _posizioni(self, indici: np.ndarray, parziali: np.ndarray, consumo: float) -> list[PosizioneClassifica]:
+        comune, fattore = self._costo_comune(consumo), self._fattore(consumo)
+        return [
+            PosizioneClassifica(self.nomi[i], self.gestori[i], round((comune + p) * fattore, 2))
+            for i, p in zip(indici.tolist(), parziali.tolist())
+        ]
+
+    def migliori(self, consumo: float, indice: float, k: int = 1) -> list[PosizioneClassifica]:
+        """Le k offerte piu' economiche, in ordine di prezzo mensile crescente."""
+        if k < 1 or not self.nomi:
+            return []
+        if k == 1:
+            candidati = np.array([
+                g["inviluppo"][bisect_right(g["punti"], consumo)] for g in self._gruppi
+            ], dtype=int)
+        elif k <= self.max_strati or all(g["completo"] for g in self._gruppi):
+            candidati = np.concatenate([
+                g["candidati"][min(k, len(g["candidati"])) - 1] for g in self._gruppi
+            ])
+        else:
+            candidati = np.arange(len(self.nomi))
+
+        parziali = self.fisso[candidati] + consumo * (self.alfa[candidati] + self.beta[candidati] * indice)
+        if len(candidati) > k:
+            scelti = np.argpartition(parziali, k - 1)[:k]
+            candidati, parziali = candidati[scelti], parziali[scelti]
+        ordine = np.argsort(parziali, kind="stable")
+        return self._posizioni(candidati[ordine], parziali[ordine], consumo)
@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+
+
+# Scenario -> colonna con il prezzo mensile del periodo successivo alla promozione
+SCENARI_FINITA = {
+    "medio": "prezzo_finita_medio_mensile",
+    "peggiore": "prezzo_finita_peggiore_mensile",
+}
+
+
+class MotoreOrizzonte:
+    """
+    Costo complessivo delle offerte su un orizzonte contrattuale.
+
+    Per ogni offerta applica il prezzo promozionale per durata_mesi mesi e
+    poi il prezzo "finita" fino alla fine dell'orizzonte. Il calcolo e'
+    vettoriale su offerte x mesi: gli array vengono estratti una sola volta
+    dal DataFrame, per cui cambiare orizzonte costa solo il broadcasting.
+
+    Regole per i dati mancanti:
+    - durata_mesi nulla: la promozione copre l'intero orizzonte;
+    - prezzo finita nullo: dopo la promozione resta il prezzo dell'offerta.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.index = df.index
+        self.prezzo_offerta = pd.to_numeric(df["prezzo_offerta_mensile"], errors="coerce").to_numpy(dtype=float)
+        self.prezzi_finita = {
+            scenario: self._prezzo_finita(df, colonna)
+            for scenario, colonna in SCENARI_FINITA.items()
+        }
+        if "durata_mesi" in df:
+            self.durata = pd.to_numeric(df["durata_mesi"], errors="coerce").to_numpy(dtype=float)
+        else:
+            self.durata = np.full(len(df), np.nan)
+
+    def _prezzo_finita(self, df: pd.DataFrame, colonna: str) -> np.ndarray:
+        if colonna not in df:
+            return self.prezzo_offerta
+        finita = pd.to_numeric(df[colonna], errors="coerce").to_numpy(dtype=float)
+        return np.where(np.isnan(finita), self.prezzo_offerta, finita)
+
+    def costi_mensili(self, orizzonte_mesi: int, scenario: str = "medio") -> np.ndarray:
+        """Matrice (offerte x mesi) del costo di ogni mese dell'orizzonte."""
+        if orizzonte_mesi < 1:
+            raise ValueError("L'orizzonte deve essere di almeno un mese.")
+        if scenario not in self.prezzi_finita:
+            raise ValueError(f"Scenario non valido. Scegli tra: {list(self.prezzi_finita)}")
+        mesi = np.arange(1, orizzonte_mesi + 1)
+        durata = np.where(np.isnan(self.durata), orizzonte_mesi, self.durata)
+        in_promo = mesi[np.newaxis, :] <= durata[:, np.newaxis]
+        return np.where(
+            in_promo,
+            self.prezzo_offerta[:, np.newaxis],
+            self.prezzi_finita[scenario][:, np.newaxis],
+        )
+
+    def costi_cumulati(self, orizzonte_mesi: int, scenario: str = "medio") -> np.ndarray:
+        """Matrice (offerte x mesi) del costo cumulato fino a ogni mese."""
+        return np.cumsum(self.costi_mensili(orizzonte_mesi, scenario), axis=1)
+
+    def curva(self, orizzonte_mesi: int, scenario: str = "medio", cumulata: bool = True) -> pd.DataFrame:
+        """Curve di costo come DataFrame con una colonna per mese."""
+        valori = (
+            self.costi_cumulati(orizzonte_mesi, scenario) if cumulata
+            else self.costi_mensili(orizzonte_mesi, scenario)
+        )
+        return pd.DataFrame(valori, index=self.index, columns=range(1, orizzonte_mesi + 1))
+
+    def colonne(self, orizzonte_mesi: int) -> pd.DataFrame:
+        """Colonne di output con totale e media mensile per ogni scenario."""
+        colonne = {}
+        for scenario in self.prezzi_finita:
+            totale = self.costi_mensili(orizzonte_mesi, scenario).sum(axis=1)
+            colonne[f"costo_totale_{orizzonte_mesi}m_{scenario}"] = np.round(totale, 2)
+            colonne[f"costo_medio_mensile_{orizzonte_mesi}m_{scenario}"] = np.round(totale / orizzonte_mesi, 2)
+        return pd.DataFrame(colonne, index=self.index)
+
+
+def aggiungi_costi_orizzonte(df: pd.DataFrame, orizzonte_mesi: int) -> pd.DataFrame:
+    """Restituisce df con le colonne di costo sull'orizzonte indicato."""
+    colonne = MotoreOrizzonte(df).colonne(orizzonte_mesi)
+    return pd.concat([df.drop(columns=colonne.columns, errors="ignore"), colonne], axis=1)
@@ -3,7 +3,8 @@ from loguru import logger
 from src.model import Offerta, TipoFormula
 from src.prezzo.abc import ABCPrice
 from decimal import Decimal, ROUND_HALF_UP
-from ..config import config  
+from ..config import Config, config as config_predefinito
+from .tariffe import TabelleTariffe, tabelle_tariffe
 
 
 # TODO: calcolo per altre tipologie di offerte di gas
@@ -89,40 +90,34 @@ class CalcolatoreAccisaGas:
 
 class CalcolatoreTrasportoGas:
     """
-    Stima i costi di trasporto + oneri di sistema.
-    Allineato alle macro-zone fiscali (Centro-Nord e Sud-Mezzogiorno).
+    Stima i costi di rete (distribuzione, misura, trasporto) e gli oneri di
+    sistema dell'ambito tariffario, dalle tabelle in TARIFFE_DIR.
+    Gli scaglioni si applicano al consumo annuo; il costo mensile usa il
+    costo medio per Smc a quel consumo.
     """
 
-    # nota: mega approssimazione per evitare di dover gestire troppe zone
-    # in realta' le tariffe variano per zona piu' dettagliate
-    QUOTE_FISSE_BASE = {
-        "CENTRO_NORD":      Decimal("72.50"),
-        "SUD_MEZZOGIORNO":  Decimal("79.40")
-    }
-
-    QUOTA_VARIABILE_RETE = Decimal("0.115")
-    QUOTA_ONERI = Decimal("0.010")
-    
-
-    def __init__(self, zona: str = "CENTRO_NORD"):
-        self.zona = zona.upper()
-        if self.zona not in self.QUOTE_FISSE_BASE:
-            self.zona = "CENTRO_NORD"
+    def __init__(self, ambito: str = "CENTRALE", tabelle: TabelleTariffe | None = None):
+        if tabelle is None:
+            tabelle = tabelle_tariffe(config_predefinito.impostazioni.TARIFFE_DIR)
+        self.tariffa = tabelle.tariffa_gas(ambito)
+        self.ambito = self.tariffa.ambito
 
-    def stima_costo_mensile(self, consumo_mensile: Decimal) -> Decimal:
+    def stima_costo_mensile(self, consumo_mensile: Decimal, consumo_annuo: Decimal | None = None) -> Decimal:
         """
         Calcola la quota fissa mensile e la quota variabile su base Smc.
+        Senza consumo annuo si assume un consumo costante (12 mesi).
         """
-        quota_fissa_mensile = self.QUOTE_FISSE_BASE[self.zona] / Decimal("12")
-        costo_variabile_smc = self.QUOTA_VARIABILE_RETE + self.QUOTA_ONERI
-        quota_variabile = consumo_mensile * costo_variabile_smc
+        consumo_mensile = Decimal(str(consumo_mensile))
+        consumo_annuo = Decimal(str(consumo_annuo)) if consumo_annuo else consumo_mensile * 12
+        quota_fissa_mensile = self.tariffa.quota_fissa_eur_anno / Decimal("12")
+        quota_variabile = consumo_mensile * self.tariffa.costo_medio_smc(consumo_annuo)
 
         return (quota_fissa_mensile + quota_variabile).quantize(
             Decimal("0.01"),
             ROUND_HALF_UP
         )
 
-         
+
 def calcola_iva_annua(imponibile_annuo, consumo_annuo, residente=True):
     if not residente:
         return imponibile_annuo * Decimal("0.22")
@@ -139,21 +134,43 @@ def calcola_iva_annua(imponibile_annuo, consumo_annuo, residente=True):
          
    
 class PrezzoGas(ABCPrice):
-    def __init__(self, offerta_energia: Offerta):
-        super().__init__(offerta_energia)
-        self.zona_geografica = config.get("zona_geografica")
-        self.is_residente = config.get("residenza", "true").lower() == "true"
-        self.consumo_mensile_smc = Decimal(str(config.get("consumption_smc_monthly")))
-        self.mese_rif = int(config.get("mese_riferimento", 1))
-        self.consumo_annuo_smc = config.get("consumption_smc_yearly")
+    CHIAVI_CONFIG = (
+        "zona_geografica",
+        "residenza",
+        "consumption_smc_monthly",
+        "mese_riferimento",
+        "consumption_smc_yearly",
+        "pcs_locale_gj_smc",
+        "c_coefficiente",
+        "psv_eur_smc",
+        "psv_eur_smc_worst",
+        "comune",
+        "ambito_gas",
+    )
+    VERSIONE_CALCOLO = "3"
+
+    def __init__(self, offerta_energia: Offerta, config: Config | None = None):
+        super().__init__(offerta_energia, config)
+        impostazioni = self.config.impostazioni
+        self.zona_geografica = impostazioni.zona_geografica
+        self.is_residente = impostazioni.residenza
+        self.consumo_mensile_smc = impostazioni.consumption_smc_monthly
+        self.mese_rif = impostazioni.mese_riferimento
+        self.consumo_annuo_smc = impostazioni.consumption_smc_yearly
         # Parametri tecnici
         
-        self.pcs_ratio = Decimal(str(self.pcs_locale_gj_smc)) / Decimal(str(self.pcs_standard_gj_smc))
-        self.c_coeff = Decimal(str(config.get("c_coefficiente", "1.0")))
-        self.psv_medio = Decimal(str(config.get("psv_eur_smc")))
-        self.psv_worst = Decimal(str(config.get("psv_eur_smc_worst", "0.0")))
-        logger.warning("Approssimazione del trasporto grezza fatta per consumi annuali intorno ai 1000 smc e in sole 2 fasce zonali.")
+        self.pcs_ratio = self.pcs_locale_gj_smc / self.pcs_standard_gj_smc
+        self.c_coeff = impostazioni.c_coefficiente
+        self.psv_medio = impostazioni.psv_eur_smc
+        self.psv_worst = impostazioni.psv_eur_smc_worst
+        tabelle = tabelle_tariffe(impostazioni.TARIFFE_DIR)
+        self.ambito_gas = tabelle.ambito_gas(impostazioni.comune, impostazioni.ambito_gas, self.zona_geografica)
+        self.trasporto = CalcolatoreTrasportoGas(self.ambito_gas, tabelle)
     
+    @classmethod
+    def impronta_dati(cls, config: Config) -> str:
+        return tabelle_tariffe(config.impostazioni.TARIFFE_DIR).impronta
+
     @property
     def pcs_standard_gj_smc(self) -> Decimal:
         """Restituisce il potere calorifico superiore standard in GJ/Smc"""
@@ -162,13 +179,35 @@ class PrezzoGas(ABCPrice):
     @property
     def pcs_locale_gj_smc(self) -> Decimal:
         """Restituisce il potere calorifico superiore locale in GJ/Smc"""
-        return Decimal(str(config.get("pcs_locale_gj_smc")))
+        return self.config.impostazioni.pcs_locale_gj_smc
+
+    @property
+    def consumo_annuo(self) -> Decimal:
+        """
+        Consumo annuo del profilo in Smc: consumption_smc_yearly o, se non
+        indicato, il mese di riferimento proiettato con i pesi stagionali
+        (come in CalcolatoreAccisaGas.stima_accisa_media).
+        """
+        if self.consumo_annuo_smc:
+            return Decimal(str(self.consumo_annuo_smc))
+        return Decimal(str(self.consumo_mensile_smc)) / CalcolatoreAccisaGas.PESI_MENSILI[self.mese_rif]
+
+    def stima_consumo_annuo(self, consumo_mensile) -> Decimal:
+        """
+        Consumo annuo per un consumo mensile diverso da quello del profilo
+        (es. le classifiche per consumo): il consumo annuo del profilo scalato
+        in proporzione, cioe' con lo stesso andamento stagionale.
+        """
+        consumo_mensile = Decimal(str(consumo_mensile))
+        consumo_profilo = Decimal(str(self.consumo_mensile_smc))
+        if not consumo_profilo:
+            return consumo_mensile / CalcolatoreAccisaGas.PESI_MENSILI[self.mese_rif]
+        return self.consumo_annuo * consumo_mensile / consumo_profilo
 
     @property
     def trasporto_oneri_mensile(self) -> Decimal:
         """Calcola i costi di trasporto e oneri di sistema mensili"""
-        ct = CalcolatoreTrasportoGas()
-        return ct.stima_costo_mensile(self.consumo_mensile_smc)
+        return self.trasporto.stima_costo_mensile(self.consumo_mensile_smc, self.consumo_annuo)
     
     def stima_accisa_media(
                            self,
@@ -202,9 +241,7 @@ class PrezzoGas(ABCPrice):
             prezzo_smc = prezzo_stimato_smc
         else:
             prezzo_smc = psv_val * self.pcs_ratio * self.c_coeff  + fee_smc 
-        print("-------")
-        print("materia:", prezzo_smc)
-        print("---")
+        logger.debug("materia: {} €/Smc", prezzo_smc)
         prezzo_mensile = prezzo_smc * self.consumo_mensile_smc
         
         return prezzo_mensile.quantize(Decimal("0.01"), ROUND_HALF_UP)
@@ -222,22 +259,62 @@ class PrezzoGas(ABCPrice):
         accisa = self.stima_accisa_media(zona=self.zona_geografica,
                                          consumo_mensile_smc=self.consumo_mensile_smc,
                                          mese_rif=self.mese_rif,
-                                         consumo_annuo_reale=self.consumo_annuo_smc,
+                                         consumo_annuo_reale=self.consumo_annuo,
                                          )
 
         costo_fissi_vendita = Decimal(str(costo_fisso_annuo or 0)) / 12
 
         imponibile_mese = materia + trasporto + accisa + costo_fissi_vendita
 
-        consumo_annuo = Decimal(str(self.consumo_annuo_smc))
         imponibile_annuo = imponibile_mese * 12
 
-        iva_annua = calcola_iva_annua(imponibile_annuo, consumo_annuo, self.is_residente)
+        iva_annua = calcola_iva_annua(imponibile_annuo, self.consumo_annuo, self.is_residente)
 
         totale_mensile = (imponibile_annuo + iva_annua) / 12
 
         return totale_mensile.quantize(Decimal("0.01"), ROUND_HALF_UP)
     
+    def coefficienti_lineari(self, periodo: str = "offerta") -> tuple[float, float, float] | None:
+        if periodo == "offerta":
+            fee_smc = self.offerta_energia.fee_offerta
+            prezzo_stimato_smc = self.offerta_energia.prezzo_fisso_offerta
+            tipo_formula = self.offerta_energia.tipologia_formula_offerta
+        elif periodo == "finita":
+            fee_smc = self.offerta_energia.fee_finita
+            prezzo_stimato_smc = self.offerta_energia.prezzo_fisso_finita
+            tipo_formula = self.offerta_energia.tipologia_formula_finita
+        else:
+            raise ValueError(f"Periodo sconosciuto: {periodo}")
+
+        fisso = float(self.offerta_energia.costi_fissi_anno or 0) / 12
+        if tipo_formula == TipoFormula.COSTANTE:
+            if prezzo_stimato_smc is None:
+                return None
+            return fisso, prezzo_stimato_smc, 0.0
+        if fee_smc is None:
+            return None
+        return fisso, fee_smc, float(self.pcs_ratio * self.c_coeff)
+
+    def costo_comune_mensile(self, consumo: float) -> float:
+        consumo = Decimal(str(consumo))
+        # Scaglioni di trasporto e accisa sul consumo annuo corrispondente al consumo richiesto
+        consumo_annuo = self.stima_consumo_annuo(consumo)
+        trasporto = self.trasporto.stima_costo_mensile(consumo, consumo_annuo)
+        accisa = self.stima_accisa_media(zona=self.zona_geografica,
+                                         consumo_mensile_smc=consumo,
+                                         mese_rif=self.mese_rif,
+                                         consumo_annuo_reale=consumo_annuo,
+                                         )
+        return float(trasporto + accisa)
+
+    @property
+    def consumo_mensile_profilo(self) -> float:
+        return float(self.consumo_mensile_smc)
+
+    def fattore_imposte(self, consumo: float | None = None) -> float:
+        consumo_annuo = self.consumo_annuo if consumo is None else self.stima_consumo_annuo(consumo)
+        return float(1 + calcola_iva_annua(Decimal("1"), consumo_annuo, self.is_residente))
+
     def calcola_prezzo_offerta(self):
             return self._calcola_prezzo_mensile(
                 fee_smc=self.offerta_energia.fee_offerta,
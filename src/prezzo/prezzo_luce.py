@@ -1,6 +1,7 @@
 from ..model import Offerta, TipoFormula
 from .abc import ABCPrice, return_tipo_formula
-from ..config import config  
+from ..config import Config
+from .tariffe import classe_luce, tabelle_tariffe
 from loguru import logger
 
 
@@ -23,10 +24,10 @@ def calcola_prezzo_energia(pun, fee: float, perdite_rete: float, indice_go: floa
         
         if tipo == TipoFormula.STANDARD:
             prezzo_finale = prezzo_base + indice_go
-            logger.debug(f"Calcolo standard: ({pun} * 1.10) + {fee} + {indice_go}")
+            logger.debug("Calcolo standard: ({} * 1.10) + {} + {}", pun, fee, indice_go)
         elif tipo == TipoFormula.RIDOTTA:
             prezzo_finale = prezzo_base
-            logger.debug(f"Calcolo ridotto: ({pun} * 1.10) + {fee}")
+            logger.debug("Calcolo ridotto: ({} * 1.10) + {}", pun, fee)
         else:
             raise ValueError("Tipo formula non riconosciuto. Usa 'standard' o 'ridotta'.")
             
@@ -37,35 +38,56 @@ def calcola_prezzo_energia(pun, fee: float, perdite_rete: float, indice_go: floa
         return None
     
 class PrezzoLuce(ABCPrice):
-    def __init__(self, offerta_energia: Offerta):
-        super().__init__(offerta_energia)
+    CHIAVI_CONFIG = (
+        "consumption_kwh_monthly",
+        "pun_index_eur_kwh_mean",
+        "pun_index_eur_kwh_worst",
+        "go_index_eur_kwh",
+        "perdite_rete_percent",
+        "potenza_kw",
+        "prima_casa",
+        "residenza",
+    )
+    VERSIONE_CALCOLO = "2"
+
+    def __init__(self, offerta_energia: Offerta, config: Config | None = None):
+        super().__init__(offerta_energia, config)
         try:
-            self.consumo_mensile = float(config.get("consumption_kwh_monthly"))
-            self.pun_index_eur_kwh_mean = float(config.get("pun_index_eur_kwh_mean"))
-            self.pun_index_eur_kwh_worst = float(config.get("pun_index_eur_kwh_worst"))
-            self.go_index_eur_kwh = float(config.get("go_index_eur_kwh", 0.0002))
-            self.perdite_rete = float(config.get("perdite_rete_percent", 0.10))
-
-            self.potenza_impegnata = float(config.get("potenza_kw", 3.0))
+            impostazioni = self.config.impostazioni
+            self.consumo_mensile = impostazioni.consumption_kwh_monthly
+            self.pun_index_eur_kwh_mean = impostazioni.pun_index_eur_kwh_mean
+            self.pun_index_eur_kwh_worst = impostazioni.pun_index_eur_kwh_worst
+            self.go_index_eur_kwh = impostazioni.go_index_eur_kwh
+            self.perdite_rete = impostazioni.perdite_rete_percent
+
+            self.potenza_impegnata = impostazioni.potenza_kw
+            self.classe_tariffaria = classe_luce(impostazioni.residenza)
+            tariffa = tabelle_tariffe(impostazioni.TARIFFE_DIR).tariffa_luce(
+                self.classe_tariffaria, self.potenza_impegnata
+            )
             # --- TRASPORTO E CONTATORE ---
-            self.quota_fissa_trasporto_mese = 24 / 12            # €/mese
-            self.quota_potenza_kw_mese = 23 / 12                 # €/kW/mese
-            self.quota_variabile_trasporto_kwh = 0.009           # €/kWh
+            self.quota_fissa_trasporto_mese = tariffa.quota_fissa_eur_anno / 12             # €/mese
+            self.quota_potenza_kw_mese = tariffa.quota_potenza_eur_kw_anno / 12             # €/kW/mese
+            self.quota_variabile_trasporto_kwh = tariffa.quota_energia_eur_kwh              # €/kWh
 
             # --- ONERI DI SISTEMA ---
-            self.oneri_fissi_mese = 20 / 12                      # €/mese
-            self.oneri_variabili_kwh = 0.040                     # €/kWh
+            self.oneri_fissi_mese = tariffa.oneri_fissi_eur_anno / 12                       # €/mese
+            self.oneri_variabili_kwh = tariffa.oneri_variabili_eur_kwh                      # €/kWh
 
             # --- IMPOSTE ---
             self.accisa_kwh = 0.0227
             self.kwh_esenti_accisa_mese = 150
-            self.prima_casa = True if config.get("prima_casa").lower() == "true" else False
-            self.residenza = True if config.get("residenza").lower() == "true" else False
+            self.prima_casa = impostazioni.prima_casa
+            self.residenza = impostazioni.residenza
         except Exception as e:        
             logger.error(f"Errore durante l'inizializzazione: {e}")
             raise e
-        logger.info("Inizializzazione PrezzoLuce completata.")
+        logger.debug("Inizializzazione PrezzoLuce completata.")
+
 
+    @classmethod
+    def impronta_dati(cls, config: Config) -> str:
+        return tabelle_tariffe(config.impostazioni.TARIFFE_DIR).impronta
 
     def _calcola_prezzo_mensile(
         self,
@@ -77,9 +99,10 @@ class PrezzoLuce(ABCPrice):
         iva: bool = False,
     ) -> float | None:
 
-        logger.info("prezzo_fisso_kwh: {}, fee_kwh: {}, costo_fisso_anno: {}, pun: {}, tipo_formula: {}".format(
+        logger.debug(
+            "prezzo_fisso_kwh: {}, fee_kwh: {}, costo_fisso_anno: {}, pun: {}, tipo_formula: {}",
             prezzo_fisso_kwh, fee_kwh, costo_fisso_anno, pun, tipo_formula
-        ))
+        )
         # -------------------------
         # 1. PREZZO ENERGIA €/kWh
         # -------------------------
@@ -141,16 +164,56 @@ class PrezzoLuce(ABCPrice):
             totale = totale_netto
         return round(totale, 2)
 
-    def calcola_accisa(self):
+    def calcola_accisa(self, consumo: float | None = None):
         """Calcola l'accisa mensile in base ai kWh esenti."""
         logger.debug("Calcolo accisa mensile")
+        if consumo is None:
+            consumo = self.consumo_mensile
         if self.prima_casa and self.residenza and self.potenza_impegnata <= 3:
-            kwh_tassati = max(0, self.consumo_mensile - self.kwh_esenti_accisa_mese)
+            kwh_tassati = max(0, consumo - self.kwh_esenti_accisa_mese)
         else:
-            kwh_tassati = self.consumo_mensile
+            kwh_tassati = consumo
 
         return kwh_tassati * self.accisa_kwh
     
+    def coefficienti_lineari(self, periodo: str = "offerta") -> tuple[float, float, float] | None:
+        if periodo == "offerta":
+            prezzo_fisso_kwh = self.offerta_energia.prezzo_fisso_offerta
+            fee_kwh = self.offerta_energia.fee_offerta
+            tipo_formula = return_tipo_formula(self.offerta_energia.tipologia_formula_offerta)
+        elif periodo == "finita":
+            prezzo_fisso_kwh = self.offerta_energia.prezzo_fisso_finita
+            fee_kwh = self.offerta_energia.fee_finita
+            tipo_formula = return_tipo_formula(self.offerta_energia.tipologia_formula_finita)
+        else:
+            raise ValueError(f"Periodo sconosciuto: {periodo}")
+
+        costo_fisso_anno = self.offerta_energia.costi_fissi_anno
+        fisso = costo_fisso_anno / 12 if costo_fisso_anno is not None else 0
+        if prezzo_fisso_kwh is not None:
+            return fisso, prezzo_fisso_kwh, 0.0
+        if fee_kwh is None:
+            return None
+        tipo_formula = tipo_formula or TipoFormula.STANDARD
+        if tipo_formula == TipoFormula.STANDARD:
+            return fisso, fee_kwh + self.go_index_eur_kwh, 1 + self.perdite_rete
+        if tipo_formula == TipoFormula.RIDOTTA:
+            return fisso, fee_kwh, 1 + self.perdite_rete
+        return None
+
+    def costo_comune_mensile(self, consumo: float) -> float:
+        return (
+            (self.quota_variabile_trasporto_kwh + self.oneri_variabili_kwh) * consumo +
+            self.calcola_accisa(consumo) +
+            self.quota_fissa_trasporto_mese +
+            self.potenza_impegnata * self.quota_potenza_kw_mese +
+            self.oneri_fissi_mese
+        )
+
+    @property
+    def consumo_mensile_profilo(self) -> float:
+        return self.consumo_mensile
+
     @property
     def iva(self) -> float:
         """Restituisce l'IVA applicabile."""
@@ -158,7 +221,7 @@ class PrezzoLuce(ABCPrice):
         return 0.10 if self.residenza else 0.22
 
     def calcola_prezzo_offerta(self) -> float:
-        logger.info("Calcolo prezzo offerta mensile")
+        logger.debug("Calcolo prezzo offerta mensile")
         return self._calcola_prezzo_mensile(
             prezzo_fisso_kwh=self.offerta_energia.prezzo_fisso_offerta,
             fee_kwh=self.offerta_energia.fee_offerta,
@@ -168,7 +231,7 @@ class PrezzoLuce(ABCPrice):
         )
 
     def calcola_prezzo_finita_medio(self) -> float:
-        logger.info("Calcolo prezzo finita medio mensile")
+        logger.debug("Calcolo prezzo finita medio mensile")
         return self._calcola_prezzo_mensile(
             prezzo_fisso_kwh=self.offerta_energia.prezzo_fisso_finita,
             fee_kwh=self.offerta_energia.fee_finita,
@@ -178,7 +241,7 @@ class PrezzoLuce(ABCPrice):
         )
 
     def calcola_prezzo_finita_peggiore(self) -> float:
-        logger.info("Calcolo prezzo finita peggiore mensile")
+        logger.debug("Calcolo prezzo finita peggiore mensile")
         return self._calcola_prezzo_mensile(
             prezzo_fisso_kwh=self.offerta_energia.prezzo_fisso_finita,
             fee_kwh=self.offerta_energia.fee_finita,
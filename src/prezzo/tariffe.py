@@ -0,0 +1,204 @@
+"""
+Tabelle delle tariffe di rete lette dai CSV in TARIFFE_DIR:
+
+- gas_ambiti.csv: quota fissa annua di ogni ambito tariffario gas
+- gas_scaglioni.csv: quote variabili di rete e oneri per ambito e scaglione di consumo annuo
+- gas_comuni.csv: ambito tariffario di ogni comune
+- luce_tariffe.csv: trasporto e oneri per classe tariffaria e fascia di potenza
+
+Le tabelle vengono caricate una sola volta per processo (di nuovo solo se i
+file cambiano) e condivise da tutti i calcolatori: le ricerche per comune,
+ambito, classe e potenza sono accessi a dizionario.
+"""
+import bisect
+import csv
+import hashlib
+import io
+import os
+import threading
+from decimal import Decimal
+from functools import lru_cache
+from typing import NamedTuple
+
+FILE_TABELLE = ("gas_ambiti.csv", "gas_scaglioni.csv", "gas_comuni.csv", "luce_tariffe.csv")
+
+# Ambito usato quando il profilo non indica ne' comune ne' ambito
+AMBITO_PER_ZONA = {
+    "CENTRO_NORD": "CENTRALE",
+    "SUD_MEZZOGIORNO": "MERIDIONALE",
+}
+
+
+def classe_luce(residenza: bool) -> str:
+    """Classe tariffaria di un'utenza domestica."""
+    return "DOMESTICO_RESIDENTE" if residenza else "DOMESTICO_NON_RESIDENTE"
+
+
+def normalizza_comune(nome: str) -> str:
+    return " ".join(nome.split()).casefold()
+
+
+class TariffaLuce(NamedTuple):
+    quota_fissa_eur_anno: float
+    quota_potenza_eur_kw_anno: float
+    quota_energia_eur_kwh: float
+    oneri_fissi_eur_anno: float
+    oneri_variabili_eur_kwh: float
+
+
+class TariffaGas:
+    """
+    Quota fissa e scaglioni progressivi (rete + oneri) di un ambito. Il costo
+    cumulato all'inizio di ogni scaglione e' precalcolato: il costo annuo di
+    un consumo richiede solo la ricerca dello scaglione.
+    """
+
+    __slots__ = ("ambito", "quota_fissa_eur_anno", "_inizi", "_tariffe", "_cumulati")
+
+    def __init__(self, ambito: str, quota_fissa_eur_anno: Decimal, scaglioni: list[tuple[Decimal, Decimal]]):
+        self.ambito = ambito
+        self.quota_fissa_eur_anno = quota_fissa_eur_anno
+        self._inizi = [inizio for inizio, _ in scaglioni]
+        self._tariffe = [tariffa for _, tariffa in scaglioni]
+        self._cumulati = [Decimal("0")]
+        for i in range(1, len(scaglioni)):
+            self._cumulati.append(self._cumulati[-1] + (self._inizi[i] - self._inizi[i - 1]) * self._tariffe[i - 1])
+
+    def costo_variabile_annuo(self, consumo_annuo: Decimal) -> Decimal:
+        i = max(bisect.bisect_right(self._inizi, consumo_annuo) - 1, 0)
+        return self._cumulati[i] + (consumo_annuo - self._inizi[i]) * self._tariffe[i]
+
+    def costo_medio_smc(self, consumo_annuo: Decimal) -> Decimal:
+        """Costo variabile medio per Smc a un dato consumo annuo."""
+        if consumo_annuo <= 0:
+            return self._tariffe[0]
+        return self.costo_variabile_annuo(consumo_annuo) / consumo_annuo
+
+
+class TabelleTariffe:
+    def __init__(
+        self,
+        gas: dict[str, TariffaGas],
+        comuni: dict[str, str],
+        luce: dict[str, tuple[list[float], list[TariffaLuce]]],
+        impronta: str,
+    ):
+        self.gas = gas
+        self.comuni = comuni
+        self._luce = luce
+        # (classe, potenza) -> tariffa: il profilo ne usa una sola coppia
+        self._luce_per_potenza: dict[tuple[str, float], TariffaLuce] = {}
+        self.impronta = impronta
+
+    def ambito_gas(self, comune: str | None = None, ambito: str | None = None, zona: str | None = None) -> str:
+        """Ambito esplicito, altrimenti quello del comune, altrimenti quello predefinito della zona."""
+        if ambito:
+            ambito = ambito.upper()
+            if ambito not in self.gas:
+                raise ValueError(f"Ambito tariffario gas sconosciuto: {ambito}. Scegli tra: {sorted(self.gas)}")
+            return ambito
+        if comune:
+            try:
+                return self.comuni[normalizza_comune(comune)]
+            except KeyError:
+                raise ValueError(f"Comune non presente in gas_comuni.csv: {comune}") from None
+        return AMBITO_PER_ZONA[zona or "CENTRO_NORD"]
+
+    def tariffa_gas(self, ambito: str) -> TariffaGas:
+        try:
+            return self.gas[ambito.upper()]
+        except KeyError:
+            raise ValueError(f"Ambito tariffario gas sconosciuto: {ambito}. Scegli tra: {sorted(self.gas)}") from None
+
+    def tariffa_luce(self, classe: str, potenza_kw: float) -> TariffaLuce:
+        chiave = (classe, potenza_kw)
+        tariffa = self._luce_per_potenza.get(chiave)
+        if tariffa is None:
+            if classe not in self._luce:
+                raise ValueError(f"Classe tariffaria luce sconosciuta: {classe}. Scegli tra: {sorted(self._luce)}")
+            limiti, tariffe = self._luce[classe]
+            # Fasce (da, a]: l'ultima e' aperta
+            i = min(bisect.bisect_left(limiti, potenza_kw), len(tariffe) - 1)
+            tariffa = self._luce_per_potenza[chiave] = tariffe[i]
+        return tariffa
+
+
+def _leggi(testi: dict[str, str], nome: str):
+    """Righe del CSV con il numero di riga, per messaggi d'errore utili."""
+    for numero, riga in enumerate(csv.DictReader(io.StringIO(testi[nome])), start=2):
+        yield numero, riga
+
+
+def _costruisci(testi: dict[str, str], impronta: str) -> TabelleTariffe:
+    quote_fisse = {}
+    for numero, riga in _leggi(testi, "gas_ambiti.csv"):
+        try:
+            quote_fisse[riga["ambito"].strip().upper()] = Decimal(riga["quota_fissa_eur_anno"])
+        except (KeyError, ArithmeticError) as e:
+            raise ValueError(f"gas_ambiti.csv:{numero}: riga non valida ({e})") from None
+
+    scaglioni: dict[str, list[tuple[Decimal, Decimal | None, Decimal]]] = {}
+    for numero, riga in _leggi(testi, "gas_scaglioni.csv"):
+        try:
+            ambito = riga["ambito"].strip().upper()
+            fine = Decimal(riga["a_smc"]) if riga["a_smc"].strip() else None
+            tariffa = Decimal(riga["rete_eur_smc"]) + Decimal(riga["oneri_eur_smc"])
+            scaglioni.setdefault(ambito, []).append((Decimal(riga["da_smc"]), fine, tariffa))
+        except (KeyError, AttributeError, ArithmeticError) as e:
+            raise ValueError(f"gas_scaglioni.csv:{numero}: riga non valida ({e})") from None
+
+    gas = {}
+    for ambito, quota_fissa in quote_fisse.items():
+        righe = sorted(scaglioni.get(ambito, []), key=lambda r: r[0])
+        contigui = all(righe[i][1] == righe[i + 1][0] for i in range(len(righe) - 1))
+        if not righe or righe[0][0] != 0 or righe[-1][1] is not None or not contigui:
+            raise ValueError(f"gas_scaglioni.csv: gli scaglioni di {ambito} devono partire da 0, essere contigui e finire aperti")
+        gas[ambito] = TariffaGas(ambito, quota_fissa, [(inizio, tariffa) for inizio, _, tariffa in righe])
+
+    comuni = {}
+    for numero, riga in _leggi(testi, "gas_comuni.csv"):
+        ambito = (riga.get("ambito") or "").strip().upper()
+        if ambito not in gas:
+            raise ValueError(f"gas_comuni.csv:{numero}: ambito sconosciuto {ambito!r}")
+        comuni[normalizza_comune(riga["comune"])] = ambito
+
+    fasce: dict[str, list[tuple[float, TariffaLuce]]] = {}
+    for numero, riga in _leggi(testi, "luce_tariffe.csv"):
+        try:
+            fine = float(riga["potenza_a_kw"]) if riga["potenza_a_kw"].strip() else float("inf")
+            tariffa = TariffaLuce(*(float(riga[campo]) for campo in TariffaLuce._fields))
+            fasce.setdefault(riga["classe"].strip().upper(), []).append((fine, tariffa))
+        except (KeyError, AttributeError, ValueError) as e:
+            raise ValueError(f"luce_tariffe.csv:{numero}: riga non valida ({e})") from None
+    luce = {}
+    for classe, righe in fasce.items():
+        righe.sort(key=lambda r: r[0])
+        luce[classe] = ([fine for fine, _ in righe], [tariffa for _, tariffa in righe])
+
+    return TabelleTariffe(gas, comuni, luce, impronta)
+
+
+_lock = threading.Lock()
+
+
+@lru_cache(maxsize=4)
+def _carica(cartella: str, firma: tuple) -> TabelleTariffe:
+    testi = {}
+    hash_file = hashlib.sha256()
+    for nome in FILE_TABELLE:
+        with open(os.path.join(cartella, nome), "rb") as f:
+            contenuto = f.read()
+        hash_file.update(nome.encode() + b"\0" + contenuto)
+        testi[nome] = contenuto.decode("utf-8-sig")
+    return _costruisci(testi, hash_file.hexdigest())
+
+
+def tabelle_tariffe(cartella: str) -> TabelleTariffe:
+    """Tabelle condivise della cartella, ricaricate solo se un file e' cambiato."""
+    cartella = os.path.abspath(cartella)
+    firma = []
+    for nome in FILE_TABELLE:
+        stat = os.stat(os.path.join(cartella, nome))
+        firma.append((stat.st_mtime_ns, stat.st_size))
+    with _lock:
+        return _carica(cartella, tuple(firma))
@@ -0,0 +1,284 @@
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from loguru import logger
+from pydantic import ValidationError
+
+from src.model import Offerta
+from .config import config
+from .main import CALCOLATORI, extract_data, get_cache_prezzi, load_cached_offers, read_prompt
+from .prezzo.indice import IndiceOfferte
+
+
+class RichiestaNonValida(Exception):
+    """Errore nei dati della richiesta: risposta 400."""
+
+
+class StatoServizio:
+    """
+    Stato condiviso dal servizio: catalogo offerte, prompt e indici di
+    classifica restano in memoria tra una richiesta e l'altra.
+
+    Gli indici sono costruiti alla prima classifica per (tipo, periodo) e
+    invalidati quando il catalogo del tipo o la configurazione cambiano.
+    I file env vengono controllati al piu' ogni `intervallo_ricarica` secondi.
+    """
+
+    def __init__(self, use_cache: bool = True, intervallo_ricarica: float = 2.0):
+        self.use_cache = use_cache
+        self.intervallo_ricarica = intervallo_ricarica
+        self.offerte: dict[str, dict[tuple[str, str], Offerta]] = {tipo: {} for tipo in CALCOLATORI}
+        self._prompt: dict[str, str] = {}
+        self._indici: dict[tuple[str, str], IndiceOfferte] = {}
+        # Versione del catalogo per tipo (e della configurazione): un indice
+        # costruito su una versione superata non viene pubblicato
+        self._versioni: dict[str, int] = {tipo: 0 for tipo in CALCOLATORI}
+        self._lock = threading.Lock()
+        self._prossima_ricarica = time.monotonic() + intervallo_ricarica
+
+    def ricarica_config(self):
+        """Applica eventuali modifiche ai file env: le classifiche vengono ricostruite."""
+        with self._lock:
+            adesso = time.monotonic()
+            if adesso < self._prossima_ricarica:
+                return
+            self._prossima_ricarica = adesso + self.intervallo_ricarica
+        if config.ricarica():
+            with self._lock:
+                self._indici.clear()
+                for tipo in self._versioni:
+                    self._versioni[tipo] += 1
+
+    def _verifica_tipo(self, tipo: str | None) -> str:
+        if tipo not in CALCOLATORI:
+            raise RichiestaNonValida(f"Tipo sconosciuto: {tipo}")
+        return tipo
+
+    def aggiungi(self, tipo: str, offerta: Offerta):
+        tipo = self._verifica_tipo(tipo)
+        with self._lock:
+            self.offerte[tipo][(offerta.nome_offerta, offerta.gestore)] = offerta
+            self._versioni[tipo] += 1
+            for chiave in [k for k in self._indici if k[0] == tipo]:
+                del self._indici[chiave]
+
+    def elenco(self, tipo: str) -> list[Offerta]:
+        tipo = self._verifica_tipo(tipo)
+        with self._lock:
+            return list(self.offerte[tipo].values())
+
+    def prompt(self, tipo: str) -> str:
+        tipo = self._verifica_tipo(tipo)
+        with self._lock:
+            prompt = self._prompt.get(tipo)
+        if prompt is None:
+            prompt = read_prompt(tipo)
+            with self._lock:
+                prompt = self._prompt.setdefault(tipo, prompt)
+        return prompt
+
+    def indice(self, tipo: str, periodo: str) -> IndiceOfferte:
+        tipo = self._verifica_tipo(tipo)
+        if periodo not in ("offerta", "finita"):
+            raise RichiestaNonValida(f"Periodo sconosciuto: {periodo}")
+        with self._lock:
+            indice = self._indici.get((tipo, periodo))
+            if indice is not None:
+                return indice
+            offerte, versione = list(self.offerte[tipo].values()), self._versioni[tipo]
+        # Costruzione fuori dal lock: catalogo e altre richieste restano disponibili
+        indice = IndiceOfferte(offerte, CALCOLATORI[tipo], periodo=periodo)
+        with self._lock:
+            if self._versioni[tipo] == versione:
+                indice = self._indici.setdefault((tipo, periodo), indice)
+        return indice
+
+    def prezza(self, tipo: str, offerta: Offerta, profilo: dict | None = None) -> dict:
+        """Prezzi dell'offerta, con il profilo (chiavi CHIAVI_CONFIG) al posto della configurazione."""
+        tipo = self._verifica_tipo(tipo)
+        calcolatore = CALCOLATORI[tipo]
+        profilo_config = None
+        if profilo:
+            sconosciute = sorted(set(profilo) - set(calcolatore.CHIAVI_CONFIG))
+            if sconosciute:
+                raise RichiestaNonValida(f"Chiavi del profilo non valide per {tipo}: {', '.join(sconosciute)}")
+            profilo_config = config.con_valori(profilo)
+        risultato = get_cache_prezzi().calcola(calcolatore, offerta, use_cache=self.use_cache, config=profilo_config)
+        return risultato.model_dump()
+
+    def estrai(self, tipo: str, contenuto: bytes) -> Offerta:
+        """Estrae l'offerta da un PDF caricato e la aggiunge al catalogo."""
+        prompt = self.prompt(tipo)
+        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as f:
+            f.write(contenuto)
+            pdf_path = f.name
+        try:
+            # Ogni richiesta ha il suo file temporaneo; la cache di estrazione e'
+            # indicizzata sul contenuto, cosi' ricaricare lo stesso PDF la riusa
+            offerta = extract_data(
+                pdf_path, prompt_text=prompt, use_cache=self.use_cache,
+                identita=f"sha256:{hashlib.sha256(contenuto).hexdigest()}",
+            )
+        finally:
+            os.remove(pdf_path)
+        self.aggiungi(tipo, offerta)
+        return offerta
+
+    def precarica(self, cartelle: dict[str, str]):
+        """Estrae (di norma dalla cache) le offerte presenti nelle cartelle."""
+        for tipo, folder in cartelle.items():
+            if not folder or not os.path.isdir(folder):
+                logger.warning(f"Cartella non trovata per {tipo}: {folder}")
+                continue
+            percorsi = [os.path.join(folder, f) for f in sorted(os.listdir(folder)) if f.lower().endswith(".pdf")]
+            in_cache = load_cached_offers({tipo: percorsi}, {tipo: self.prompt(tipo)}) if self.use_cache else {}
+            for pdf_path in percorsi:
+                try:
+                    offerta = in_cache.get(pdf_path) or extract_data(
+                        pdf_path, prompt_text=self.prompt(tipo), use_cache=self.use_cache
+                    )
+                    self.aggiungi(tipo, offerta)
+                except Exception as e:
+                    logger.error(f"[{pdf_path}] Offerta non caricata: {e}")
+            logger.info(f"Catalogo {tipo}: {len(self.offerte[tipo])} offerte")
+
+
+class GestoreRichieste(BaseHTTPRequestHandler):
+    """
+    Endpoint JSON:
+        GET  /offerte?tipo=luce                  catalogo in memoria
+        POST /offerte?tipo=luce                  aggiunge un'Offerta gia' estratta
+        POST /prezzo                             {"tipo", "offerta", "profilo"?} -> DatiPrezzo
+        GET  /classifica?tipo=&consumo=&indice=&k=&periodo=
+        POST /estrai?tipo=luce                   corpo: PDF -> Offerta estratta
+    """
+
+    stato: StatoServizio
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        logger.debug(f"{self.address_string()} {format % args}")
+
+    def _rispondi(self, stato: int, corpo):
+        payload = json.dumps(corpo, ensure_ascii=False).encode("utf-8")
+        self.send_response(stato)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _corpo(self) -> bytes:
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def _json(self) -> dict:
+        try:
+            corpo = json.loads(self._corpo() or b"{}")
+        except json.JSONDecodeError as e:
+            raise RichiestaNonValida(f"JSON non valido: {e}")
+        if not isinstance(corpo, dict):
+            raise RichiestaNonValida("Il corpo della richiesta deve essere un oggetto JSON")
+        return corpo
+
+    def _gestisci(self, metodo: str):
+        self.stato.ricarica_config()
+        url = urlparse(self.path)
+        parametri = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        azione = self.ROTTE.get((metodo, url.path))
+        if azione is None:
+            self._rispondi(HTTPStatus.NOT_FOUND, {"errore": f"Endpoint sconosciuto: {metodo} {url.path}"})
+            return
+        try:
+            self._rispondi(HTTPStatus.OK, azione(self, parametri))
+        except (RichiestaNonValida, ValidationError, ValueError) as e:
+            self._rispondi(HTTPStatus.BAD_REQUEST, {"errore": str(e)})
+        except Exception as e:
+            logger.exception(f"Errore durante {metodo} {url.path}")
+            self._rispondi(HTTPStatus.INTERNAL_SERVER_ERROR, {"errore": str(e)})
+
+    def do_GET(self):
+        self._gestisci("GET")
+
+    def do_POST(self):
+        self._gestisci("POST")
+
+    def offerte(self, parametri: dict):
+        return [o.model_dump(mode="json") for o in self.stato.elenco(parametri.get("tipo"))]
+
+    def aggiungi_offerta(self, parametri: dict):
+        offerta = Offerta.model_validate(self._json())
+        self.stato.aggiungi(parametri.get("tipo"), offerta)
+        return offerta.model_dump(mode="json")
+
+    def prezzo(self, parametri: dict):
+        richiesta = self._json()
+        offerta = Offerta.model_validate(richiesta.get("offerta"))
+        return self.stato.prezza(richiesta.get("tipo"), offerta, richiesta.get("profilo"))
+
+    def classifica(self, parametri: dict):
+        try:
+            consumo = float(parametri["consumo"])
+            indice = float(parametri["indice"])
+        except KeyError as e:
+            raise RichiestaNonValida(f"Parametro mancante: {e.args[0]}")
+        k = int(parametri.get("k", 5))
+        indice_offerte = self.stato.indice(parametri.get("tipo"), parametri.get("periodo", "offerta"))
+        return [p._asdict() for p in indice_offerte.migliori(consumo, indice, k)]
+
+    def estrai(self, parametri: dict):
+        contenuto = self._corpo()
+        if not contenuto.startswith(b"%PDF"):
+            raise RichiestaNonValida("Il corpo della richiesta non e' un PDF")
+        return self.stato.estrai(parametri.get("tipo"), contenuto).model_dump(mode="json")
+
+    ROTTE = {
+        ("GET", "/offerte"): offerte,
+        ("POST", "/offerte"): aggiungi_offerta,
+        ("POST", "/prezzo"): prezzo,
+        ("GET", "/classifica"): classifica,
+        ("POST", "/estrai"): estrai,
+    }
+
+
+def crea_server(stato: StatoServizio, host: str = "127.0.0.1", porta: int = 8765) -> ThreadingHTTPServer:
+    """Server HTTP multi-thread legato allo stato indicato."""
+    gestore = type("GestoreRichiesteStato", (GestoreRichieste,), {"stato": stato})
+    server = ThreadingHTTPServer((host, porta), gestore)
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servizio HTTP locale per prezzi e classifiche delle offerte")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--porta", type=int, default=config.get("SERVER_PORTA"))
+    parser.add_argument("--no-cache", action="store_true", help="Disabilita la cache di estrazione e prezzi")
+    parser.add_argument("--intervallo-ricarica", type=float, default=2.0,
+                        help="Secondi minimi tra due controlli dei file env")
+    parser.add_argument("--precarica", action="store_true",
+                        help="Carica all'avvio le offerte delle cartelle PATH_OFFERTE_LUCE/GAS")
+    args = parser.parse_args()
+
+    stato = StatoServizio(use_cache=not args.no_cache, intervallo_ricarica=args.intervallo_ricarica)
+    if args.precarica:
+        stato.precarica({"luce": config.get("PATH_OFFERTE_LUCE"), "gas": config.get("PATH_OFFERTE_GAS")})
+
+    server = crea_server(stato, args.host, args.porta)
+    logger.info(f"Servizio prezzi in ascolto su http://{args.host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Servizio interrotto.")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+import hashlib
+import json
+import math
+import os
+import sqlite3
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import pandas as pd
+from loguru import logger
+
+from src.model import Offerta
+from ..prezzo.abc import impronta_offerta
+
+
+SCENARI = ["prezzo_offerta_mensile", "prezzo_finita_medio_mensile", "prezzo_finita_peggiore_mensile"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS esecuzioni (
+    run_id TEXT PRIMARY KEY,
+    timestamp TEXT NOT NULL,
+    impronta_config TEXT NOT NULL,
+    argomenti TEXT
+);
+CREATE TABLE IF NOT EXISTS offerte (
+    hash_offerta TEXT PRIMARY KEY,
+    nome_offerta TEXT NOT NULL,
+    gestore TEXT NOT NULL,
+    dati TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS risultati (
+    hash_risultato TEXT PRIMARY KEY,
+    hash_offerta TEXT NOT NULL REFERENCES offerte(hash_offerta),
+    tipo TEXT NOT NULL,
+    prezzo_offerta_mensile REAL,
+    prezzo_finita_medio_mensile REAL,
+    prezzo_finita_peggiore_mensile REAL,
+    dati TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS esecuzioni_risultati (
+    run_id TEXT NOT NULL REFERENCES esecuzioni(run_id),
+    hash_risultato TEXT NOT NULL REFERENCES risultati(hash_risultato),
+    PRIMARY KEY (run_id, hash_risultato)
+);
+CREATE INDEX IF NOT EXISTS idx_esecuzioni_timestamp ON esecuzioni(timestamp);
+CREATE INDEX IF NOT EXISTS idx_offerte_nome ON offerte(nome_offerta, gestore);
+CREATE INDEX IF NOT EXISTS idx_risultati_offerta ON risultati(hash_offerta);
+CREATE INDEX IF NOT EXISTS idx_esecuzioni_risultati_risultato ON esecuzioni_risultati(hash_risultato);
+"""
+
+
+def _valore(v):
+    """Converte NaN/NA di pandas in None per JSON e SQLite."""
+    if v is None or (isinstance(v, float) and math.isnan(v)) or v is pd.NA:
+        return None
+    return v.item() if hasattr(v, "item") else v
+
+
+class StoricoRisultati:
+    """
+    Archivio storico append-only dei risultati, su SQLite.
+
+    Ogni esecuzione registra run id, timestamp e impronta della configurazione.
+    Offerte e righe di risultato sono salvate una sola volta, identificate
+    dal loro hash di contenuto: un'esecuzione che ritrova righe invariate
+    aggiunge solo i riferimenti in esecuzioni_risultati.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        cartella = os.path.dirname(path)
+        if cartella:
+            os.makedirs(cartella, exist_ok=True)
+        with self._connetti() as conn:
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connetti(self):
+        conn = sqlite3.connect(self.path)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def registra_esecuzione(self, risultati: dict[str, pd.DataFrame], impronta_config: str,
+                            argomenti: dict | None = None) -> str:
+        """Aggiunge un'esecuzione con i risultati per fornitura e restituisce il run id."""
+        run_id = uuid.uuid4().hex
+        timestamp = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        campi_offerta = list(Offerta.model_fields)
+
+        offerte, righe, riferimenti = [], [], []
+        for tipo, df in risultati.items():
+            for record in df.to_dict(orient="records"):
+                record = {k: _valore(v) for k, v in record.items()}
+                offerta = Offerta(**{k: record.get(k) for k in campi_offerta})
+                hash_offerta = impronta_offerta(offerta)
+                dati = json.dumps(record, sort_keys=True, ensure_ascii=False)
+                hash_risultato = hashlib.sha256(
+                    "\n".join([tipo, hash_offerta, dati]).encode("utf-8")
+                ).hexdigest()
+
+                offerte.append((hash_offerta, offerta.nome_offerta, offerta.gestore,
+                                json.dumps(offerta.model_dump(), sort_keys=True, ensure_ascii=False)))
+                righe.append((hash_risultato, hash_offerta, tipo,
+                              *[record.get(s) for s in SCENARI], dati))
+                riferimenti.append((run_id, hash_risultato))
+
+        with self._connetti() as conn:
+            conn.execute(
+                "INSERT INTO esecuzioni (run_id, timestamp, impronta_config, argomenti) VALUES (?, ?, ?, ?)",
+                (run_id, timestamp, impronta_config, json.dumps(argomenti or {}, default=str)),
+            )
+            conn.executemany("INSERT OR IGNORE INTO offerte VALUES (?, ?, ?, ?)", offerte)
+            nuove = conn.total_changes
+            conn.executemany("INSERT OR IGNORE INTO risultati VALUES (?, ?, ?, ?, ?, ?, ?)", righe)
+            nuove = conn.total_changes - nuove
+            conn.executemany("INSERT OR IGNORE INTO esecuzioni_risultati VALUES (?, ?)", riferimenti)
+
+        logger.info(f"Storico: esecuzione {run_id} registrata ({len(riferimenti)} righe, {nuove} nuove).")
+        return run_id
+
+    def storico_offerta(self, nome_offerta: str, gestore: str | None = None) -> pd.DataFrame:
+        """Costo nel tempo di un'offerta, un record per esecuzione."""
+        query = """
+            SELECT e.run_id, e.timestamp, e.impronta_config, r.tipo, o.nome_offerta, o.gestore,
+                   r.prezzo_offerta_mensile, r.prezzo_finita_medio_mensile, r.prezzo_finita_peggiore_mensile
+            FROM offerte o
+            JOIN risultati r ON r.hash_offerta = o.hash_offerta
+            JOIN esecuzioni_risultati er ON er.hash_risultato = r.hash_risultato
+            JOIN esecuzioni e ON e.run_id = er.run_id
+            WHERE o.nome_offerta = ?
+        """
+        parametri = [nome_offerta]
+        if gestore is not None:
+            query += " AND o.gestore = ?"
+            parametri.append(gestore)
+        query += " ORDER BY e.timestamp"
+        with self._connetti() as conn:
+            return pd.read_sql_query(query, conn, params=parametri)
+
+    def migliore_per_settimana(self, tipo: str, scenario: str = "prezzo_offerta_mensile") -> pd.DataFrame:
+        """Offerta piu' economica di ogni settimana per fornitura e scenario."""
+        if scenario not in SCENARI:
+            raise ValueError(f"Scenario non valido. Scegli tra: {SCENARI}")
+        query = f"""
+            SELECT settimana, nome_offerta, gestore, prezzo, timestamp FROM (
+                SELECT strftime('%Y-%W', e.timestamp) AS settimana, o.nome_offerta, o.gestore,
+                       r.{scenario} AS prezzo, e.timestamp,
+                       ROW_NUMBER() OVER (
+                           PARTITION BY strftime('%Y-%W', e.timestamp)
+                           ORDER BY r.{scenario}, e.timestamp DESC
+                       ) AS posizione
+                FROM risultati r
+                JOIN esecuzioni_risultati er ON er.hash_risultato = r.hash_risultato
+                JOIN esecuzioni e ON e.run_id = er.run_id
+                JOIN offerte o ON o.hash_offerta = r.hash_offerta
+                WHERE r.tipo = ? AND r.{scenario} IS NOT NULL
+            )
+            WHERE posizione = 1
+            ORDER BY settimana
+        """
+        with self._connetti() as conn:
+            return pd.read_sql_query(query, conn, params=[tipo])
+
+    def esecuzioni(self) -> pd.DataFrame:
+        with self._connetti() as conn:
+            return pd.read_sql_query("SELECT * FROM esecuzioni ORDER BY timestamp", conn)
@@ -0,0 +1,136 @@
+import json
+import os
+import threading
+import time
+
+
+class _SpanNullo:
+    """Span usato a tracciamento disabilitato: non registra nulla."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def imposta(self, **attributi):
+        pass
+
+
+_SPAN_NULLO = _SpanNullo()
+
+
+class _Span:
+    __slots__ = ("tracer", "nome", "attributi", "inizio_ns")
+
+    def __init__(self, tracer: "Tracer", nome: str, attributi: dict):
+        self.tracer = tracer
+        self.nome = nome
+        self.attributi = attributi
+        self.inizio_ns = 0
+
+    def __enter__(self):
+        self.inizio_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        durata_ns = time.perf_counter_ns() - self.inizio_ns
+        if exc_type is not None:
+            self.attributi["errore"] = exc_type.__name__
+        self.tracer._registra(self.nome, self.inizio_ns, durata_ns, self.attributi)
+        return False
+
+    def imposta(self, **attributi):
+        """Aggiunge attributi allo span (es. esito di una lookup)."""
+        self.attributi.update(attributi)
+
+
+class Tracer:
+    """
+    Strumentazione a span delle fasi di una esecuzione.
+
+    Disabilitato di default: span() restituisce un oggetto nullo condiviso,
+    per cui il costo sul percorso critico e' un solo controllo.
+    Gli span registrati si esportano in formato Chrome trace
+    (chrome://tracing, Perfetto) o come tabella riepilogativa per fase.
+    """
+
+    def __init__(self):
+        self.abilitato = False
+        self._eventi: list[tuple] = []
+        self._origine_ns = time.perf_counter_ns()
+
+    def abilita(self):
+        self.abilitato = True
+
+    def disabilita(self):
+        self.abilitato = False
+
+    def reset(self):
+        self._eventi = []
+        self._origine_ns = time.perf_counter_ns()
+
+    def span(self, nome: str, **attributi):
+        if not self.abilitato:
+            return _SPAN_NULLO
+        return _Span(self, nome, attributi)
+
+    def _registra(self, nome: str, inizio_ns: int, durata_ns: int, attributi: dict):
+        # list.append e' atomica: nessun lock necessario tra thread
+        self._eventi.append((nome, inizio_ns, durata_ns, threading.get_ident(), attributi))
+
+    def durate(self, nome: str) -> list[float]:
+        """Durate in millisecondi degli span con il nome indicato."""
+        return [durata / 1e6 for n, _, durata, _, _ in self._eventi if n == nome]
+
+    def esporta_chrome_trace(self, path: str):
+        """Scrive gli span nel formato JSON di Chrome trace."""
+        pid = os.getpid()
+        eventi = [
+            {
+                "name": nome,
+                "cat": "gestore-energia",
+                "ph": "X",
+                "ts": (inizio_ns - self._origine_ns) / 1e3,
+                "dur": durata_ns / 1e3,
+                "pid": pid,
+                "tid": tid,
+                "args": {k: str(v) for k, v in attributi.items()},
+            }
+            for nome, inizio_ns, durata_ns, tid, attributi in self._eventi
+        ]
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": eventi, "displayTimeUnit": "ms"}, f)
+
+    def riepilogo(self) -> list[dict]:
+        """Statistiche per fase: numero di span, totale, media, p95 e massimo in ms."""
+        per_fase: dict[str, list[float]] = {}
+        for nome, _, durata_ns, _, _ in self._eventi:
+            per_fase.setdefault(nome, []).append(durata_ns / 1e6)
+
+        righe = []
+        for nome, durate in per_fase.items():
+            durate.sort()
+            righe.append({
+                "fase": nome,
+                "conteggio": len(durate),
+                "totale_ms": sum(durate),
+                "medio_ms": sum(durate) / len(durate),
+                "p95_ms": durate[min(len(durate) - 1, int(0.95 * len(durate)))],
+                "max_ms": durate[-1],
+            })
+        return sorted(righe, key=lambda r: r["totale_ms"], reverse=True)
+
+    def tabella_riepilogo(self) -> str:
+        """Riepilogo per fase formattato come tabella di testo."""
+        intestazione = f"{'fase':<20} {'n':>6} {'totale ms':>12} {'medio ms':>10} {'p95 ms':>10} {'max ms':>10}"
+        righe = [intestazione, "-" * len(intestazione)]
+        for r in self.riepilogo():
+            righe.append(
+                f"{r['fase']:<20} {r['conteggio']:>6} {r['totale_ms']:>12.2f} "
+                f"{r['medio_ms']:>10.2f} {r['p95_ms']:>10.2f} {r['max_ms']:>10.2f}"
+            )
+        return "\n".join(righe)
+
+
+tracer = Tracer()
@@ -0,0 +1,250 @@
+import os
+import threading
+import time
+from typing import Any, Callable
+
+from loguru import logger
+
+from src.model import Offerta
+from .pipeline import PipelineForniture, Riga
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # watchdog e' opzionale: si usa solo il polling
+    FileSystemEventHandler = object
+    Observer = None
+
+
+class _NotificaModifiche(FileSystemEventHandler):
+    def __init__(self, evento: threading.Event):
+        self.evento = evento
+
+    def on_any_event(self, event):
+        self.evento.set()
+
+
+class ModalitaWatch:
+    """
+    Processo che osserva le cartelle delle offerte e rielabora solo i PDF
+    nuovi o modificati.
+
+    Con watchdog installato le notifiche del filesystem (inotify su Linux)
+    risvegliano subito il ciclo; altrimenti le cartelle vengono scansionate
+    ogni `intervallo` secondi. In entrambi i casi i cambiamenti vengono
+    confrontati con l'ultima scansione (mtime e dimensione) e attesi finche'
+    restano stabili per `debounce` secondi, cosi' una copia in corso non
+    viene letta a meta'.
+
+    Le righe gia' calcolate restano in memoria tra un ciclo e l'altro: a ogni
+    modifica vengono estratti e prezzati solo i file interessati e l'output
+    viene riscritto solo per le forniture cambiate. Se `ricarica` segnala
+    una configurazione cambiata, tutti i file vengono rielaborati.
+
+    Un file la cui elaborazione fallisce viene ritentato dopo
+    `attesa_tentativi` secondi, raddoppiati a ogni nuovo fallimento; dopo
+    `max_tentativi` fallimenti resta fermo finche' il file non cambia (o la
+    configurazione viene ricaricata), cosi' un PDF illeggibile non richiama
+    il modello all'infinito.
+    """
+
+    def __init__(
+        self,
+        cartelle: dict[str, str],
+        estrai: Callable[[str, str], Offerta | None],
+        prezza: Callable[[str, Offerta], Riga | None],
+        concludi: Callable[[str, list[Riga]], Any],
+        al_termine: Callable[[dict[str, Any]], None] | None = None,
+        filtro: Callable[[str], bool] | None = None,
+        ricarica: Callable[[], bool] | None = None,
+        intervallo: float = 2.0,
+        debounce: float = 1.0,
+        workers: int = 4,
+        max_tentativi: int = 5,
+        attesa_tentativi: float = 30.0,
+    ):
+        self.cartelle = cartelle
+        self.estrai = estrai
+        self.prezza = prezza
+        self.concludi = concludi
+        self.al_termine = al_termine
+        self.filtro = filtro
+        self.ricarica = ricarica
+        self.intervallo = intervallo
+        self.debounce = debounce
+        self.workers = workers
+        self.max_tentativi = max_tentativi
+        self.attesa_tentativi = attesa_tentativi
+
+        self.snapshot: dict[str, dict[str, tuple[int, int]]] = {tipo: {} for tipo in cartelle}
+        self.righe: dict[str, dict[str, dict]] = {tipo: {} for tipo in cartelle}
+        self.risultati: dict[str, Any] = {}
+        # File falliti: (fallimenti, istante del prossimo tentativo, firma del file al fallimento)
+        self.tentativi: dict[str, tuple[int, float, tuple[int, int]]] = {}
+        self._evento = threading.Event()
+        self._stop = threading.Event()
+
+    def _scansiona(self) -> dict[str, dict[str, tuple[int, int]]]:
+        snapshot = {}
+        for tipo, folder in self.cartelle.items():
+            snapshot[tipo] = {}
+            for entry in os.scandir(folder):
+                if not entry.is_file() or not entry.name.lower().endswith(".pdf"):
+                    continue
+                if self.filtro is not None and not self.filtro(entry.name):
+                    continue
+                stat = entry.stat()
+                snapshot[tipo][entry.path] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def _differenze(self, snapshot) -> dict[str, tuple[list[str], list[str]]]:
+        """Per tipo: (file nuovi o modificati, file rimossi)."""
+        differenze = {}
+        for tipo, attuali in snapshot.items():
+            precedenti = self.snapshot[tipo]
+            cambiati = [p for p, firma in attuali.items() if precedenti.get(p) != firma and self._da_tentare(p, firma)]
+            rimossi = [p for p in precedenti if p not in attuali]
+            if cambiati or rimossi:
+                differenze[tipo] = (cambiati, rimossi)
+        return differenze
+
+    def _da_tentare(self, pdf_path: str, firma: tuple[int, int]) -> bool:
+        """False per un file fallito in attesa del prossimo tentativo o fermo dopo max_tentativi."""
+        tentativo = self.tentativi.get(pdf_path)
+        if tentativo is None:
+            return True
+        fallimenti, prossimo, firma_fallimento = tentativo
+        if firma != firma_fallimento:
+            # Il file e' cambiato: si riparte da zero
+            del self.tentativi[pdf_path]
+            return True
+        return fallimenti < self.max_tentativi and time.monotonic() >= prossimo
+
+    def _registra_fallimenti(self, falliti: set[str], snapshot):
+        adesso = time.monotonic()
+        for attuali in snapshot.values():
+            for pdf_path in falliti & attuali.keys():
+                fallimenti = self.tentativi.get(pdf_path, (0, 0.0, None))[0] + 1
+                attesa = self.attesa_tentativi * 2 ** (fallimenti - 1)
+                self.tentativi[pdf_path] = (fallimenti, adesso + attesa, attuali[pdf_path])
+                if fallimenti >= self.max_tentativi:
+                    logger.warning(f"[{pdf_path}] {fallimenti} tentativi falliti: file ignorato finche' non cambia")
+                else:
+                    logger.warning(f"[{pdf_path}] Tentativo {fallimenti} fallito: nuovo tentativo tra {attesa:.0f}s")
+
+    def _attendi_stabilita(self, snapshot):
+        """Riscansiona finche' le cartelle non cambiano per `debounce` secondi."""
+        while not self._stop.is_set():
+            time.sleep(self.debounce)
+            nuovo = self._scansiona()
+            if nuovo == snapshot:
+                return snapshot
+            snapshot = nuovo
+        return snapshot
+
+    def _elabora(self, differenze: dict[str, tuple[list[str], list[str]]]) -> set[str]:
+        """Elabora le differenze; restituisce i file la cui estrazione o il cui prezzo e' fallito."""
+        falliti: set[str] = set()
+        for tipo, (cambiati, rimossi) in differenze.items():
+            for pdf_path in rimossi:
+                logger.info(f"File rimosso: {pdf_path}")
+                self.righe[tipo].pop(pdf_path, None)
+                self.tentativi.pop(pdf_path, None)
+            for pdf_path in cambiati:
+                logger.info(f"File nuovo o modificato: {pdf_path}")
+
+        # Un errore su un file (es. un 429) non deve fermare gli altri del ciclo
+        def estrai(tipo, pdf_path):
+            try:
+                offerta = self.estrai(tipo, pdf_path)
+            except Exception as e:
+                logger.error(f"[{pdf_path}] Errore durante l'estrazione: {e}")
+                falliti.add(pdf_path)
+                return None
+            return None if offerta is None else (pdf_path, offerta)
+
+        def prezza(tipo, elemento):
+            pdf_path, offerta = elemento
+            try:
+                riga = self.prezza(tipo, offerta)
+            except Exception as e:
+                logger.error(f"[{pdf_path}] Errore durante il calcolo dei prezzi: {e}")
+                falliti.add(pdf_path)
+                return None
+            return None if riga is None else (pdf_path, riga)
+
+        def aggiorna(tipo, righe):
+            self.righe[tipo].update(righe)
+
+        PipelineForniture(estrai, prezza, aggiorna, workers=self.workers).esegui(
+            {tipo: cambiati for tipo, (cambiati, _) in differenze.items()}
+        )
+
+        for tipo in differenze:
+            if self.righe[tipo]:
+                self.risultati[tipo] = self.concludi(tipo, list(self.righe[tipo].values()))
+            else:
+                self.risultati.pop(tipo, None)
+        if self.al_termine is not None and self.risultati:
+            self.al_termine({tipo: self.risultati[tipo] for tipo in self.cartelle if tipo in self.risultati})
+        return falliti
+
+    def ciclo(self) -> bool:
+        """Un controllo delle cartelle; restituisce True se qualcosa e' stato rielaborato."""
+        if self.ricarica is not None and self.ricarica():
+            logger.info("Configurazione cambiata: rielaborazione di tutte le offerte.")
+            self.snapshot = {tipo: {} for tipo in self.cartelle}
+            self.tentativi.clear()
+        snapshot = self._scansiona()
+        if not self._differenze(snapshot):
+            return False
+        snapshot = self._attendi_stabilita(snapshot)
+        differenze = self._differenze(snapshot)
+        try:
+            falliti = self._elabora(differenze)
+        except Exception as e:
+            # Il processo resta attivo: tutti i file del ciclo verranno ritentati
+            logger.error(f"Errore durante l'elaborazione delle modifiche: {e}")
+            falliti = {p for cambiati, _ in differenze.values() for p in cambiati}
+        for cambiati, _ in differenze.values():
+            for pdf_path in set(cambiati) - falliti:
+                self.tentativi.pop(pdf_path, None)
+        self._registra_fallimenti(falliti, snapshot)
+        # I file falliti restano con la firma precedente: vengono ritentati
+        # quando l'attesa e' trascorsa (vedi _da_tentare)
+        for tipo, attuali in snapshot.items():
+            for pdf_path in falliti & attuali.keys():
+                if pdf_path in self.snapshot[tipo]:
+                    attuali[pdf_path] = self.snapshot[tipo][pdf_path]
+                else:
+                    del attuali[pdf_path]
+        self.snapshot = snapshot
+        return True
+
+    def esegui(self):
+        """Ciclo principale fino a stop() o Ctrl+C."""
+        osservatore = None
+        if Observer is not None:
+            osservatore = Observer()
+            for folder in self.cartelle.values():
+                osservatore.schedule(_NotificaModifiche(self._evento), folder, recursive=False)
+            osservatore.start()
+            logger.info("Watch: notifiche del filesystem attive.")
+        else:
+            logger.info(f"Watch: watchdog non installato, polling ogni {self.intervallo}s.")
+
+        try:
+            while not self._stop.is_set():
+                self.ciclo()
+                self._evento.wait(timeout=self.intervallo)
+                self._evento.clear()
+        except KeyboardInterrupt:
+            logger.info("Watch interrotto.")
+        finally:
+            if osservatore is not None:
+                osservatore.stop()
+                osservatore.join()
+
+    def stop(self):
+        self._stop.set()
+        self._evento.set()
@@ -2,3 +2,15 @@ import sys
 from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pytest
+
+from src.config import config
+
+
+@pytest.fixture
+def imposta_config(monkeypatch):
+    """Sostituisce alcuni valori della configurazione condivisa per il test."""
+    def imposta(**valori):
+        monkeypatch.setattr(config, "_impostazioni", config.impostazioni.con_valori(valori))
+    return imposta
@@ -0,0 +1,51 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from src.data_extractor.extractor import EnergyGeminiExtractor, OffertaNonInCache
+from src.main import FORMATI_OUTPUT, extract_data
+from src.output.sinks import SINKS
+
+ROOT = Path(__file__).parent.parent
+
+
+class TestAvvio:
+    """Test suite per l'avvio rapido e la modalita' offline"""
+
+    def test_import_senza_moduli_pesanti(self):
+        """Test che import src.main non carica pandas, openpyxl e google.genai"""
+        codice = (
+            "import sys, json, src.main; "
+            "print(json.dumps([m for m in ('pandas', 'openpyxl', 'google.genai') if m in sys.modules]))"
+        )
+        uscita = subprocess.run([sys.executable, "-c", codice], cwd=ROOT, check=True, capture_output=True, text=True)
+        assert json.loads(uscita.stdout.strip().splitlines()[-1]) == []
+
+    def test_formati_output(self):
+        """Test che le scelte della CLI coincidono con i sink registrati"""
+        assert set(FORMATI_OUTPUT) == set(SINKS)
+
+    @pytest.fixture
+    def cache_dir(self, tmp_path, imposta_config):
+        imposta_config(CACHE_DIR=str(tmp_path), CACHE_TTL_SECONDS=0, GENAI_API_KEY=None)
+        return tmp_path
+
+    def test_offline_legge_cache_scaduta(self, cache_dir):
+        """Test che offline usa la cache (anche scaduta) senza creare il client"""
+        extractor = EnergyGeminiExtractor(model="m", prompt_text="p", offline=True)
+        chiave = extractor.cache.generate_key("offerta.pdf", "m", "p")
+        extractor.cache.save(chiave, {"nome_offerta": "A", "gestore": "G"})
+
+        offerta = extractor.extract("offerta.pdf")
+        assert offerta.nome_offerta == "A"
+        assert extractor._client is None
+
+    def test_offline_file_non_in_cache(self, cache_dir):
+        """Test che offline un PDF non in cache viene saltato"""
+        extractor = EnergyGeminiExtractor(model="m", prompt_text="p", offline=True)
+        with pytest.raises(OffertaNonInCache):
+            extractor.extract("mancante.pdf")
+        assert extract_data("mancante.pdf", prompt_text="p", offline=True) is None
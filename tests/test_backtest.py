@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.config import config
+from src.model import Offerta
+from src.prezzo.backtest import MotoreBacktest, SerieMensile, aggiungi_costi_storici
+from src.prezzo.prezzo_gas import PrezzoGas
+from src.prezzo.prezzo_luce import PrezzoLuce
+
+INDICIZZATA = Offerta(nome_offerta="Indicizzata", gestore="G", fee_offerta=0.02,
+                      tipologia_formula_offerta="standard", costi_fissi_anno=96)
+PROMO = Offerta(nome_offerta="Promo", gestore="G", prezzo_fisso_offerta=0.10, tipologia_formula_offerta="costante",
+                fee_finita=0.05, tipologia_formula_finita="ridotta", durata_mesi=2)
+
+
+def scrivi_serie(path, date, valori):
+    pd.DataFrame({"data": date, "valore": valori}).to_csv(path, index=False)
+    return str(path)
+
+
+class TestBacktest:
+    """Test suite per SerieMensile e MotoreBacktest"""
+
+    def test_media_mensile_da_dati_giornalieri(self, tmp_path):
+        """Test che i dati giornalieri diventano la media di ogni mese, anche se non ordinati"""
+        date = pd.date_range("2023-01-01", "2023-03-31", freq="D")
+        valori = np.where(date.month == 2, 0.2, 0.1) + np.where(date.day == 1, 0.31, 0.0)
+        path = scrivi_serie(tmp_path / "pun.csv", date[::-1], valori[::-1])
+        serie = SerieMensile.da_file(path, str(tmp_path / "cache"))
+        assert serie.mesi.tolist() == [2023 * 12, 2023 * 12 + 1, 2023 * 12 + 2]
+        assert serie.valori == pytest.approx([0.11, 0.2 + 0.31 / 28, 0.11])
+
+    def test_conversione_npy_riusata(self, tmp_path):
+        """Test che il file sorgente viene convertito una volta e riletto dal .npy"""
+        path = scrivi_serie(tmp_path / "psv.csv", ["2024-01-15", "2024-02-15"], [0.4, 0.5])
+        SerieMensile.da_file(path, str(tmp_path))
+        convertiti = list((tmp_path / "serie").glob("*.npy"))
+        assert len(convertiti) == 1
+        mtime = convertiti[0].stat().st_mtime_ns
+        assert SerieMensile.da_file(path, str(tmp_path)).valori.tolist() == [0.4, 0.5]
+        assert convertiti[0].stat().st_mtime_ns == mtime
+
+    def test_cache_contiene_solo_i_mesi(self, tmp_path):
+        """Test che il .npy in cache contiene la serie mensile aggregata e non i dati giornalieri"""
+        date = pd.date_range("2020-01-01", "2021-12-31", freq="D")
+        path = scrivi_serie(tmp_path / "pun.csv", date, np.full(len(date), 0.1))
+        serie = SerieMensile.da_file(path, str(tmp_path))
+        (npy,) = (tmp_path / "serie").glob("*.npy")
+        record = np.load(npy)
+        assert len(record) == len(serie) == 24
+        assert record["valore"] == pytest.approx(serie.valori)
+
+    def test_parquet(self, tmp_path):
+        """Test che la serie si legge anche da Parquet"""
+        pytest.importorskip("pyarrow")
+        path = tmp_path / "pun.parquet"
+        pd.DataFrame({"data": pd.to_datetime(["2024-01-01", "2024-01-02"]), "valore": [0.1, 0.3]}).to_parquet(path)
+        assert SerieMensile.da_file(str(path), str(tmp_path)).valori.tolist() == pytest.approx([0.2])
+
+    def test_colonne_mancanti(self, tmp_path):
+        """Test che un file senza colonne data/valore indica le colonne trovate"""
+        path = tmp_path / "pun.csv"
+        pd.DataFrame({"giorno": ["2024-01-01"], "pun": [0.1]}).to_csv(path, index=False)
+        with pytest.raises(ValueError, match="colonne mancanti"):
+            SerieMensile.da_file(str(path), str(tmp_path))
+
+    @pytest.mark.parametrize("calcolatore, chiave", [(PrezzoLuce, "pun_index_eur_kwh_mean"), (PrezzoGas, "psv_eur_smc")])
+    def test_indice_costante_come_prezzo_offerta(self, calcolatore, chiave):
+        """Test che con l'indice sempre uguale a quello di config il costo mensile e' il prezzo dell'offerta"""
+        mesi = np.arange(2000 * 12, 2030 * 12)
+        serie = SerieMensile(mesi, np.full(len(mesi), float(config.get(chiave))))
+        costi = MotoreBacktest([INDICIZZATA], calcolatore, serie).costi_mensili(360)
+        assert costi.shape == (1, 360)
+        assert costi[0] == pytest.approx(float(calcolatore(INDICIZZATA).calcola_prezzo_offerta()), abs=0.01)
+
+    def test_promo_poi_finita(self):
+        """Test che dopo durata_mesi il costo segue la formula finita e l'indice del mese"""
+        serie = SerieMensile(np.arange(5), np.array([9.0, 9.0, 0.10, 0.20, 0.30]))
+        costi = MotoreBacktest([PROMO], PrezzoLuce, serie).costi_mensili(4)
+        assert costi[0, 0] == costi[0, 1]
+        consumo = config.get("consumption_kwh_monthly") * (1 + config.get("perdite_rete_percent"))
+        assert np.diff(costi[0, 2:]) == pytest.approx([0.1 * consumo])
+
+    def test_aggiungi_costi_storici(self):
+        """Test che le colonne usano i mesi effettivamente disponibili"""
+        serie = SerieMensile(np.arange(6), np.full(6, 0.1))
+        df = pd.DataFrame({"nome_offerta": ["Indicizzata", "Promo"]})
+        risultato = aggiungi_costi_storici(df, [INDICIZZATA, PROMO], PrezzoLuce, serie, 12)
+        assert list(risultato.columns) == ["nome_offerta", "costo_storico_totale_6m", "costo_storico_medio_mensile_6m"]
+        assert risultato["costo_storico_totale_6m"].tolist() == pytest.approx(
+            (risultato["costo_storico_medio_mensile_6m"] * 6).tolist(), abs=0.05)
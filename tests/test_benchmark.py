@@ -0,0 +1,17 @@
+from benchmarks.suite import confronta, misura
+
+
+class TestBenchmark:
+    """Test suite per il confronto con la baseline dei benchmark"""
+
+    def test_confronta_segnala_solo_oltre_soglia(self):
+        """Test che vengono segnalate solo le misure oltre la soglia"""
+        baseline = {"prezzi": 1.0, "excel": 2.0, "cache": 0.5}
+        attuali = {"prezzi": 1.1, "excel": 2.5, "cache": 0.4, "nuova": 9.0}
+        assert confronta(attuali, baseline, soglia=0.2) == ["excel"]
+
+    def test_misura_mediana(self):
+        """Test che misura esegue la funzione per ogni ripetizione piu' il riscaldamento"""
+        chiamate = []
+        assert misura(lambda: chiamate.append(1), ripetizioni=3) >= 0
+        assert len(chiamate) == 4
@@ -0,0 +1,116 @@
+import itertools
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.prezzo.bundle import OttimizzatoreBundle, RegolaBundle, RegoleBundle, normalizza_gestore
+
+SCENARI = ["prezzo_offerta_mensile", "prezzo_finita_medio_mensile", "prezzo_finita_peggiore_mensile"]
+
+
+def catalogo(n: int, gestori: int, seed: int) -> pd.DataFrame:
+    rnd = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "nome_offerta": [f"Offerta {seed}-{i}" for i in range(n)],
+        "gestore": [f"Gestore {i % gestori}" for i in range(n)],
+    })
+    for scenario in SCENARI:
+        df[scenario] = rnd.uniform(40, 120, n).round(2)
+    df.loc[::7, "prezzo_finita_medio_mensile"] = None
+    return df
+
+
+def forza_bruta(df_luce, df_gas, regole: RegoleBundle, scenario: str, k: int) -> list[float]:
+    per_gestore = regole.per_gestore()
+    totali = []
+    for l, g in itertools.product(df_luce.itertuples(), df_gas.itertuples()):
+        pl, pg = getattr(l, scenario), getattr(g, scenario)
+        if pd.isna(pl) or pd.isna(pg):
+            continue
+        stesso = normalizza_gestore(l.gestore) == normalizza_gestore(g.gestore)
+        regola = per_gestore.get(normalizza_gestore(l.gestore))
+        in_l = regola is not None and regola.comprende("luce", l.nome_offerta)
+        in_g = (per_gestore.get(normalizza_gestore(g.gestore)) or RegolaBundle(gestore="-")).comprende("gas", g.nome_offerta) \
+            and normalizza_gestore(g.gestore) in per_gestore
+        vincolo_l = in_l and regola.solo_in_bundle
+        vincolo_g = in_g and per_gestore[normalizza_gestore(g.gestore)].solo_in_bundle
+        if not stesso and (vincolo_l or vincolo_g):
+            continue
+        totale = pl + pg
+        if stesso and in_l and in_g:
+            totale -= totale * regola.sconto_percentuale / 100 + regola.sconto_mensile
+        totali.append(totale)
+    return sorted(totali)[:k]
+
+
+class TestBundle:
+    """Test suite per l'ottimizzatore delle combinazioni luce + gas"""
+
+    def test_normalizza_gestore(self):
+        """Test che suffissi societari, maiuscole e punteggiatura non contano"""
+        assert normalizza_gestore("Sorgenia S.p.A.") == normalizza_gestore("sorgenia") == "sorgenia"
+        assert normalizza_gestore("A2A Energia S.r.l.") == "a2a energia"
+
+    def test_sconto_stesso_gestore(self):
+        """Test che lo sconto vale solo per la coppia dello stesso gestore"""
+        luce = pd.DataFrame({"nome_offerta": ["L1", "L2"], "gestore": ["Alfa S.p.A.", "Beta"], "prezzo_offerta_mensile": [60.0, 55.0]})
+        gas = pd.DataFrame({"nome_offerta": ["G1", "G2"], "gestore": ["Alfa", "Beta"], "prezzo_offerta_mensile": [50.0, 60.0]})
+        regole = RegoleBundle(regole=[RegolaBundle(gestore="alfa", sconto_percentuale=10, sconto_mensile=5)])
+        migliori = OttimizzatoreBundle(luce, gas, regole).migliori("prezzo_offerta_mensile", k=2)
+        assert migliori[["offerta_luce", "offerta_gas", "sconto", "totale"]].values.tolist() == [
+            ["L1", "G1", 16.0, 94.0],
+            ["L2", "G1", 0.0, 105.0],
+        ]
+
+    def test_solo_in_bundle(self):
+        """Test che le offerte solo_in_bundle non si abbinano ad altri gestori"""
+        luce = pd.DataFrame({"nome_offerta": ["L1", "L2"], "gestore": ["Alfa", "Beta"], "prezzo_offerta_mensile": [10.0, 80.0]})
+        gas = pd.DataFrame({"nome_offerta": ["G1", "G2"], "gestore": ["Alfa", "Beta"], "prezzo_offerta_mensile": [90.0, 20.0]})
+        regole = RegoleBundle(regole=[RegolaBundle(gestore="Alfa", offerte_luce=["L1"], solo_in_bundle=True)])
+        migliori = OttimizzatoreBundle(luce, gas, regole).migliori("prezzo_offerta_mensile", k=5)
+        coppie = list(zip(migliori["offerta_luce"], migliori["offerta_gas"]))
+        # Anche G1 e' nella regola (offerte_gas non indicato): niente L2 + G1
+        assert coppie == [("L1", "G1"), ("L2", "G2")]
+
+    def test_solo_scenari_mensili(self):
+        """Test che i totali su piu' mesi (orizzonte, backtest) non sono scenari del bundle"""
+        colonne = {
+            "prezzo_offerta_mensile": [50.0],
+            "costo_totale_12m_medio": [600.0],
+            "costo_medio_mensile_12m_medio": [50.0],
+            "costo_storico_totale_12m": [600.0],
+            "costo_storico_medio_mensile_12m": [50.0],
+        }
+        luce = pd.DataFrame({"nome_offerta": ["L1"], "gestore": ["Alfa"], **colonne})
+        gas = pd.DataFrame({"nome_offerta": ["G1"], "gestore": ["Alfa"], **colonne})
+        regole = RegoleBundle(regole=[RegolaBundle(gestore="Alfa", sconto_mensile=10)])
+        combinazioni = OttimizzatoreBundle(luce, gas, regole).tutte(k=1)
+        assert combinazioni["scenario"].tolist() == [
+            "prezzo_offerta_mensile", "costo_medio_mensile_12m_medio", "costo_storico_medio_mensile_12m",
+        ]
+        assert combinazioni["totale"].tolist() == [90.0, 90.0, 90.0]
+
+    @pytest.mark.parametrize("seed", [0, 1, 2])
+    def test_come_forza_bruta(self, seed):
+        """Test che la potatura delle offerte dominate non cambia le migliori combinazioni"""
+        luce, gas = catalogo(120, 9, seed), catalogo(90, 11, seed + 100)
+        regole = RegoleBundle(regole=[
+            RegolaBundle(gestore="Gestore 1", sconto_mensile=30),
+            RegolaBundle(gestore="GESTORE 2", sconto_percentuale=25, solo_in_bundle=True),
+            RegolaBundle(gestore="Gestore 3", sconto_mensile=40, offerte_luce=list(luce["nome_offerta"][3::18]),
+                         solo_in_bundle=True),
+        ])
+        ottimizzatore = OttimizzatoreBundle(luce, gas, regole)
+        for scenario in SCENARI:
+            attesi = forza_bruta(luce, gas, regole, scenario, 7)
+            assert ottimizzatore.migliori(scenario, k=7)["totale"].tolist() == pytest.approx(attesi, abs=0.006)
+
+    def test_regole_da_file(self, tmp_path):
+        """Test che il file mancante non applica sconti e che le regole duplicate sono rifiutate"""
+        assert RegoleBundle.da_file(str(tmp_path / "assente.json")).regole == []
+        path = tmp_path / "bundle.json"
+        path.write_text(json.dumps({"regole": [{"gestore": "Alfa"}, {"gestore": "alfa s.p.a."}]}))
+        with pytest.raises(ValueError, match="Piu' regole"):
+            RegoleBundle.da_file(str(path)).per_gestore()
@@ -0,0 +1,117 @@
+import json
+import multiprocessing
+import os
+import random
+import threading
+import time
+from types import SimpleNamespace
+
+from src.config import config
+from src.data_extractor.cache import CacheManager
+from src.data_extractor.extractor import EnergyGeminiExtractor
+
+
+class ClientFinto:
+    """Client Gemini finto: ogni chiamata al modello viene annotata in un file condiviso."""
+
+    def __init__(self, registro: str):
+        self.registro = registro
+        self.files = SimpleNamespace(
+            upload=lambda file: SimpleNamespace(uri=f"file://{file}", mime_type="application/pdf", name=file),
+            delete=lambda name: None,
+        )
+        self.models = SimpleNamespace(generate_content=self.generate_content)
+
+    def generate_content(self, model, contents, config):
+        uri = contents[0].parts[1].file_data.file_uri
+        with open(self.registro, "a", encoding="utf-8") as f:
+            f.write(uri + "\n")
+        time.sleep(0.5)
+        return SimpleNamespace(text=json.dumps({"nome_offerta": os.path.basename(uri), "gestore": "G"}))
+
+
+def estrai_tutti(cache_dir: str, registro: str, percorsi: list[str], seed: int):
+    config._impostazioni = config.impostazioni.con_valori({"CACHE_DIR": cache_dir})
+    extractor = EnergyGeminiExtractor(model="m", prompt_text="p")
+    extractor._client = ClientFinto(registro)
+    percorsi = random.Random(seed).sample(percorsi, len(percorsi))
+    threads = [threading.Thread(target=extractor.extract, args=(p,)) for p in percorsi]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+
+class TestCacheEstrazione:
+    """Test suite per la cache di estrazione condivisa tra processi"""
+
+    def test_voce_corrotta_in_quarantena(self, tmp_path):
+        """Test che una voce troncata viene spostata in quarantena e trattata come assente"""
+        cache = CacheManager(str(tmp_path), float("inf"))
+        (tmp_path / "chiave.json").write_text('{"nome_offerta": "A", "ges', encoding="utf-8")
+        assert cache.load("chiave") is None
+        assert not (tmp_path / "chiave.json").exists()
+        assert len(list((tmp_path / "quarantena").iterdir())) == 1
+
+    def test_quarantena_non_sposta_voce_riscritta(self, tmp_path):
+        """Test che una voce corrotta sostituita da una scrittura concorrente non viene spostata in quarantena"""
+        cache = CacheManager(str(tmp_path), float("inf"))
+        (tmp_path / "chiave.json").write_text('{"nome_offerta": "A", "ges', encoding="utf-8")
+        with open(tmp_path / "chiave.json") as f:
+            letto = os.fstat(f.fileno())
+            cache.save("chiave", {"nome_offerta": "A"})
+            cache._quarantena("chiave", ValueError("troncata"), letto)
+        assert cache.load("chiave") == {"nome_offerta": "A"}
+        assert not (tmp_path / "quarantena").exists()
+
+    def test_lock_rimossi_dopo_uso(self, tmp_path):
+        """Test che il lock di una chiave e' condiviso da chi lo attende e rimosso quando nessuno lo usa"""
+        cache = CacheManager(str(tmp_path), float("inf"))
+        in_attesa = threading.Event()
+
+        def attendi():
+            in_attesa.set()
+            with cache.blocca("chiave"):
+                pass
+
+        with cache.blocca("chiave"):
+            thread = threading.Thread(target=attendi)
+            thread.start()
+            in_attesa.wait()
+            for _ in range(100):
+                if cache._lock_thread["chiave"][1] == 2:
+                    break
+                time.sleep(0.01)
+            assert cache._lock_thread["chiave"][1] == 2
+        thread.join()
+        assert cache._lock_thread == {}
+
+    def test_scrittura_atomica(self, tmp_path):
+        """Test che il salvataggio non lascia file temporanei"""
+        cache = CacheManager(str(tmp_path), float("inf"))
+        cache.save("chiave", {"nome_offerta": "A"})
+        cache.save("chiave", {"nome_offerta": "B"})
+        assert cache.load("chiave") == {"nome_offerta": "B"}
+        assert [p.name for p in tmp_path.iterdir() if p.is_file()] == ["chiave.json"]
+
+    def test_processi_concorrenti_senza_chiamate_duplicate(self, tmp_path):
+        """Test che piu' processi sulla stessa cache chiamano il modello una volta per PDF"""
+        cache_dir = str(tmp_path / "cache")
+        registro = str(tmp_path / "chiamate.txt")
+        percorsi = [f"offerta_{i}.pdf" for i in range(5)]
+
+        contesto = multiprocessing.get_context("spawn")
+        processi = [
+            contesto.Process(target=estrai_tutti, args=(cache_dir, registro, percorsi, seed))
+            for seed in range(4)
+        ]
+        for p in processi:
+            p.start()
+        for p in processi:
+            p.join(timeout=60)
+            assert p.exitcode == 0
+
+        with open(registro, encoding="utf-8") as f:
+            chiamate = f.read().split()
+        assert sorted(chiamate) == sorted(f"file://{p}" for p in percorsi)
+        assert len(os.listdir(tmp_path / "cache" / "risposte")) == len(percorsi)
@@ -0,0 +1,92 @@
+import pytest
+
+from src.model import Offerta
+from src.prezzo.cache import CachePrezzi
+from src.prezzo.prezzo_gas import PrezzoGas
+from src.prezzo.prezzo_luce import PrezzoLuce
+
+
+@pytest.fixture
+def offerta():
+    return Offerta(
+        nome_offerta="Offerta Test",
+        gestore="Gestore Test",
+        prezzo_fisso_offerta=0.37,
+        tipologia_formula_offerta="costante",
+        tipologia_formula_finita="standard",
+        durata_mesi=12,
+        costi_fissi_anno=102,
+        fee_finita=0.15,
+    )
+
+
+@pytest.fixture
+def conta_calcoli(monkeypatch):
+    """Conta le invocazioni di calcola_tutto per classe di prezzo."""
+    conteggi = {"PrezzoLuce": 0, "PrezzoGas": 0}
+    originale = PrezzoLuce.calcola_tutto
+
+    def calcola_tutto(self):
+        conteggi[type(self).__name__] += 1
+        return originale(self)
+
+    monkeypatch.setattr(PrezzoLuce, "calcola_tutto", calcola_tutto)
+    monkeypatch.setattr(PrezzoGas, "calcola_tutto", calcola_tutto)
+    return conteggi
+
+
+class TestCachePrezzi:
+    """Test suite per CachePrezzi"""
+
+    def test_risultato_riutilizzato(self, tmp_path, offerta, conta_calcoli):
+        """Test che un secondo calcolo identico non richiama il calcolatore"""
+        cache = CachePrezzi(str(tmp_path))
+        primo = cache.calcola(PrezzoGas, offerta)
+        secondo = cache.calcola(PrezzoGas, offerta)
+        assert primo == secondo
+        assert conta_calcoli["PrezzoGas"] == 1
+
+    def test_risultato_persistito_su_disco(self, tmp_path, offerta, conta_calcoli):
+        """Test che una nuova istanza legge i risultati salvati"""
+        primo = CachePrezzi(str(tmp_path)).calcola(PrezzoGas, offerta)
+        secondo = CachePrezzi(str(tmp_path)).calcola(PrezzoGas, offerta)
+        assert primo == secondo
+        assert conta_calcoli["PrezzoGas"] == 1
+
+    def test_modifica_offerta_invalida(self, tmp_path, offerta, conta_calcoli):
+        """Test che una modifica all'offerta forza il ricalcolo"""
+        cache = CachePrezzi(str(tmp_path))
+        cache.calcola(PrezzoGas, offerta)
+        cache.calcola(PrezzoGas, offerta.model_copy(update={"costi_fissi_anno": 90}))
+        assert conta_calcoli["PrezzoGas"] == 2
+
+    def test_psv_invalida_solo_gas(self, tmp_path, offerta, conta_calcoli, imposta_config):
+        """Test che cambiare psv_eur_smc ricalcola il gas ma non la luce"""
+        cache = CachePrezzi(str(tmp_path))
+        cache.calcola(PrezzoGas, offerta)
+        cache.calcola(PrezzoLuce, offerta)
+
+        imposta_config(psv_eur_smc="0.5")
+        cache.calcola(PrezzoGas, offerta)
+        cache.calcola(PrezzoLuce, offerta)
+
+        assert conta_calcoli["PrezzoGas"] == 2
+        assert conta_calcoli["PrezzoLuce"] == 1
+
+    def test_use_cache_false_ricalcola(self, tmp_path, offerta, conta_calcoli):
+        """Test che use_cache=False ignora i risultati in cache"""
+        cache = CachePrezzi(str(tmp_path))
+        cache.calcola(PrezzoLuce, offerta)
+        cache.calcola(PrezzoLuce, offerta, use_cache=False)
+        assert conta_calcoli["PrezzoLuce"] == 2
+
+    def test_memoria_limitata(self, tmp_path, offerta):
+        """Test che la memoria tiene solo gli ultimi max_memoria risultati usati"""
+        cache = CachePrezzi(str(tmp_path), max_memoria=2)
+        offerte = [offerta.model_copy(update={"costi_fissi_anno": c}) for c in (90, 100, 110)]
+        chiavi = [cache.genera_chiave(PrezzoGas, o) for o in offerte]
+        cache.calcola(PrezzoGas, offerte[0])
+        cache.calcola(PrezzoGas, offerte[1])
+        cache.calcola(PrezzoGas, offerte[0])
+        cache.calcola(PrezzoGas, offerte[2])
+        assert list(cache._memoria) == [chiavi[0], chiavi[2]]
@@ -0,0 +1,128 @@
+import itertools
+import threading
+
+import pytest
+from google.genai import errors
+
+from benchmarks.carico import esegui_carico, percentile
+from benchmarks.catalogo import genera_catalogo, offerta_da_pdf, pdf_sintetico, scrivi_catalogo
+from benchmarks.gemini_finto import StatoGemini, crea_server
+from src.data_extractor.extractor import EnergyGeminiExtractor
+from src.model import TipoFormula
+
+PROMPT = "Estrai i dati dell'offerta."
+
+
+@pytest.fixture
+def gemini_finto(imposta_config, tmp_path):
+    """Avvia un server Gemini finto e vi punta la configurazione; restituisce una funzione con le opzioni."""
+    server = None
+
+    def avvia(**opzioni) -> StatoGemini:
+        nonlocal server
+        stato = StatoGemini(**opzioni)
+        server = crea_server(stato)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        imposta_config(
+            CACHE_DIR=str(tmp_path / "cache"),
+            GENAI_API_KEY="finta",
+            GENAI_BASE_URL=f"http://127.0.0.1:{server.server_port}",
+            GENAI_TENTATIVI=2,
+            GENAI_ATTESA_INIZIALE=0.01,
+        )
+        return stato
+
+    yield avvia
+    if server is not None:
+        server.shutdown()
+        server.server_close()
+
+
+class TestCatalogo:
+    """Test suite per il catalogo sintetico e i PDF minimi"""
+
+    def test_tutte_le_formule(self):
+        """Test che il catalogo copre ogni combinazione di formule con i prezzi coerenti"""
+        offerte = genera_catalogo(18, "gas")
+        combinazioni = {(o.tipologia_formula_offerta, o.tipologia_formula_finita) for o in offerte}
+        assert combinazioni == {(a.value, b.value) for a, b in itertools.product(TipoFormula, repeat=2)}
+        for o in offerte:
+            costante = o.tipologia_formula_offerta == TipoFormula.COSTANTE.value
+            assert (o.prezzo_fisso_offerta is not None) == costante
+            assert (o.fee_offerta is not None) != costante
+
+    def test_pdf_con_offerta(self, tmp_path):
+        """Test che il PDF sintetico e' ben formato e contiene l'offerta originale"""
+        offerta = genera_catalogo(1, "luce")[0]
+        pdf = pdf_sintetico(offerta)
+        assert pdf.startswith(b"%PDF-1.4") and pdf.endswith(b"%%EOF\n")
+        inizio_xref = int(pdf.rsplit(b"startxref\n", 1)[1].split(b"\n")[0])
+        assert pdf[inizio_xref:].startswith(b"xref")
+        assert offerta_da_pdf(pdf) == offerta.model_dump(mode="json")
+        assert offerta_da_pdf(b"%PDF-1.4\n%%EOF") is None
+
+        percorsi = scrivi_catalogo([offerta], str(tmp_path))
+        assert open(percorsi[0], "rb").read() == pdf
+
+
+class TestGeminiFinto:
+    """Test suite per il server Gemini finto usato con il client reale"""
+
+    def test_estrazione(self, gemini_finto, tmp_path):
+        """Test che l'estrattore ottiene dal server l'offerta del PDF ed elimina il file caricato"""
+        stato = gemini_finto()
+        offerte = genera_catalogo(3, "luce")
+        for offerta, percorso in zip(offerte, scrivi_catalogo(offerte, str(tmp_path / "pdf"))):
+            assert EnergyGeminiExtractor(prompt_text=PROMPT).extract(percorso, use_cache=False) == offerta
+        assert stato.statistiche["ok"] == stato.statistiche["eliminati"] == 3
+
+    def test_campi_richiesti(self):
+        """Test che la risposta contiene solo i campi richiesti dallo schema"""
+        stato = StatoGemini()
+        sessione = stato.inizia_upload()
+        nome = stato.carica(sessione, pdf_sintetico(genera_catalogo(1, "gas")[0]), finalizza=True)
+        assert stato.genera(nome, ["note", "durata_mesi"]).keys() == {"note", "durata_mesi"}
+
+    @pytest.mark.parametrize("opzioni, errore, contatore", [
+        ({"tasso_429": 1.0}, errors.ClientError, "risposte_429"),
+        ({"tasso_errori": 1.0}, errors.ServerError, "errori_500"),
+    ])
+    def test_nuovi_tentativi(self, gemini_finto, tmp_path, opzioni, errore, contatore):
+        """Test che 429 e 500 vengono ritentati GENAI_TENTATIVI volte prima di propagare l'errore"""
+        stato = gemini_finto(**opzioni)
+        percorso = scrivi_catalogo(genera_catalogo(1, "luce"), str(tmp_path / "pdf"))[0]
+        with pytest.raises(errore):
+            EnergyGeminiExtractor(prompt_text=PROMPT).extract(percorso, use_cache=False)
+        assert stato.statistiche[contatore] == 2
+        assert stato.statistiche["eliminati"] == 1
+
+    def test_quota(self):
+        """Test che oltre le richieste al secondo il server risponde 429"""
+        stato = StatoGemini(richieste_al_secondo=1)
+        sessione = stato.inizia_upload()
+        nome = stato.carica(sessione, pdf_sintetico(genera_catalogo(1, "gas")[0]), finalizza=True)
+        stato.genera(nome, ["note"])
+        with pytest.raises(Exception, match="exhausted"):
+            stato.genera(nome, ["note"])
+
+    def test_client_condiviso(self, gemini_finto):
+        """Test che gli estrattori dello stesso processo condividono il client Gemini"""
+        gemini_finto()
+        assert EnergyGeminiExtractor(prompt_text=PROMPT).client is EnergyGeminiExtractor(prompt_text="altro").client
+
+
+class TestCarico:
+    """Test suite per il test di carico end-to-end"""
+
+    def test_percentile(self):
+        """Test che il percentile usa il rango piu' vicino"""
+        valori = list(range(1, 101))
+        assert (percentile(valori, 0.5), percentile(valori, 0.99), percentile([], 0.5)) == (51, 100, None)
+
+    def test_esecuzione_main(self):
+        """Test che main elabora tutte le offerte sintetiche e il rapporto riporta le metriche"""
+        rapporto = esegui_carico(6, workers=2, tasso_429=0.2)
+        assert rapporto["offerte"] == 6
+        assert rapporto["server"]["ok"] == 6
+        assert 0 < rapporto["latenza_p50_ms"] <= rapporto["latenza_p99_ms"]
+        assert rapporto["offerte_al_secondo"] > 0
@@ -0,0 +1,68 @@
+import os
+import shutil
+from decimal import Decimal
+from pathlib import Path
+
+import pytest
+from pydantic import ValidationError
+
+from src.config import Config
+
+ENV_DIR = Path(__file__).parent.parent / "env"
+
+
+def scrivi(path: Path, testo: str):
+    path.write_text(testo, encoding="utf-8")
+    # mtime diverso anche su filesystem a bassa risoluzione
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+
+class TestConfig:
+    """Test suite per Config e Impostazioni"""
+
+    @pytest.fixture
+    def env_dir(self, tmp_path):
+        cartella = tmp_path / "env"
+        shutil.copytree(ENV_DIR, cartella)
+        return cartella
+
+    def test_valori_tipizzati(self, env_dir):
+        """Test che i valori sono convertiti una volta e non toccano os.environ"""
+        config = Config(str(env_dir))
+        assert isinstance(config.get("psv_eur_smc"), Decimal)
+        assert config.get("residenza") is True
+        assert config.get("perdite_rete_percent") == 0.10
+        assert "psv_eur_smc" not in os.environ
+        with pytest.raises(ValidationError):
+            config.impostazioni.psv_eur_smc = Decimal("1")
+
+    def test_valore_non_valido(self, env_dir):
+        """Test che un valore non valido indica chiave e file al caricamento"""
+        user = env_dir / "user.env"
+        user.write_text(user.read_text().replace("zona_geografica=CENTRO_NORD", "zona_geografica=CENTRO_NORD#x"))
+        with pytest.raises(ValueError, match=r"zona_geografica \(user.env\)"):
+            Config(str(env_dir)).get("zona_geografica")
+
+    def test_impronta_esclude_segreti(self, env_dir):
+        """Test che l'impronta cambia con i valori ma non con la chiave API"""
+        config = Config(str(env_dir))
+        impronta = config.impronta()
+        assert config.con_valori({"GENAI_API_KEY": "segreta"}).impronta() == impronta
+        assert config.con_valori({"psv_eur_smc": "0.5"}).impronta() != impronta
+
+    def test_ricarica(self, env_dir):
+        """Test che la ricarica applica i file modificati e ignora quelli non validi"""
+        config = Config(str(env_dir))
+        assert config.get("consumption_kwh_monthly") == 208.3
+        assert not config.ricarica()
+
+        user = env_dir / "user.env"
+        originale = user.read_text()
+        scrivi(user, originale.replace("consumption_kwh_monthly=208.3", "consumption_kwh_monthly=300"))
+        assert config.ricarica()
+        assert config.get("consumption_kwh_monthly") == 300
+
+        scrivi(user, originale.replace("consumption_kwh_monthly=208.3", "consumption_kwh_monthly=tanti"))
+        assert not config.ricarica()
+        assert config.get("consumption_kwh_monthly") == 300
@@ -0,0 +1,143 @@
+import json
+import os
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from src.data_extractor.extractor import EnergyGeminiExtractor
+from src.data_extractor.versioni import VersioniCampi
+from src.model import Offerta
+
+PROMPTS = Path(__file__).parent.parent / "prompts"
+
+PROMPT = """Estrai i dati dell'offerta.
+@campi: note
+Nelle note riporta solo i vincoli.
+@campi: fee_offerta, fee_finita
+Le fee sono in €/kWh.
+@comune
+Rispondi in JSON.
+"""
+
+
+class ClientFinto:
+    """Client Gemini finto: annota i campi richiesti e risponde con valori fissi."""
+
+    def __init__(self, valori: dict):
+        self.valori = valori
+        self.richieste: list[list[str]] = []
+        self.files = SimpleNamespace(
+            upload=lambda file: SimpleNamespace(uri=f"file://{file}", mime_type="application/pdf", name=file),
+            delete=lambda name: None,
+        )
+        self.models = SimpleNamespace(generate_content=self.generate_content)
+
+    def generate_content(self, model, contents, config):
+        campi = list(config["response_json_schema"]["properties"])
+        self.richieste.append(campi)
+        return SimpleNamespace(text=json.dumps({c: self.valori.get(c) for c in campi}))
+
+
+def estrattore(prompt: str, client: ClientFinto) -> EnergyGeminiExtractor:
+    extractor = EnergyGeminiExtractor(model="m", prompt_text=prompt)
+    extractor._client = client
+    return extractor
+
+
+class TestVersioniCampi:
+    """Test suite per le impronte per campo di prompt e schema"""
+
+    def test_righe_di_servizio_escluse(self):
+        """Test che le righe @campi/@comune non vengono inviate al modello"""
+        versioni = VersioniCampi(PROMPT)
+        assert "@" not in versioni.testo
+        assert versioni.testo_comune == "Estrai i dati dell'offerta.\nRispondi in JSON.\n"
+
+    def test_sezione_dedicata_cambia_solo_i_suoi_campi(self):
+        """Test che modificare una sezione dedicata cambia solo l'impronta dei suoi campi"""
+        prima = VersioniCampi(PROMPT)
+        dopo = VersioniCampi(PROMPT.replace("€/kWh", "euro per kWh"))
+        assert dopo.campi_cambiati(prima.impronte) == ["fee_offerta", "fee_finita"]
+        comune = VersioniCampi(PROMPT.replace("Rispondi in JSON", "Rispondi solo in JSON"))
+        assert comune.campi_cambiati(prima.impronte) == list(Offerta.model_fields)
+
+    def test_campo_sconosciuto(self):
+        """Test che un campo inesistente nelle righe @campi viene segnalato"""
+        with pytest.raises(ValueError, match="Campi sconosciuti"):
+            VersioniCampi("@campi: prezzo_kwh\ntesto\n")
+
+    @pytest.mark.parametrize("nome", ["dati_luce.txt", "dati_gas.txt"])
+    def test_prompt_distribuiti(self, nome):
+        """Test che i prompt del progetto sono validi e hanno sezioni dedicate"""
+        versioni = VersioniCampi((PROMPTS / nome).read_text(encoding="utf-8"))
+        assert versioni.testo_comune != versioni.testo
+
+
+class TestEstrazioneIncrementale:
+    """Test suite per la riestrazione dei soli campi cambiati"""
+
+    @pytest.fixture(autouse=True)
+    def cache_dir(self, tmp_path, imposta_config):
+        imposta_config(CACHE_DIR=str(tmp_path), CACHE_TTL_SECONDS=3600)
+        return tmp_path
+
+    def test_riestrae_solo_i_campi_cambiati(self):
+        """Test che dopo una modifica al prompt vengono richiesti e uniti solo i campi interessati"""
+        client = ClientFinto({"nome_offerta": "A", "gestore": "G", "fee_offerta": 0.01, "note": "vecchia"})
+        assert estrattore(PROMPT, client).extract("a.pdf").note == "vecchia"
+
+        client.valori.update(fee_offerta=0.02, note="nuova")
+        offerta = estrattore(PROMPT.replace("€/kWh", "euro per kWh"), client).extract("a.pdf")
+        assert client.richieste[1] == ["fee_offerta", "fee_finita"]
+        assert (offerta.nome_offerta, offerta.fee_offerta, offerta.note) == ("A", 0.02, "vecchia")
+
+        estrattore(PROMPT.replace("€/kWh", "euro per kWh"), client).extract("a.pdf")
+        assert len(client.richieste) == 2
+
+    def test_campo_nuovo_nello_schema(self):
+        """Test che un campo senza impronta registrata (aggiunto allo schema) viene richiesto da solo"""
+        client = ClientFinto({"nome_offerta": "A", "gestore": "G", "durata_mesi": 24})
+        extractor = estrattore(PROMPT, client)
+        impronte = {c: i for c, i in extractor.versioni.impronte.items() if c != "durata_mesi"}
+        extractor.cache.save(extractor.chiave("a.pdf"), {"dati": {"nome_offerta": "A", "gestore": "G"}, "impronte": impronte})
+
+        assert extractor.load_cached(["a.pdf"]) == {}
+        assert extractor.extract("a.pdf").durata_mesi == 24
+        assert client.richieste == [["durata_mesi"]]
+
+    def test_voce_formato_precedente(self):
+        """Test che una voce salvata con la chiave sull'intero prompt viene riusata senza chiamare il modello"""
+        client = ClientFinto({})
+        extractor = estrattore(PROMPT, client)
+        chiave_precedente = extractor.cache.generate_key("a.pdf", "m", extractor.versioni.testo)
+        extractor.cache.save(chiave_precedente, Offerta(nome_offerta="A", gestore="G").model_dump(mode="json"))
+
+        assert extractor.extract("a.pdf").nome_offerta == "A"
+        assert extractor.cache.load(extractor.chiave("a.pdf"))["impronte"] == extractor.versioni.impronte
+        assert client.richieste == []
+
+    def test_voce_formato_precedente_schema_cambiato(self):
+        """Test che dei campi della voce precedente assenti o non validi per lo schema attuale viene richiesto solo quelli"""
+        client = ClientFinto({"durata_mesi": 24, "note": "nuova"})
+        extractor = estrattore(PROMPT, client)
+        dati = {**Offerta(nome_offerta="A", gestore="G").model_dump(mode="json"), "durata_mesi": "due anni"}
+        del dati["note"]
+        extractor.cache.save(extractor.cache.generate_key("a.pdf", "m", extractor.versioni.testo), dati)
+
+        offerta = extractor.extract("a.pdf")
+        assert client.richieste == [["durata_mesi", "note"]]
+        assert (offerta.nome_offerta, offerta.durata_mesi, offerta.note) == ("A", 24, "nuova")
+
+    def test_voce_formato_precedente_mantiene_scadenza(self, cache_dir):
+        """Test che la migrazione offline di una voce scaduta non ne fa ripartire la scadenza"""
+        offline = EnergyGeminiExtractor(model="m", prompt_text=PROMPT, offline=True)
+        chiave_precedente = offline.cache.generate_key("a.pdf", "m", offline.versioni.testo)
+        offline.cache.save(chiave_precedente, Offerta(nome_offerta="A", gestore="G").model_dump(mode="json"))
+        scaduta = time.time() - 7200
+        os.utime(cache_dir / f"{chiave_precedente}.json", (scaduta, scaduta))
+
+        assert offline.extract("a.pdf").nome_offerta == "A"
+        assert offline.cache.data_modifica(offline.chiave("a.pdf")) == pytest.approx(scaduta)
+        assert estrattore(PROMPT, ClientFinto({}))._leggi_voce("a.pdf") is None
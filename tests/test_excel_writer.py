@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+import pytest
+from openpyxl import load_workbook
+
+from src.excel_writer.excel_writer import ExcelFormatter
+
+
+@pytest.fixture
+def df():
+    return pd.DataFrame({
+        "nome_offerta": ["Offerta A", "Offerta B lunga"],
+        "gestore": ["G1", "G2"],
+        "prezzo_offerta_mensile": [73.03, np.nan],
+        "note": [None, "periodo successivo non disponibile"],
+    })
+
+
+def scrivi(df, tmp_path):
+    path = tmp_path / "out.xlsx"
+    ExcelFormatter(
+        df=df,
+        output_path=str(path),
+        key_columns=["nome_offerta", "gestore"],
+        price_columns=["prezzo_offerta_mensile"],
+        note_column="note",
+    ).run()
+    return load_workbook(path).active
+
+
+class TestExcelFormatter:
+    """Test suite per ExcelFormatter"""
+
+    def test_valori_e_celle_vuote(self, df, tmp_path):
+        """Test che i valori sono scritti e i mancanti restano vuoti"""
+        ws = scrivi(df, tmp_path)
+        righe = list(ws.iter_rows(values_only=True))
+        assert righe[0] == tuple(df.columns)
+        assert righe[1] == ("Offerta A", "G1", 73.03, None)
+        assert righe[2] == ("Offerta B lunga", "G2", None, "periodo successivo non disponibile")
+
+    def test_stili_intestazione(self, df, tmp_path):
+        """Test che le intestazioni hanno colore in base al ruolo della colonna"""
+        ws = scrivi(df, tmp_path)
+        colori = [ws.cell(row=1, column=i).fill.fgColor.rgb for i in range(1, 5)]
+        assert colori == ["0092D050", "0092D050", "00FF0000", "00FFFF00"]
+        assert all(ws.cell(row=1, column=i).font.bold for i in range(1, 5))
+
+    def test_allineamento_per_colonna(self, df, tmp_path):
+        """Test che le colonne numeriche sono centrate e le testuali a sinistra"""
+        ws = scrivi(df, tmp_path)
+        assert ws["A2"].alignment.horizontal == "left"
+        assert ws["C2"].alignment.horizontal == "center"
+
+    def test_larghezze_colonne(self, df, tmp_path):
+        """Test che la larghezza segue il valore piu' lungo piu' 2"""
+        ws = scrivi(df, tmp_path)
+        assert ws.column_dimensions["A"].width == len("Offerta B lunga") + 2
+        assert ws.column_dimensions["C"].width == len("prezzo_offerta_mensile") + 2
+        assert ws.column_dimensions["D"].width == len("periodo successivo non disponibile") + 2
+
+    def test_mancanti_per_tipo(self, tmp_path):
+        """Test che pd.NA e NaT restano vuoti e gli interi nullable sono scritti come numeri"""
+        df = pd.DataFrame({
+            "nome_offerta": ["A", "B"],
+            "gestore": pd.array([3, pd.NA], dtype="Int64"),
+            "prezzo_offerta_mensile": pd.to_datetime(["2025-01-01", None]),
+            "note": pd.array(["x", pd.NA], dtype="string"),
+        })
+        righe = list(scrivi(df, tmp_path).iter_rows(min_row=2, values_only=True))
+        assert righe[0][:2] == ("A", 3) and righe[0][3] == "x"
+        assert righe[1] == ("B", None, None, None)
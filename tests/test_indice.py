@@ -0,0 +1,112 @@
+import random
+from decimal import Decimal
+
+import numpy as np
+import pytest
+
+from src.model import Offerta
+from src.prezzo.indice import MAX_CONSUMI_IN_MEMORIA, IndiceOfferte
+from src.prezzo.prezzo_gas import PrezzoGas
+from src.prezzo.prezzo_luce import PrezzoLuce
+
+
+def genera_offerte(n: int, seed: int = 42) -> list[Offerta]:
+    rnd = random.Random(seed)
+    offerte = []
+    for i in range(n):
+        fissa = rnd.random() < 0.4
+        offerte.append(Offerta(
+            nome_offerta=f"Offerta {i}",
+            gestore=f"Gestore {i % 7}",
+            prezzo_fisso_offerta=round(rnd.uniform(0.08, 0.5), 4) if fissa else None,
+            fee_offerta=None if fissa else round(rnd.uniform(0.0, 0.2), 4),
+            tipologia_formula_offerta="costante" if fissa else rnd.choice(["standard", "ridotta"]),
+            costi_fissi_anno=round(rnd.uniform(0, 150), 2),
+        ))
+    return offerte
+
+
+def prezzo_diretto(calcolatore, offerta, indice):
+    prezzo = calcolatore(offerta)
+    if calcolatore is PrezzoLuce:
+        return prezzo._calcola_prezzo_mensile(
+            prezzo_fisso_kwh=offerta.prezzo_fisso_offerta,
+            fee_kwh=offerta.fee_offerta,
+            costo_fisso_anno=offerta.costi_fissi_anno,
+            pun=indice,
+            tipo_formula=offerta.tipologia_formula_offerta,
+        )
+    return float(prezzo._calcola_prezzo_mensile(
+        fee_smc=offerta.fee_offerta,
+        prezzo_stimato_smc=offerta.prezzo_fisso_offerta,
+        psv_val=indice,
+        costo_fisso_annuo=offerta.costi_fissi_anno,
+        tipo_formula=offerta.tipologia_formula_offerta,
+    ))
+
+
+class TestIndiceOfferte:
+    """Test suite per IndiceOfferte"""
+
+    @pytest.mark.parametrize("calcolatore, chiave_consumo, consumo, indice", [
+        (PrezzoLuce, "consumption_kwh_monthly", 120.0, 0.09),
+        (PrezzoLuce, "consumption_kwh_monthly", 400.0, 0.15),
+        (PrezzoGas, "consumption_smc_monthly", 40.0, 0.35),
+        (PrezzoGas, "consumption_smc_monthly", 150.0, 0.6),
+    ])
+    def test_allineato_alle_classi_di_prezzo(self, imposta_config, calcolatore, chiave_consumo, consumo, indice):
+        """Test che la classifica coincide con i prezzi calcolati dalle classi"""
+        # Profilo gas senza consumo annuo: la stima dipende solo dal consumo mensile
+        imposta_config(consumption_smc_yearly=None)
+        offerte = genera_offerte(40)
+        indice_offerte = IndiceOfferte(offerte, calcolatore)
+        risultato = indice_offerte.migliori(consumo, indice, k=5)
+
+        imposta_config(**{chiave_consumo: consumo})
+        attesi = sorted(prezzo_diretto(calcolatore, o, indice) for o in offerte)[:5]
+        assert [p.prezzo_mensile for p in risultato] == pytest.approx(attesi, abs=0.02)
+
+    @pytest.mark.parametrize("consumo", [20.0, 40.0, 150.0])
+    def test_gas_a_consumo_diverso_dal_profilo(self, imposta_config, consumo):
+        """Test che per il gas scaglioni e IVA seguono il consumo richiesto e non quello del profilo"""
+        imposta_config(consumption_smc_monthly=Decimal("100"), consumption_smc_yearly=Decimal("1200"))
+        offerte = genera_offerte(40)
+        risultato = IndiceOfferte(offerte, PrezzoGas).migliori(consumo, 0.4, k=5)
+
+        # Stesso andamento stagionale del profilo: consumo annuo 12 volte il mensile
+        imposta_config(consumption_smc_monthly=Decimal(str(consumo)), consumption_smc_yearly=Decimal(str(consumo * 12)))
+        attesi = sorted(prezzo_diretto(PrezzoGas, o, 0.4) for o in offerte)[:5]
+        assert [p.prezzo_mensile for p in risultato] == pytest.approx(attesi, abs=0.02)
+
+    def test_primi_k_come_ricerca_completa(self):
+        """Test che i candidati degli inviluppi danno gli stessi primi k della ricerca completa"""
+        offerte = genera_offerte(300, seed=7)
+        indice_offerte = IndiceOfferte(offerte, PrezzoLuce, max_strati=5)
+        rnd = random.Random(1)
+        for _ in range(200):
+            consumo, indice = rnd.uniform(0, 1000), rnd.uniform(0, 0.4)
+            for k in (1, 3, 5, 8):
+                parziali = indice_offerte.fisso + consumo * (indice_offerte.alfa + indice_offerte.beta * indice)
+                attesi = np.sort(parziali)[:k]
+                ottenuti = indice_offerte.migliori(consumo, indice, k=k)
+                comune = indice_offerte._costo_comune(consumo)
+                assert [p.prezzo_mensile for p in ottenuti] == pytest.approx(
+                    [round(comune + a, 2) for a in attesi], abs=0.011)
+
+    def test_offerte_non_prezzabili_escluse(self):
+        """Test che offerte senza prezzo ne' fee non entrano nell'indice"""
+        offerte = genera_offerte(5) + [Offerta(nome_offerta="Vuota", gestore="X")]
+        indice_offerte = IndiceOfferte(offerte, PrezzoLuce)
+        assert len(indice_offerte) == 5
+        assert all(p.nome_offerta != "Vuota" for p in indice_offerte.migliori(200, 0.1, k=10))
+
+    def test_indice_vuoto(self):
+        """Test che un indice vuoto restituisce una classifica vuota"""
+        assert IndiceOfferte([], PrezzoGas).migliori(80, 0.4, k=3) == []
+
+    def test_costo_comune_limitato(self):
+        """Test che il costo comune in memoria e' limitato ai consumi piu' recenti"""
+        indice_offerte = IndiceOfferte(genera_offerte(5), PrezzoLuce)
+        for consumo in range(MAX_CONSUMI_IN_MEMORIA + 10):
+            indice_offerte.migliori(consumo, 0.1)
+        assert indice_offerte._costo_comune.cache_info().currsize == MAX_CONSUMI_IN_MEMORIA
@@ -0,0 +1,52 @@
+import pandas as pd
+import pytest
+from pydantic import ValidationError
+
+from src.data_extractor.extractor import EnergyGeminiExtractor
+from src.main import build_dataframe
+from src.model import ColonneRecord, DatiPrezzo, Offerta
+
+
+def offerta(i: int) -> Offerta:
+    return Offerta(nome_offerta=f"Offerta {i}", gestore="G", prezzo_fisso_offerta=0.1 + i / 100,
+                   durata_mesi=12 if i % 2 else None, note=None if i % 2 else "nota")
+
+
+def prezzo(i: int) -> DatiPrezzo:
+    return DatiPrezzo(nome_offerta=f"Offerta {i}", gestore="G", prezzo_offerta_mensile=50.0 + i)
+
+
+class TestModello:
+    """Test suite per la validazione in blocco e l'accumulatore colonnare"""
+
+    def test_valida_lista(self):
+        """Test che una lista di dict viene validata in un'unica chiamata"""
+        offerte = Offerta.valida_lista([{"nome_offerta": "A", "gestore": "G"}, {"nome_offerta": "B", "gestore": "H"}])
+        assert [o.nome_offerta for o in offerte] == ["A", "B"]
+        with pytest.raises(ValidationError):
+            Offerta.valida_lista([{"nome_offerta": "A"}])
+
+    def test_colonne_come_dict_per_riga(self):
+        """Test che l'accumulatore produce lo stesso DataFrame dei dict per riga"""
+        record = [(offerta(i), prezzo(i)) for i in range(5)]
+        atteso = pd.DataFrame([{**o.model_dump(), **p.model_dump()} for o, p in record])
+        pd.testing.assert_frame_equal(build_dataframe(record), atteso)
+
+    def test_to_dataframe(self):
+        """Test che to_dataframe restituisce una riga con tutti i campi"""
+        df = offerta(1).to_dataframe()
+        assert len(df) == 1
+        assert list(df.columns) == list(Offerta.model_fields)
+        assert len(ColonneRecord(Offerta)) == 0
+
+    def test_load_cached_esclude_voci_non_valide(self, tmp_path, imposta_config):
+        """Test che le voci di cache non valide vengono escluse dalla validazione in blocco"""
+        imposta_config(CACHE_DIR=str(tmp_path))
+        extractor = EnergyGeminiExtractor(model="m", prompt_text="p")
+        for nome, dati in [("a.pdf", {"nome_offerta": "A", "gestore": "G"}),
+                           ("b.pdf", {"nome_offerta": "B"}),
+                           ("c.pdf", {"nome_offerta": "C", "gestore": "G"})]:
+            extractor.cache.save(extractor.cache.generate_key(nome, "m", "p"), dati)
+
+        offerte = extractor.load_cached(["a.pdf", "b.pdf", "c.pdf", "d.pdf"])
+        assert {p: o.nome_offerta for p, o in offerte.items()} == {"a.pdf": "A", "c.pdf": "C"}
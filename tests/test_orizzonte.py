@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.prezzo.orizzonte import MotoreOrizzonte, aggiungi_costi_orizzonte
+
+
+@pytest.fixture
+def df_prezzi():
+    return pd.DataFrame({
+        "nome_offerta": ["A", "B", "C"],
+        "gestore": ["G1", "G2", "G3"],
+        "durata_mesi": [12, None, 6],
+        "prezzo_offerta_mensile": [100.0, 90.0, 80.0],
+        "prezzo_finita_medio_mensile": [120.0, 110.0, None],
+        "prezzo_finita_peggiore_mensile": [150.0, 130.0, None],
+    })
+
+
+class TestMotoreOrizzonte:
+    """Test suite per MotoreOrizzonte"""
+
+    def test_costi_mensili_promo_poi_finita(self, df_prezzi):
+        """Test che dopo durata_mesi si applica il prezzo finita"""
+        costi = MotoreOrizzonte(df_prezzi).costi_mensili(24)
+        assert costi.shape == (3, 24)
+        assert np.all(costi[0, :12] == 100.0)
+        assert np.all(costi[0, 12:] == 120.0)
+
+    def test_durata_nulla_copre_orizzonte(self, df_prezzi):
+        """Test che senza durata_mesi la promozione copre tutto l'orizzonte"""
+        costi = MotoreOrizzonte(df_prezzi).costi_mensili(36)
+        assert np.all(costi[1] == 90.0)
+
+    def test_finita_nulla_mantiene_prezzo_offerta(self, df_prezzi):
+        """Test che senza prezzo finita resta il prezzo dell'offerta"""
+        costi = MotoreOrizzonte(df_prezzi).costi_mensili(24, scenario="peggiore")
+        assert np.all(costi[2] == 80.0)
+
+    def test_costi_cumulati(self, df_prezzi):
+        """Test che l'ultimo cumulato coincide con il totale"""
+        motore = MotoreOrizzonte(df_prezzi)
+        cumulati = motore.costi_cumulati(24, scenario="peggiore")
+        assert cumulati[0, -1] == 12 * 100.0 + 12 * 150.0
+        assert np.all(np.diff(cumulati, axis=1) > 0)
+
+    def test_orizzonte_non_valido(self, df_prezzi):
+        """Test che un orizzonte nullo solleva ValueError"""
+        with pytest.raises(ValueError):
+            MotoreOrizzonte(df_prezzi).costi_mensili(0)
+
+    def test_aggiungi_costi_orizzonte(self, df_prezzi):
+        """Test che le colonne di output vengono aggiunte e sostituite"""
+        df = aggiungi_costi_orizzonte(df_prezzi, 24)
+        assert df.loc[0, "costo_totale_24m_medio"] == 12 * 100.0 + 12 * 120.0
+        assert df.loc[0, "costo_medio_mensile_24m_medio"] == 110.0
+
+        df = aggiungi_costi_orizzonte(df, 24)
+        assert list(df.columns).count("costo_totale_24m_medio") == 1
@@ -0,0 +1,113 @@
+import pandas as pd
+import pytest
+from openpyxl import load_workbook
+
+from src.output.abc import prepara_dataframe
+from src.output.consolidato import costruisci_riepilogo, scrivi_confronto
+from src.output.sinks import SINKS, CsvSink, JsonLinesSink, ParquetSink
+
+
+@pytest.fixture
+def df():
+    return pd.DataFrame({
+        "note": ["nota B", None],
+        "durata_mesi": [12, None],
+        "gestore": ["G2", "G1"],
+        "costo_totale_24m_medio": [2000.0, 1800.0],
+        "prezzo_offerta_mensile": [80.0, 75.0],
+        "prezzo_finita_medio_mensile": [90.0, None],
+        "prezzo_finita_peggiore_mensile": [100.0, None],
+        "nome_offerta": ["B", "A"],
+    })
+
+
+class TestPreparaDataframe:
+    """Test suite per prepara_dataframe"""
+
+    def test_ordine_colonne(self, df):
+        """Test che l'ordine e' offerta, prezzi, altre colonne, note"""
+        assert list(prepara_dataframe(df).columns) == [
+            "nome_offerta", "gestore",
+            "prezzo_offerta_mensile", "prezzo_finita_medio_mensile", "prezzo_finita_peggiore_mensile",
+            "costo_totale_24m_medio",
+            "durata_mesi",
+            "note",
+        ]
+
+    def test_ordine_righe(self, df):
+        """Test che le righe sono ordinate per offerta"""
+        assert prepara_dataframe(df)["nome_offerta"].tolist() == ["A", "B"]
+
+
+class TestSinks:
+    """Test suite per i formati di output"""
+
+    def test_csv(self, df, tmp_path):
+        """Test che il CSV conserva colonne e valori"""
+        final_df = prepara_dataframe(df)
+        path = CsvSink(str(tmp_path), "luce").scrivi(final_df)
+        assert path.endswith("risultati_prezzi_luce.csv")
+        letto = pd.read_csv(path)
+        assert list(letto.columns) == list(final_df.columns)
+        assert letto["prezzo_offerta_mensile"].tolist() == [75.0, 80.0]
+
+    def test_jsonl(self, df, tmp_path):
+        """Test che il JSON Lines ha un record per riga"""
+        final_df = prepara_dataframe(df)
+        path = JsonLinesSink(str(tmp_path), "gas").scrivi(final_df)
+        letto = pd.read_json(path, lines=True)
+        assert len(letto) == 2
+        assert list(letto.columns) == list(final_df.columns)
+
+    def test_parquet_tipi(self, df, tmp_path):
+        """Test che il parquet usa categorie per gestore e nome_offerta"""
+        pytest.importorskip("pyarrow")
+        final_df = prepara_dataframe(df)
+        path = ParquetSink(str(tmp_path), "luce").scrivi(final_df)
+        letto = pd.read_parquet(path)
+        assert list(letto.columns) == list(final_df.columns)
+        assert isinstance(letto["gestore"].dtype, pd.CategoricalDtype)
+        assert isinstance(letto["nome_offerta"].dtype, pd.CategoricalDtype)
+        assert str(letto["durata_mesi"].dtype) == "Int64"
+
+    def test_registro_formati(self):
+        """Test che tutti i formati sono selezionabili"""
+        assert set(SINKS) == {"excel", "parquet", "csv", "jsonl"}
+
+
+class TestConfronto:
+    """Test suite per il confronto consolidato"""
+
+    @pytest.fixture
+    def risultati(self, df):
+        gas = df.assign(prezzo_offerta_mensile=[60.0, 70.0], nome_offerta=["C", "D"])
+        return {"luce": prepara_dataframe(df), "gas": prepara_dataframe(gas)}
+
+    def test_riepilogo_migliore_e_mediana(self, risultati):
+        """Test che il riepilogo riporta migliore offerta e scarto dalla mediana"""
+        riepilogo = costruisci_riepilogo(risultati)
+        riga = riepilogo[(riepilogo["fornitura"] == "luce")
+                         & (riepilogo["scenario"] == "prezzo_offerta_mensile")].iloc[0]
+        assert riga["nome_offerta"] == "A"
+        assert riga["prezzo"] == 75.0
+        assert riga["mediana"] == 77.5
+        assert riga["scarto_mediana"] == -2.5
+
+    def test_scenari_senza_prezzi_esclusi(self):
+        """Test che uno scenario senza prezzi non compare nel riepilogo"""
+        df = pd.DataFrame({
+            "nome_offerta": ["A"], "gestore": ["G"],
+            "prezzo_offerta_mensile": [10.0],
+            "prezzo_finita_medio_mensile": [None],
+            "prezzo_finita_peggiore_mensile": [None],
+            "note": [None],
+        })
+        riepilogo = costruisci_riepilogo({"luce": df})
+        assert riepilogo["scenario"].tolist() == ["prezzo_offerta_mensile"]
+
+    def test_workbook_unico(self, risultati, tmp_path):
+        """Test che il workbook contiene i fogli luce, gas e riepilogo"""
+        path = scrivi_confronto(risultati, str(tmp_path))
+        wb = load_workbook(path)
+        assert wb.sheetnames == ["luce", "gas", "riepilogo"]
+        assert wb["luce"].max_row == 3
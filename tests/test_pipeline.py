@@ -0,0 +1,67 @@
+import threading
+import time
+
+import pytest
+
+from src.pipeline import PipelineForniture
+
+
+def pipeline_di_prova(ritardo_estrazione=0.0, ritardo_prezzi=0.0, errore_su=None, **kwargs):
+    concluse = {}
+
+    def estrai(tipo, pdf_path):
+        time.sleep(ritardo_estrazione)
+        if pdf_path == errore_su:
+            raise ValueError(f"errore su {pdf_path}")
+        return {"tipo": tipo, "pdf": pdf_path}
+
+    def prezza(tipo, offerta):
+        time.sleep(ritardo_prezzi)
+        return {**offerta, "prezzo": 1.0}
+
+    def concludi(tipo, righe):
+        concluse[tipo] = threading.current_thread().name
+        return sorted(r["pdf"] for r in righe)
+
+    return PipelineForniture(estrai, prezza, concludi, **kwargs), concluse
+
+
+class TestPipelineForniture:
+    """Test suite per PipelineForniture"""
+
+    def test_tutte_le_righe_per_fornitura(self):
+        """Test che ogni fornitura riceve tutte e sole le proprie righe"""
+        pipeline, _ = pipeline_di_prova(workers=3)
+        risultati = pipeline.esegui({
+            "luce": [f"l{i}.pdf" for i in range(20)],
+            "gas": [f"g{i}.pdf" for i in range(5)],
+        })
+        assert list(risultati) == ["luce", "gas"]
+        assert risultati["luce"] == sorted(f"l{i}.pdf" for i in range(20))
+        assert risultati["gas"] == sorted(f"g{i}.pdf" for i in range(5))
+
+    def test_fasi_sovrapposte(self):
+        """Test che estrazione e prezzi si sovrappongono tra forniture e file"""
+        pipeline, _ = pipeline_di_prova(ritardo_estrazione=0.05, ritardo_prezzi=0.05, workers=4)
+        inizio = time.perf_counter()
+        pipeline.esegui({
+            "luce": [f"l{i}.pdf" for i in range(8)],
+            "gas": [f"g{i}.pdf" for i in range(8)],
+        })
+        durata = time.perf_counter() - inizio
+        # in sequenza: 16 * (0.05 + 0.05) = 1.6 s
+        assert durata < 0.9
+
+    def test_fornitura_vuota(self):
+        """Test che una fornitura senza file non blocca la pipeline"""
+        pipeline, concluse = pipeline_di_prova()
+        risultati = pipeline.esegui({"luce": [], "gas": ["g.pdf"]})
+        assert risultati == {"gas": ["g.pdf"]}
+        assert "luce" not in concluse
+
+    def test_errore_propagato(self):
+        """Test che un errore in estrazione ferma la pipeline e viene rilanciato"""
+        pipeline, concluse = pipeline_di_prova(errore_su="l3.pdf", workers=2, dimensione_coda=1)
+        with pytest.raises(ValueError, match="l3.pdf"):
+            pipeline.esegui({"luce": [f"l{i}.pdf" for i in range(50)]})
+        assert "luce" not in concluse
@@ -1,56 +1,7 @@
 import pytest
 from decimal import Decimal
-from src.prezzo.prezzo_gas import CalcolatoreMorfologicoC, CalcolatoreAccisaGas
-
-
-class TestCalcolatoreMorfologicoC:
-    """Test suite per CalcolatoreMorfologicoC"""
-
-    def test_ottieni_c_mare(self):
-        """Test che ottieni_c ritorna il valore corretto per MARE"""
-        result = CalcolatoreMorfologicoC.ottieni_c("MARE")
-        assert result == Decimal("1.027")
-
-    def test_ottieni_c_pianura(self):
-        """Test che ottieni_c ritorna il valore corretto per PIANURA"""
-        result = CalcolatoreMorfologicoC.ottieni_c("PIANURA")
-        assert result == Decimal("1.015")
-
-    def test_ottieni_c_collina(self):
-        """Test che ottieni_c ritorna il valore corretto per COLLINA"""
-        result = CalcolatoreMorfologicoC.ottieni_c("COLLINA")
-        assert result == Decimal("0.985")
-
-    def test_ottieni_c_montagna(self):
-        """Test che ottieni_c ritorna il valore corretto per MONTAGNA"""
-        result = CalcolatoreMorfologicoC.ottieni_c("MONTAGNA")
-        assert result == Decimal("0.940")
-
-    def test_ottieni_c_lowercase(self):
-        """Test che ottieni_c accetta input lowercase"""
-        result = CalcolatoreMorfologicoC.ottieni_c("mare")
-        assert result == Decimal("1.027")
-
-    def test_ottieni_c_mixed_case(self):
-        """Test che ottieni_c accetta input mixed case"""
-        result = CalcolatoreMorfologicoC.ottieni_c("PiAnUrA")
-        assert result == Decimal("1.015")
-
-    def test_ottieni_c_invalid_territory_defaults_to_pianura(self):
-        """Test che ottieni_c ritorna PIANURA per territorio non valido"""
-        result = CalcolatoreMorfologicoC.ottieni_c("DESERTO")
-        assert result == Decimal("1.015")
-
-    def test_ottieni_c_empty_string_defaults_to_pianura(self):
-        """Test che ottieni_c ritorna PIANURA per stringa vuota"""
-        result = CalcolatoreMorfologicoC.ottieni_c("")
-        assert result == Decimal("1.015")
-
-    def test_ottieni_c_all_valid_territories_are_decimals(self):
-        """Test che tutti i valori sono Decimal"""
-        for territorio in ["MARE", "PIANURA", "COLLINA", "MONTAGNA"]:
-            result = CalcolatoreMorfologicoC.ottieni_c(territorio)
-            assert isinstance(result, Decimal)
+from src.model import Offerta
+from src.prezzo.prezzo_gas import CalcolatoreAccisaGas, CalcolatoreTrasportoGas, PrezzoGas
 
 
 class TestCalcolatoreAccisaGas:
@@ -76,60 +27,79 @@ class TestCalcolatoreAccisaGas:
         with pytest.raises(ValueError, match="Zona non valida"):
             CalcolatoreAccisaGas(zona="NORD_OVEST")
 
-    def test_stima_accisa_media_returns_dict_with_required_keys(self):
-        """Test che stima_accisa_media ritorna un dizionario con le chiavi richieste"""
+    def test_stima_accisa_media_returns_decimal_cents(self):
+        """Test che stima_accisa_media ritorna un Decimal arrotondato al centesimo"""
         calc = CalcolatoreAccisaGas()
         result = calc.stima_accisa_media(50.0, 1)
-        
-        required_keys = {
-            "consumo_annuo_inferred",
-            "accisa_totale_annua",
-            "accisa_media_mensile",
-            "metodologia"
-        }
-        assert set(result.keys()) == required_keys
+        assert isinstance(result, Decimal)
+        assert result == result.quantize(Decimal("0.01"))
 
     def test_stima_accisa_media_low_consumption_winter_month(self):
         """Test stima_accisa_media con consumo basso in mese invernale (gennaio)"""
         calc = CalcolatoreAccisaGas(zona="CENTRO_NORD")
-        result = calc.stima_accisa_media(50.0, 1)
-        
-        # Gennaio ha peso 0.18, quindi consumo annuo stimato = 50 / 0.18 ≈ 277.78
-        assert result["consumo_annuo_inferred"] > 0
-        assert result["accisa_totale_annua"] > 0
-        assert result["accisa_media_mensile"] > 0
-        assert "metodologia" in result
+        # Gennaio ha peso 0.18: consumo annuo stimato = 50 / 0.18 ≈ 277.78 Smc
+        # 120 * 0.044 + 157.78 * 0.175 ≈ 32.89 €/anno
+        assert calc.stima_accisa_media(50.0, 1) == Decimal("2.74")
 
     def test_stima_accisa_media_high_consumption_summer_month(self):
         """Test stima_accisa_media con consumo alto in mese estivo (agosto)"""
         calc = CalcolatoreAccisaGas(zona="CENTRO_NORD")
-        result = calc.stima_accisa_media(100.0, 8)
-        
-        # Agosto ha peso 0.02, quindi consumo annuo stimato = 100 / 0.02 = 5000
-        assert result["consumo_annuo_inferred"] == 5000.0
-        assert result["accisa_totale_annua"] > 0
+        # Agosto ha peso 0.02: consumo annuo stimato = 100 / 0.02 = 5000 Smc (tutti gli scaglioni)
+        assert calc.stima_accisa_media(100.0, 8) == Decimal("74.31")
+
+    def test_stima_accisa_media_consumo_annuo_reale(self):
+        """Test che il consumo annuo reale prevale sulla stima dal mese"""
+        calc = CalcolatoreAccisaGas(zona="CENTRO_NORD")
+        assert calc.stima_accisa_media(50.0, 1, consumo_annuo_reale=1000) == Decimal("13.06")
+        assert calc.stima_accisa_media(50.0, 8, consumo_annuo_reale=1000) == Decimal("13.06")
 
     def test_stima_accisa_media_south_vs_north(self):
         """Test che il sud ha accise diverse dal nord per lo stesso consumo"""
-        consumo = 50.0
-        mese = 1
-        
-        calc_nord = CalcolatoreAccisaGas(zona="CENTRO_NORD")
-        result_nord = calc_nord.stima_accisa_media(consumo, mese)
-        
-        calc_sud = CalcolatoreAccisaGas(zona="SUD_MEZZOGIORNO")
-        result_sud = calc_sud.stima_accisa_media(consumo, mese)
-        
-        # Il sud dovrebbe avere accise diverse dal nord
-        assert result_nord["accisa_totale_annua"] != result_sud["accisa_totale_annua"]
+        result_nord = CalcolatoreAccisaGas(zona="CENTRO_NORD").stima_accisa_media(50.0, 1)
+        result_sud = CalcolatoreAccisaGas(zona="SUD_MEZZOGIORNO").stima_accisa_media(50.0, 1)
+        assert result_nord != result_sud
 
     def test_stima_accisa_media_all_months(self):
         """Test stima_accisa_media per tutti i mesi"""
         calc = CalcolatoreAccisaGas()
-        
         for mese in range(1, 13):
-            result = calc.stima_accisa_media(50.0, mese)
-            assert result["consumo_annuo_inferred"] > 0
-            assert result["accisa_totale_annua"] > 0
-            assert result["accisa_media_mensile"] > 0
+            assert calc.stima_accisa_media(50.0, mese) > 0
+
+
+class TestCalcolatoreTrasportoGas:
+    """Test suite per CalcolatoreTrasportoGas"""
+
+    def test_stima_costo_mensile(self):
+        """Test che il costo mensile somma quota fissa e costo medio degli scaglioni"""
+        # 72.50 / 12 + 100 * (120 * 0.096 + 360 * 0.131 + 720 * 0.125) / 1200
+        assert CalcolatoreTrasportoGas().stima_costo_mensile(Decimal("100")) == Decimal("18.43")
+
+    def test_consumo_annuo_reale(self):
+        """Test che il consumo annuo reale sceglie gli scaglioni al posto di 12 mesi costanti"""
+        assert CalcolatoreTrasportoGas().stima_costo_mensile(Decimal("100"), Decimal("1000")) == Decimal("18.41")
+
+    def test_ambito_case_insensitive(self):
+        """Test che l'ambito accetta input lowercase"""
+        assert CalcolatoreTrasportoGas("meridionale").stima_costo_mensile(Decimal("100")) == Decimal("20.10")
+
+    def test_ambito_non_valido_raises_error(self):
+        """Test che un ambito non presente nelle tabelle solleva ValueError"""
+        with pytest.raises(ValueError, match="Ambito tariffario gas sconosciuto"):
+            CalcolatoreTrasportoGas("DESERTO")
+
+
+class TestPrezzoGas:
+    """Test suite per PrezzoGas"""
+
+    def test_senza_consumo_annuo(self, imposta_config):
+        """Test che senza consumption_smc_yearly il consumo annuo e' stimato dal mese di riferimento"""
+        offerta = Offerta(nome_offerta="A", gestore="G", prezzo_fisso_offerta=0.5,
+                          tipologia_formula_offerta="costante", costi_fissi_anno=100)
+        imposta_config(consumption_smc_monthly=Decimal("50"), consumption_smc_yearly=None, mese_riferimento=1)
+        stimato = PrezzoGas(offerta)
+        assert stimato.consumo_annuo == Decimal("50") / Decimal("0.18")
 
+        imposta_config(consumption_smc_yearly=stimato.consumo_annuo)
+        esplicito = PrezzoGas(offerta)
+        assert stimato.calcola_prezzo_offerta() == esplicito.calcola_prezzo_offerta()
+        assert stimato.fattore_imposte() == esplicito.fattore_imposte()
@@ -0,0 +1,162 @@
+import json
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+from types import SimpleNamespace
+
+import pytest
+
+import src.main
+import src.server
+from src.data_extractor import extractor
+from src.model import Offerta
+from src.prezzo.cache import CachePrezzi
+from src.prezzo.prezzo_luce import PrezzoLuce
+from src.server import StatoServizio, crea_server
+
+
+def offerta(nome: str, prezzo: float) -> Offerta:
+    return Offerta(
+        nome_offerta=nome,
+        gestore="Gestore Test",
+        prezzo_fisso_offerta=prezzo,
+        tipologia_formula_offerta="costante",
+        costi_fissi_anno=102,
+    )
+
+
+def richiesta(base: str, percorso: str, corpo=None):
+    dati = None if corpo is None else json.dumps(corpo).encode("utf-8")
+    req = urllib.request.Request(base + percorso, data=dati, method="GET" if dati is None else "POST")
+    try:
+        with urllib.request.urlopen(req) as risposta:
+            return risposta.status, json.loads(risposta.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+class TestServizio:
+    """Test suite per il servizio HTTP dei prezzi"""
+
+    @pytest.fixture
+    def base(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(src.main, "_cache_prezzi", CachePrezzi(str(tmp_path)))
+        stato = StatoServizio()
+        stato.aggiungi("luce", offerta("Cara", 0.40))
+        stato.aggiungi("luce", offerta("Economica", 0.10))
+        server = crea_server(stato, porta=0)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        yield f"http://127.0.0.1:{server.server_port}"
+        server.shutdown()
+        server.server_close()
+
+    def test_prezzo_con_profilo(self, base):
+        """Test che il profilo della richiesta sostituisce la configurazione"""
+        corpo = {"tipo": "luce", "offerta": offerta("X", 0.2).model_dump()}
+        stato, predefinito = richiesta(base, "/prezzo", corpo)
+        assert stato == 200
+        assert predefinito["prezzo_offerta_mensile"] == PrezzoLuce(offerta("X", 0.2)).calcola_prezzo_offerta()
+
+        corpo["profilo"] = {"consumption_kwh_monthly": 500}
+        _, profilo = richiesta(base, "/prezzo", corpo)
+        assert profilo["prezzo_offerta_mensile"] > predefinito["prezzo_offerta_mensile"]
+
+    def test_profilo_non_valido(self, base):
+        """Test che chiavi di profilo sconosciute restituiscono 400"""
+        corpo = {"tipo": "luce", "offerta": offerta("X", 0.2).model_dump(), "profilo": {"GENAI_API_KEY": "x"}}
+        stato, risposta = richiesta(base, "/prezzo", corpo)
+        assert stato == 400
+        assert "GENAI_API_KEY" in risposta["errore"]
+
+    def test_classifica_aggiornata(self, base):
+        """Test che la classifica segue le offerte aggiunte"""
+        stato, classifica = richiesta(base, "/classifica?tipo=luce&consumo=200&indice=0.12&k=2")
+        assert stato == 200
+        assert [p["nome_offerta"] for p in classifica] == ["Economica", "Cara"]
+
+        richiesta(base, "/offerte?tipo=luce", offerta("Minima", 0.05).model_dump())
+        _, classifica = richiesta(base, "/classifica?tipo=luce&consumo=200&indice=0.12&k=1")
+        assert classifica[0]["nome_offerta"] == "Minima"
+
+    def test_richieste_concorrenti(self, base):
+        """Test che richieste concorrenti ricevono tutte risposta"""
+        risposte = []
+
+        def interroga():
+            risposte.append(richiesta(base, "/classifica?tipo=luce&consumo=150&indice=0.1&k=1"))
+
+        threads = [threading.Thread(target=interroga) for _ in range(20)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert len(risposte) == 20
+        assert all(stato == 200 and r[0]["nome_offerta"] == "Economica" for stato, r in risposte)
+
+    def test_endpoint_sconosciuto(self, base):
+        """Test che un percorso sconosciuto restituisce 404"""
+        stato, _ = richiesta(base, "/sconosciuto")
+        assert stato == 404
+
+    def test_pdf_caricato_due_volte(self, tmp_path, imposta_config, monkeypatch):
+        """Test che ogni caricamento usa un file temporaneo proprio e lo stesso PDF riusa la cache di estrazione"""
+        imposta_config(CACHE_DIR=str(tmp_path / "cache"), GENAI_API_KEY="finta")
+        caricati, richieste = [], []
+        client = SimpleNamespace(
+            files=SimpleNamespace(
+                upload=lambda file: caricati.append(file) or SimpleNamespace(uri=file, mime_type="application/pdf", name=file),
+                delete=lambda name: None,
+            ),
+            models=SimpleNamespace(
+                generate_content=lambda **_: richieste.append(1) or SimpleNamespace(text=offerta("Caricata", 0.2).model_dump_json()),
+            ),
+        )
+        monkeypatch.setattr(extractor, "_client_condiviso", lambda *_: client)
+        stato = StatoServizio()
+
+        assert stato.estrai("luce", b"%PDF-1.4 uno").nome_offerta == "Caricata"
+        stato.estrai("luce", b"%PDF-1.4 uno")
+        assert len(richieste) == 1
+        stato.estrai("luce", b"%PDF-1.4 due")
+        assert len(richieste) == 2
+        assert len(set(caricati)) == 2 and not any(os.path.exists(p) for p in caricati)
+
+    def test_corpo_non_oggetto(self, base):
+        """Test che un corpo JSON che non e' un oggetto restituisce 400"""
+        for corpo in ([1, 2], "luce", 3):
+            stato, risposta = richiesta(base, "/prezzo", corpo)
+            assert stato == 400
+            assert "oggetto" in risposta["errore"]
+
+    def test_ricarica_config_limitata(self, monkeypatch):
+        """Test che i file env vengono controllati al piu' una volta per intervallo"""
+        controlli = []
+        monkeypatch.setattr(src.server.config, "ricarica", lambda: controlli.append(1) or False)
+        stato = StatoServizio(intervallo_ricarica=0.2)
+        for _ in range(5):
+            stato.ricarica_config()
+        assert controlli == []
+        time.sleep(0.25)
+        for _ in range(5):
+            stato.ricarica_config()
+        assert controlli == [1]
+
+    def test_indice_costruito_fuori_dal_lock(self, monkeypatch):
+        """Test che l'indice viene costruito senza bloccare il catalogo e non pubblicato se questo cambia"""
+        stato = StatoServizio()
+        stato.aggiungi("luce", offerta("Cara", 0.40))
+        costruisci = src.server.IndiceOfferte
+
+        def costruisci_con_aggiunta(offerte, *args, **kwargs):
+            assert not stato._lock.locked()
+            stato.aggiungi("luce", offerta("Nuova", 0.05))
+            return costruisci(offerte, *args, **kwargs)
+
+        monkeypatch.setattr(src.server, "IndiceOfferte", costruisci_con_aggiunta)
+        assert len(stato.indice("luce", "offerta")) == 1
+        monkeypatch.setattr(src.server, "IndiceOfferte", costruisci)
+        assert len(stato.indice("luce", "offerta")) == 2
+        assert stato.indice("luce", "offerta") is stato.indice("luce", "offerta")
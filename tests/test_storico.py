@@ -0,0 +1,65 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from src.storico.store import StoricoRisultati
+
+
+def risultati(prezzo_a: float) -> dict[str, pd.DataFrame]:
+    return {
+        "luce": pd.DataFrame({
+            "nome_offerta": ["A", "B"],
+            "gestore": ["G1", "G2"],
+            "prezzo_offerta_mensile": [prezzo_a, 80.0],
+            "prezzo_finita_medio_mensile": [90.0, None],
+            "prezzo_finita_peggiore_mensile": [100.0, None],
+            "durata_mesi": [12.0, None],
+            "note": [None, "nota"],
+        })
+    }
+
+
+def conta(path, tabella):
+    with sqlite3.connect(path) as conn:
+        return conn.execute(f"SELECT COUNT(*) FROM {tabella}").fetchone()[0]
+
+
+class TestStoricoRisultati:
+    """Test suite per StoricoRisultati"""
+
+    @pytest.fixture
+    def storico(self, tmp_path):
+        return StoricoRisultati(str(tmp_path / "storico" / "risultati.sqlite"))
+
+    def test_righe_invariate_per_riferimento(self, storico):
+        """Test che esecuzioni identiche aggiungono solo riferimenti"""
+        storico.registra_esecuzione(risultati(75.0), "cfg")
+        storico.registra_esecuzione(risultati(75.0), "cfg")
+        assert conta(storico.path, "esecuzioni") == 2
+        assert conta(storico.path, "risultati") == 2
+        assert conta(storico.path, "offerte") == 2
+        assert conta(storico.path, "esecuzioni_risultati") == 4
+
+    def test_storico_offerta(self, storico):
+        """Test che lo storico di un'offerta segue le esecuzioni"""
+        storico.registra_esecuzione(risultati(75.0), "cfg1")
+        storico.registra_esecuzione(risultati(85.0), "cfg2")
+        df = storico.storico_offerta("A", gestore="G1")
+        assert df["prezzo_offerta_mensile"].tolist() == [75.0, 85.0]
+        assert df["impronta_config"].tolist() == ["cfg1", "cfg2"]
+        assert conta(storico.path, "offerte") == 2
+
+    def test_migliore_per_settimana(self, storico):
+        """Test che viene restituita l'offerta migliore per settimana"""
+        storico.registra_esecuzione(risultati(75.0), "cfg1")
+        storico.registra_esecuzione(risultati(85.0), "cfg2")
+        df = storico.migliore_per_settimana("luce")
+        assert len(df) == 1
+        assert df.iloc[0]["nome_offerta"] == "A"
+        assert df.iloc[0]["prezzo"] == 75.0
+
+    def test_scenario_non_valido(self, storico):
+        """Test che uno scenario sconosciuto solleva ValueError"""
+        with pytest.raises(ValueError):
+            storico.migliore_per_settimana("luce", scenario="prezzo; DROP TABLE offerte")
@@ -0,0 +1,77 @@
+import shutil
+from decimal import Decimal
+from pathlib import Path
+
+import pytest
+
+from src.model import Offerta
+from src.prezzo.prezzo_gas import PrezzoGas
+from src.prezzo.prezzo_luce import PrezzoLuce
+from src.prezzo.tariffe import tabelle_tariffe
+
+TARIFFE_DIR = Path(__file__).parent.parent / "tariffe"
+
+OFFERTA = Offerta(nome_offerta="Offerta", gestore="G", prezzo_fisso_offerta=0.4,
+                  tipologia_formula_offerta="costante", costi_fissi_anno=60)
+
+
+class TestTabelleTariffe:
+    """Test suite per le tabelle delle tariffe di rete"""
+
+    def test_tabelle_condivise(self):
+        """Test che le tabelle sono caricate una volta e condivise"""
+        assert tabelle_tariffe(str(TARIFFE_DIR)) is tabelle_tariffe(str(TARIFFE_DIR))
+
+    def test_ambito_per_comune(self):
+        """Test che il comune determina l'ambito e l'ambito esplicito prevale"""
+        tabelle = tabelle_tariffe(str(TARIFFE_DIR))
+        assert tabelle.ambito_gas(comune="  reggio   Calabria") == "MERIDIONALE"
+        assert tabelle.ambito_gas(comune="Milano", ambito="centrale") == "CENTRALE"
+        assert tabelle.ambito_gas(zona="SUD_MEZZOGIORNO") == "MERIDIONALE"
+        with pytest.raises(ValueError, match="Comune non presente"):
+            tabelle.ambito_gas(comune="Atlantide")
+
+    def test_scaglioni_gas(self):
+        """Test che il costo annuo attraversa tutti gli scaglioni progressivi"""
+        tariffa = tabelle_tariffe(str(TARIFFE_DIR)).tariffa_gas("CENTRALE")
+        # 120*0.096 + 360*0.131 + 1080*0.125 + 3440*0.123 + 75000*0.108 + 20000*0.081
+        assert tariffa.costo_variabile_annuo(Decimal("100000")) == Decimal("10336.800")
+        assert tariffa.costo_variabile_annuo(Decimal("120")) == Decimal("11.520")
+
+    def test_fasce_potenza_luce(self):
+        """Test che la fascia di potenza include l'estremo superiore e l'ultima e' aperta"""
+        tabelle = tabelle_tariffe(str(TARIFFE_DIR))
+        assert tabelle.tariffa_luce("DOMESTICO_RESIDENTE", 3.0).oneri_fissi_eur_anno == 20.0
+        assert tabelle.tariffa_luce("DOMESTICO_NON_RESIDENTE", 25.0).oneri_fissi_eur_anno == 135.0
+        with pytest.raises(ValueError, match="Classe tariffaria luce sconosciuta"):
+            tabelle.tariffa_luce("INDUSTRIALE", 3.0)
+
+    def test_ricarica_e_impronta(self, tmp_path, imposta_config):
+        """Test che una tabella modificata viene ricaricata e invalida l'impronta dei prezzi"""
+        cartella = tmp_path / "tariffe"
+        shutil.copytree(TARIFFE_DIR, cartella)
+        imposta_config(TARIFFE_DIR=str(cartella))
+        impronta = PrezzoLuce.impronta_config()
+        prezzo = PrezzoLuce(OFFERTA).calcola_prezzo_offerta()
+
+        tabella = cartella / "luce_tariffe.csv"
+        tabella.write_text(tabella.read_text().replace("DOMESTICO_RESIDENTE,0,3,24.00", "DOMESTICO_RESIDENTE,0,3,36.000"))
+        assert PrezzoLuce.impronta_config() != impronta
+        assert PrezzoLuce(OFFERTA).calcola_prezzo_offerta() == pytest.approx(prezzo + 1.0)
+
+    def test_scaglioni_non_contigui(self, tmp_path):
+        """Test che scaglioni con buchi vengono rifiutati al caricamento"""
+        shutil.copytree(TARIFFE_DIR, tmp_path, dirs_exist_ok=True)
+        tabella = tmp_path / "gas_scaglioni.csv"
+        tabella.write_text(tabella.read_text().replace("CENTRALE,120,480", "CENTRALE,130,480"))
+        with pytest.raises(ValueError, match="CENTRALE"):
+            tabelle_tariffe(str(tmp_path))
+
+    def test_prezzo_gas_per_comune(self, imposta_config):
+        """Test che il comune cambia l'ambito e quindi il prezzo del gas"""
+        imposta_config(comune="Palermo")
+        prezzo_palermo = PrezzoGas(OFFERTA)
+        imposta_config(comune="Milano")
+        prezzo_milano = PrezzoGas(OFFERTA)
+        assert (prezzo_palermo.ambito_gas, prezzo_milano.ambito_gas) == ("MERIDIONALE", "NORD_ORIENTALE")
+        assert prezzo_palermo.calcola_prezzo_offerta() > prezzo_milano.calcola_prezzo_offerta()
@@ -0,0 +1,67 @@
+import json
+
+import pytest
+
+from src.tracing import Tracer, _SPAN_NULLO
+
+
+class TestTracer:
+    """Test suite per Tracer"""
+
+    def test_disabilitato_non_registra(self):
+        """Test che a tracciamento disabilitato viene usato lo span nullo"""
+        tracer = Tracer()
+        with tracer.span("fase") as span:
+            span.imposta(valore=1)
+        assert span is _SPAN_NULLO
+        assert tracer.riepilogo() == []
+
+    def test_riepilogo_per_fase(self):
+        """Test che il riepilogo aggrega gli span per nome"""
+        tracer = Tracer()
+        tracer.abilita()
+        for _ in range(3):
+            with tracer.span("prezzi"):
+                pass
+        with tracer.span("excel"):
+            pass
+
+        riepilogo = {r["fase"]: r for r in tracer.riepilogo()}
+        assert riepilogo["prezzi"]["conteggio"] == 3
+        assert riepilogo["excel"]["conteggio"] == 1
+        assert "prezzi" in tracer.tabella_riepilogo()
+
+    def test_errore_registrato(self):
+        """Test che un'eccezione viene registrata e propagata"""
+        tracer = Tracer()
+        tracer.abilita()
+        with pytest.raises(ValueError):
+            with tracer.span("modello"):
+                raise ValueError("errore")
+        assert tracer._eventi[0][4]["errore"] == "ValueError"
+
+    def test_esporta_chrome_trace(self, tmp_path):
+        """Test che l'esportazione produce eventi completi in formato Chrome trace"""
+        tracer = Tracer()
+        tracer.abilita()
+        with tracer.span("upload", pdf="offerta.pdf"):
+            pass
+
+        path = tmp_path / "trace.json"
+        tracer.esporta_chrome_trace(str(path))
+        dati = json.loads(path.read_text())
+        evento = dati["traceEvents"][0]
+        assert evento["name"] == "upload"
+        assert evento["ph"] == "X"
+        assert evento["args"] == {"pdf": "offerta.pdf"}
+
+    def test_argomenti_senza_configurazione(self, monkeypatch):
+        """Test che parse_arguments non carica la configurazione, cosi' --trace registra anche il suo caricamento"""
+        from src.config import config
+        from src.main import parse_arguments
+
+        monkeypatch.setattr(config, "_impostazioni", None)
+        monkeypatch.setattr("sys.argv", ["main", "--trace", "trace.json"])
+        args = parse_arguments()
+        assert (args.trace, args.orizzonte, args.workers) == ("trace.json", None, None)
+        assert config._impostazioni is None
@@ -0,0 +1,163 @@
+import os
+import time
+
+import pytest
+
+from src.watch import ModalitaWatch
+
+
+@pytest.fixture
+def cartelle(tmp_path):
+    cartelle = {"luce": tmp_path / "luce", "gas": tmp_path / "gas"}
+    for folder in cartelle.values():
+        folder.mkdir()
+    return {tipo: str(folder) for tipo, folder in cartelle.items()}
+
+
+def scrivi_pdf(folder, nome, contenuto="x"):
+    path = os.path.join(folder, nome)
+    with open(path, "w") as f:
+        f.write(contenuto)
+    return path
+
+
+@pytest.fixture
+def watch(cartelle):
+    estratti, conclusi = [], {}
+
+    def estrai(tipo, pdf_path):
+        estratti.append(os.path.basename(pdf_path))
+        with open(pdf_path) as f:
+            return {"nome_offerta": os.path.basename(pdf_path), "contenuto": f.read()}
+
+    def prezza(tipo, offerta):
+        return {**offerta, "prezzo": len(offerta["contenuto"])}
+
+    def concludi(tipo, righe):
+        conclusi[tipo] = sorted((r["nome_offerta"], r["prezzo"]) for r in righe)
+        return conclusi[tipo]
+
+    modalita = ModalitaWatch(cartelle, estrai, prezza, concludi, debounce=0, workers=2)
+    return modalita, estratti, conclusi
+
+
+class TestModalitaWatch:
+    """Test suite per ModalitaWatch"""
+
+    def test_primo_ciclo_elabora_tutto(self, watch, cartelle):
+        """Test che al primo ciclo vengono elaborati tutti i PDF"""
+        modalita, estratti, conclusi = watch
+        scrivi_pdf(cartelle["luce"], "a.pdf")
+        scrivi_pdf(cartelle["gas"], "b.pdf")
+        scrivi_pdf(cartelle["gas"], "note.txt")
+        assert modalita.ciclo()
+        assert sorted(estratti) == ["a.pdf", "b.pdf"]
+        assert conclusi == {"luce": [("a.pdf", 1)], "gas": [("b.pdf", 1)]}
+
+    def test_nessuna_modifica(self, watch, cartelle):
+        """Test che senza modifiche non viene rielaborato nulla"""
+        modalita, estratti, _ = watch
+        scrivi_pdf(cartelle["luce"], "a.pdf")
+        modalita.ciclo()
+        assert not modalita.ciclo()
+        assert estratti == ["a.pdf"]
+
+    def test_solo_file_modificati(self, watch, cartelle):
+        """Test che vengono rielaborati solo i file nuovi o modificati"""
+        modalita, estratti, conclusi = watch
+        scrivi_pdf(cartelle["luce"], "a.pdf")
+        scrivi_pdf(cartelle["luce"], "b.pdf")
+        scrivi_pdf(cartelle["gas"], "c.pdf")
+        modalita.ciclo()
+        estratti.clear()
+        conclusi.clear()
+
+        scrivi_pdf(cartelle["luce"], "b.pdf", contenuto="xyz")
+        assert modalita.ciclo()
+        assert estratti == ["b.pdf"]
+        assert conclusi == {"luce": [("a.pdf", 1), ("b.pdf", 3)]}
+
+    def test_file_rimosso(self, watch, cartelle):
+        """Test che un file rimosso esce dai risultati"""
+        modalita, _, conclusi = watch
+        scrivi_pdf(cartelle["luce"], "a.pdf")
+        path_b = scrivi_pdf(cartelle["luce"], "b.pdf")
+        modalita.ciclo()
+        os.remove(path_b)
+        modalita.ciclo()
+        assert conclusi["luce"] == [("a.pdf", 1)]
+
+    def test_file_fallito_ritentato(self, cartelle):
+        """Test che un file la cui estrazione fallisce viene ritentato al ciclo successivo senza perdere gli altri"""
+        tentativi = []
+
+        def estrai(tipo, pdf_path):
+            nome = os.path.basename(pdf_path)
+            tentativi.append(nome)
+            if nome == "b.pdf" and tentativi.count(nome) == 1:
+                raise RuntimeError("429 RESOURCE_EXHAUSTED")
+            return {"nome_offerta": nome}
+
+        conclusi = {}
+        modalita = ModalitaWatch(cartelle, estrai, lambda tipo, o: o,
+                                 lambda tipo, righe: conclusi.__setitem__(tipo, sorted(r["nome_offerta"] for r in righe)),
+                                 debounce=0, workers=2, attesa_tentativi=0)
+        scrivi_pdf(cartelle["luce"], "a.pdf")
+        scrivi_pdf(cartelle["luce"], "b.pdf")
+        assert modalita.ciclo()
+        assert conclusi == {"luce": ["a.pdf"]}
+
+        assert modalita.ciclo()
+        assert conclusi == {"luce": ["a.pdf", "b.pdf"]}
+        assert sorted(tentativi) == ["a.pdf", "b.pdf", "b.pdf"]
+        assert not modalita.ciclo()
+
+    def test_file_fallito_attende_prima_di_ritentare(self, cartelle):
+        """Test che un file fallito non viene ritentato prima che sia trascorsa l'attesa, raddoppiata a ogni fallimento"""
+        tentativi = []
+
+        def estrai(tipo, pdf_path):
+            tentativi.append(os.path.basename(pdf_path))
+            raise RuntimeError("PDF illeggibile")
+
+        modalita = ModalitaWatch(cartelle, estrai, lambda tipo, o: o, lambda tipo, righe: None,
+                                 debounce=0, attesa_tentativi=0.2)
+        scrivi_pdf(cartelle["luce"], "rotto.pdf")
+        assert modalita.ciclo()
+        assert not modalita.ciclo()
+        assert tentativi == ["rotto.pdf"]
+
+        time.sleep(0.25)
+        assert modalita.ciclo()
+        assert tentativi == ["rotto.pdf", "rotto.pdf"]
+        # Seconda attesa: 0.4s
+        time.sleep(0.25)
+        assert not modalita.ciclo()
+        assert len(tentativi) == 2
+
+    def test_file_fermo_dopo_max_tentativi_fino_a_modifica(self, cartelle):
+        """Test che dopo max_tentativi fallimenti il file non viene piu' ritentato finche' non cambia"""
+        tentativi = []
+
+        def estrai(tipo, pdf_path):
+            with open(pdf_path) as f:
+                contenuto = f.read()
+            tentativi.append(contenuto)
+            if contenuto == "rotto":
+                raise RuntimeError("PDF illeggibile")
+            return {"nome_offerta": contenuto}
+
+        conclusi = {}
+        modalita = ModalitaWatch(cartelle, estrai, lambda tipo, o: o,
+                                 lambda tipo, righe: conclusi.__setitem__(tipo, [r["nome_offerta"] for r in righe]),
+                                 debounce=0, max_tentativi=3, attesa_tentativi=0)
+        scrivi_pdf(cartelle["luce"], "offerta.pdf", "rotto")
+        for _ in range(3):
+            assert modalita.ciclo()
+        assert not modalita.ciclo()
+        assert tentativi == ["rotto"] * 3
+
+        scrivi_pdf(cartelle["luce"], "offerta.pdf", "riparato")
+        assert modalita.ciclo()
+        assert conclusi == {"luce": ["riparato"]}
+        assert "offerta.pdf" not in {os.path.basename(p) for p in modalita.tentativi}